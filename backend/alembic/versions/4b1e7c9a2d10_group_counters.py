@@ -0,0 +1,37 @@
+"""group-counters
+
+Revision ID: 4b1e7c9a2d10
+Revises: fd9c5d8736ea
+Create Date: 2026-10-19 09:12:31.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b1e7c9a2d10'
+down_revision: Union[str, None] = 'fd9c5d8736ea'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('group', sa.Column('member_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('group', sa.Column('active_test_count', sa.Integer(), nullable=False, server_default='0'))
+    # Backfill from the source tables; afterwards the counters are maintained on flush.
+    op.execute(
+        'UPDATE "group" SET '
+        'member_count = (SELECT count(*) FROM belongs_to_group WHERE belongs_to_group.group_id = "group".id), '
+        'active_test_count = (SELECT count(*) FROM test WHERE test.group_id = "group".id '
+        "AND test.status IN ('Pending', 'InProgress'))"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('group', 'active_test_count')
+    op.drop_column('group', 'member_count')
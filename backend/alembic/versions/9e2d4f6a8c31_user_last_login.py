@@ -0,0 +1,28 @@
+"""user-last-login
+
+Revision ID: 9e2d4f6a8c31
+Revises: 4b1e7c9a2d10
+Create Date: 2026-10-19 14:03:52.118907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e2d4f6a8c31'
+down_revision: Union[str, None] = '4b1e7c9a2d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user', sa.Column('last_login', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user', 'last_login')
@@ -0,0 +1,43 @@
+"""dashboard-snapshots
+
+Revision ID: a4d9c2e7f815
+Revises: e3b8f1c6a904
+Create Date: 2026-10-19 20:12:05.118340
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d9c2e7f815'
+down_revision: Union[str, None] = 'e3b8f1c6a904'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'dashboard_snapshot',
+        sa.Column('group_id', sa.Integer(), nullable=False),
+        sa.Column('compare_time_range', sa.String(length=16), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('group_id', 'compare_time_range'),
+    )
+    op.create_table(
+        'worker_lease',
+        sa.Column('name', sa.String(length=127), nullable=False),
+        sa.Column('holder', sa.String(length=255), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('worker_lease')
+    op.drop_table('dashboard_snapshot')
@@ -0,0 +1,55 @@
+"""delta-sync
+
+Revision ID: c7a1e5b93d42
+Revises: 9e2d4f6a8c31
+Create Date: 2026-10-19 16:27:05.630214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7a1e5b93d42'
+down_revision: Union[str, None] = '9e2d4f6a8c31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SYNCED_TABLES = ('user', 'test', 'device', 'device_reservation')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows get version 0, so the first delta sync of a client starting from 0 is a full list.
+    for table in SYNCED_TABLES:
+        op.add_column(table, sa.Column('sync_version', sa.BigInteger(), nullable=False, server_default='0'))
+        op.create_index(f'ix_{table}_sync_version', table, ['sync_version'])
+    sync_counter = op.create_table(
+        'sync_counter',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('value', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.bulk_insert(sync_counter, [{'id': 1, 'value': 0}])
+    op.create_table(
+        'tombstone',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('table_name', sa.String(length=127), nullable=False),
+        sa.Column('row_id', sa.Integer(), nullable=False),
+        sa.Column('sync_version', sa.BigInteger(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_tombstone_table_name_sync_version', 'tombstone', ['table_name', 'sync_version'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tombstone_table_name_sync_version', table_name='tombstone')
+    op.drop_table('tombstone')
+    op.drop_table('sync_counter')
+    for table in SYNCED_TABLES:
+        op.drop_index(f'ix_{table}_sync_version', table_name=table)
+        op.drop_column(table, 'sync_version')
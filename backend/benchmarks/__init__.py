@@ -0,0 +1,136 @@
+"""Performance benchmarks for the backend.
+
+Benchmarks are plain scripts, run from the `backend` directory, e.g.
+
+```bash
+python -m benchmarks.dashboard_concurrency
+```
+
+Each one builds a throwaway SQLite database seeded with `gen_mock_data`.
+Use `simulated_db_latency` to approximate the round trip to a remote PostgreSQL server.
+"""
+import contextlib
+import statistics
+import tempfile
+import threading
+import time
+
+from sqlalchemy import event
+
+
+def make_app(seed=True, **config):
+    """Create an app backed by a fresh SQLite file, optionally seeded with mock data."""
+    from flaskr import create_app
+    from flaskr.db import init_db, gen_mock_data
+    path = tempfile.mkdtemp(prefix='flaskr-bench-')
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}/bench.db',
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        **config,
+    })
+    with app.app_context():
+        init_db()
+        if seed:
+            gen_mock_data()
+    return app
+
+def _engine(app):
+    from flaskr.db import db
+    with app.app_context():
+        return db.engine
+
+@contextlib.contextmanager
+def simulated_db_latency(app, seconds, capacity=None):
+    """Sleep before every statement to mimic network latency to the database.
+
+    With `capacity`, at most that many statements are delayed at once and the
+    others queue, like on a saturated database server.
+    """
+    engine = _engine(app)
+    slots = threading.Semaphore(capacity) if capacity else contextlib.nullcontext()
+
+    def delay(*args):
+        with slots:
+            time.sleep(seconds)
+
+    event.listen(engine, 'before_cursor_execute', delay)
+    try:
+        yield
+    finally:
+        event.remove(engine, 'before_cursor_execute', delay)
+
+@contextlib.contextmanager
+def count_queries(app):
+    """Count the statements executed inside the block; read the total from `counter[0]`."""
+    engine = _engine(app)
+    counter = [0]
+
+    def count(*args):
+        counter[0] += 1
+
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+
+class _PassThrough:
+    """Stands in for a `SingleFlight`: every call computes."""
+    async def get(self, key, compute, version=None):
+        return await compute()
+
+class _NoSnapshots:
+    """Stands in for `DashboardSnapshots`: nothing is stored or served."""
+    def __init__(self, build):
+        self.build = build
+
+    def get(self, group_id, compare_time_range=None):
+        return None
+
+    async def compute(self, group_id, compare_time_range=None):
+        return await self.build(group_id, compare_time_range)
+
+@contextlib.contextmanager
+def without_single_flight(app, name='dashboard'):
+    """Disable request coalescing and result reuse for the named single-flight group.
+
+    For the dashboard, precomputed snapshots are disabled as well.
+    """
+    flights = app.extensions['single_flight']
+    original = flights[name]
+    flights[name] = _PassThrough()
+    snapshots = app.extensions['dashboard_snapshots']
+    if name == 'dashboard':
+        app.extensions['dashboard_snapshots'] = _NoSnapshots(snapshots.build)
+    try:
+        yield
+    finally:
+        flights[name] = original
+        app.extensions['dashboard_snapshots'] = snapshots
+
+def timed(func, repeat=1):
+    """Call `func` `repeat` times and return the individual durations in seconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+def summarize(durations):
+    """Return mean/p50/p95 in milliseconds for a list of durations in seconds."""
+    ordered = sorted(durations)
+    return {
+        'mean_ms': statistics.fmean(ordered) * 1000,
+        'p50_ms': ordered[len(ordered) // 2] * 1000,
+        'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+    }
+
+def print_table(headers, rows):
+    """Print rows as an aligned plain-text table."""
+    rows = [[f'{c:.2f}' if isinstance(c, float) else str(c) for c in row] for row in rows]
+    widths = [max(len(str(h)), *(len(r[i]) for r in rows)) for i, h in enumerate(headers)]
+    print('  '.join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print('  '.join(c.ljust(w) for c, w in zip(row, widths)))
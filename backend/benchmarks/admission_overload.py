@@ -0,0 +1,81 @@
+"""API responsiveness under a dashboard flood, with and without admission control.
+
+`--clients` threads request uncached dashboards in a loop against a
+simulated overloaded database: each statement takes `--latency-ms`, and at
+most `--db-capacity` statements run at once, so statement latency grows
+with load as on a saturated PostgreSQL server. Flood clients that are shed
+wait for `Retry-After` before trying again. Meanwhile a probe requests
+`/api/device/1` and `/metrics` every 100 ms. Reports probe latency and, for
+the flood, how many requests were served or shed with 503.
+
+    python -m benchmarks.admission_overload [--clients 48] [--seconds 10] [--latency-ms 20] [--db-capacity 4]
+"""
+import argparse
+import threading
+import time
+from collections import Counter
+
+from benchmarks import make_app, simulated_db_latency, without_single_flight, summarize, print_table
+
+PROBES = ('/api/device/1', '/metrics')
+
+
+def run(app, clients, seconds):
+    stop = threading.Event()
+    flood = Counter()
+    probes = {url: [] for url in PROBES}
+    errors = Counter()
+
+    def dashboards():
+        client = app.test_client()
+        while not stop.is_set():
+            response = client.get('/api/dashboard/1?compare_time_range=week')
+            flood[response.status_code] += 1
+            if response.status_code == 503:
+                stop.wait(int(response.headers['Retry-After']))
+
+    def probe():
+        client = app.test_client()
+        while not stop.is_set():
+            for url in PROBES:
+                start = time.perf_counter()
+                status = client.get(url).status_code
+                probes[url].append(time.perf_counter() - start)
+                if status != 200:
+                    errors[url] += 1
+            time.sleep(0.1)
+
+    threads = [threading.Thread(target=dashboards) for _ in range(clients)] + [threading.Thread(target=probe)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return flood, probes, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=48, help='Threads flooding the dashboard')
+    parser.add_argument('--seconds', type=float, default=10, help='Duration per mode')
+    parser.add_argument('--latency-ms', type=float, default=20, help='Simulated latency per statement')
+    parser.add_argument('--db-capacity', type=int, default=4, help='Statements the simulated database runs at once')
+    args = parser.parse_args()
+
+    rows = []
+    for mode, enabled in (('off', False), ('on', True)):
+        app = make_app(ADMISSION_CONTROL=enabled)
+        with simulated_db_latency(app, args.latency_ms / 1000, args.db_capacity), without_single_flight(app):
+            flood, probes, errors = run(app, args.clients, args.seconds)
+        limit = f"{app.extensions['admission'].limit:.0f}" if enabled else '-'
+        for url, durations in probes.items():
+            stats = summarize(durations)
+            rows.append([mode, url, stats['p50_ms'], stats['p95_ms'], errors[url], flood[200], flood[503], limit])
+    print(f'{args.clients} dashboard clients, {args.latency_ms} ms per statement, '
+          f'{args.db_capacity} statements at once, {args.seconds} s per mode')
+    print_table(['admission', 'probe', 'p50 ms', 'p95 ms', 'probe errors', 'flood 200', 'flood 503', 'final limit'], rows)
+
+
+if __name__ == '__main__':
+    main()
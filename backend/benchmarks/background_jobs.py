@@ -0,0 +1,61 @@
+"""Heavy work in the request vs. queued as a background job.
+
+Generates dashboard mock data (`--groups` groups of `--users` users) once
+inside the request-handling thread, as the CLI command does, and once by
+`POST /api/jobs`, which returns as soon as the job is queued. Reports how
+long the caller waits and how long until the data exists, with
+`--latency-ms` per SQL statement.
+
+    python -m benchmarks.background_jobs [--groups 1] [--users 3] [--latency-ms 1]
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from benchmarks import make_app, simulated_db_latency, print_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--groups', type=int, default=1, help='Groups to generate')
+    parser.add_argument('--users', type=int, default=3, help='Users per group')
+    parser.add_argument('--tests', type=int, default=20, help='Average tests per group')
+    parser.add_argument('--latency-ms', type=float, default=1, help='Simulated latency per statement')
+    args = parser.parse_args()
+
+    from flaskr.db import gen_mock_data_for_dashboard
+    from flaskr.services.jobs import get_queue
+    from flaskr.services.user import generate_jwt_token, get_user_by_id
+    app = make_app(JWT_SECRET_KEY='bench-secret', SECRET_KEY='bench-secret', JOBS_WORKER=True, JOBS_POLL_INTERVAL=0.05)
+    with app.app_context():
+        headers = {'Authorization': f'Bearer {generate_jwt_token(get_user_by_id(1))}'}
+    params = {'num_groups': args.groups, 'num_user_per_group': args.users,
+              'num_tests_per_group': args.tests, 'num_devices': 2, 'random_seed': 0}
+    client = app.test_client()
+    rows = []
+    # The generator prints a line per user; keep the table readable.
+    with simulated_db_latency(app, args.latency_ms / 1000), contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        with app.app_context():
+            gen_mock_data_for_dashboard(**params)
+        inline = time.perf_counter() - start
+        rows.append(['in request', inline * 1000, inline * 1000])
+
+        start = time.perf_counter()
+        response = client.post('/api/jobs', json={'kind': 'gen_mock_data_dashboard', 'params': params}, headers=headers)
+        queued = time.perf_counter() - start
+        location = response.headers['Location']
+        while client.get(location, headers=headers).get_json()['status'] in ('Queued', 'Running'):
+            time.sleep(0.01)
+        done = time.perf_counter() - start
+        status = client.get(location, headers=headers).get_json()['status']
+        rows.append([f'background job ({status})', queued * 1000, done * 1000])
+        queue = get_queue(app)
+        queue.stop()
+    print(f'{args.groups} group(s) of {args.users} users, {args.latency_ms} ms per statement')
+    print_table(['mode', 'caller waits ms', 'data ready ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""One screen's worth of API calls: separate requests vs. one `/api/batch`.
+
+Loads what the group page needs (group detail, members, tests, reservations,
+device types and the dashboard) as separate authenticated requests, as one
+sequential batch and as one concurrent batch, while every statement is
+delayed to simulate database latency. `--rtt-ms` adds a simulated network
+round trip to each HTTP request the client makes.
+
+    python -m benchmarks.batch_requests [--repeat 20] [--latency-ms 2] [--rtt-ms 20]
+"""
+import argparse
+import time
+
+from benchmarks import make_app, simulated_db_latency, without_single_flight, timed, summarize, print_table
+
+SCREEN = [
+    {'path': '/api/group/1'},
+    {'path': '/api/group/1/user'},
+    {'path': '/api/test', 'query': {'group_id': 1}},
+    {'path': '/api/device/reservation', 'query': {'group_id': 1}},
+    {'path': '/api/device/type'},
+    {'path': '/api/dashboard/1', 'query': {'compare_time_range': 'week'}},
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20, help='Timed screen loads per mode')
+    parser.add_argument('--latency-ms', type=float, default=2, help='Simulated latency per statement')
+    parser.add_argument('--rtt-ms', type=float, default=20, help='Simulated network round trip per HTTP request')
+    args = parser.parse_args()
+
+    from flaskr.services.user import generate_jwt_token, get_user_by_id
+    app = make_app(JWT_SECRET_KEY='bench-secret')
+    with app.app_context():
+        headers = {'Authorization': f'Bearer {generate_jwt_token(get_user_by_id(1))}'}
+    client = app.test_client()
+
+    def request(method, path, **kwargs):
+        time.sleep(args.rtt_ms / 1000)
+        response = client.open(path, method=method, headers=headers, **kwargs)
+        assert response.status_code < 500, (path, response.status_code)
+        return response
+
+    def separate():
+        for sub in SCREEN:
+            request('GET', sub['path'], query_string=sub.get('query'))
+
+    def batched(concurrent):
+        def load():
+            response = request('POST', '/api/batch', json={'requests': SCREEN, 'concurrent': concurrent})
+            assert all(r['status'] < 500 for r in response.get_json()['responses'])
+        return load
+
+    rows = []
+    with simulated_db_latency(app, args.latency_ms / 1000), without_single_flight(app):
+        for mode, load in (('separate', separate), ('batch', batched(False)), ('batch concurrent', batched(True))):
+            load()
+            stats = summarize(timed(load, args.repeat))
+            rows.append([mode, stats['p50_ms'], stats['p95_ms']])
+    print(f'{len(SCREEN)} requests per screen, {args.latency_ms} ms per statement, {args.rtt_ms} ms per round trip')
+    print_table(['mode', 'p50 ms', 'p95 ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
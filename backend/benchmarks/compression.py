@@ -0,0 +1,52 @@
+"""Response compression and precompressed page caching.
+
+Reports body size and latency of large JSON lists and of the rendered pages
+(`/`, `/readme` and the Swagger spec) for each content coding. Pages are
+measured both from the precompressed cache and with the cache cleared before
+every request, which is what every hit used to cost.
+
+    python -m benchmarks.compression [--repeat 20]
+"""
+import argparse
+
+from benchmarks import make_app, timed, summarize, print_table
+from flaskr.compression import encodings, get_page_cache
+
+URLS = ('/api/test', '/api/device/reservation', '/', '/readme', '/apispec_1.json')
+PAGES = ('/', '/readme', '/apispec_1.json')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20, help='Timed runs per case')
+    args = parser.parse_args()
+
+    from flaskr.db import gen_mock_data_for_dashboard
+    app = make_app()
+    with app.app_context():
+        gen_mock_data_for_dashboard(num_groups=2, num_tests_per_group=200, random_seed=0)
+    client = app.test_client()
+    cache = get_page_cache(app)
+
+    rows = []
+    for url in URLS:
+        for encoding in ('identity', *encodings()):
+            headers = {'Accept-Encoding': encoding}
+            fetch = lambda: client.get(url, headers=headers)
+            response = fetch()
+            assert response.status_code == 200, (url, response.status_code)
+            size = len(response.get_data())
+            cached = summarize(timed(fetch, args.repeat))
+            if url in PAGES:
+                def uncached():
+                    cache.clear()
+                    fetch()
+                rows.append([url, encoding, size, 'rendered', summarize(timed(uncached, args.repeat))['p50_ms']])
+                rows.append([url, encoding, size, 'cached', cached['p50_ms']])
+            else:
+                rows.append([url, encoding, size, '-', cached['p50_ms']])
+    print_table(['url', 'encoding', 'bytes', 'page', 'p50 ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
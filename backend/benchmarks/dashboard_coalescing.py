@@ -0,0 +1,66 @@
+"""Dashboard stampede: every request computing vs. single-flight coalescing.
+
+Sends bursts of identical `/api/dashboard/<group_id>?compare_time_range=week`
+requests, as when a whole team opens the dashboard at once, while every
+statement is delayed to simulate database latency. Each burst starts with
+an empty result cache, so the coalesced mode runs one computation per burst
+and the other requests wait for it.
+
+    python -m benchmarks.dashboard_coalescing [--clients 32] [--bursts 5] [--latency-ms 5]
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import make_app, simulated_db_latency, count_queries, without_single_flight, summarize, print_table
+
+URL = '/api/dashboard/1?compare_time_range=week'
+
+
+def burst(app, clients):
+    barrier = threading.Barrier(clients)
+
+    def one(_):
+        client = app.test_client()
+        barrier.wait()
+        start = time.perf_counter()
+        response = client.get(URL)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        return list(pool.map(one, range(clients)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=32, help='Concurrent identical requests per burst')
+    parser.add_argument('--bursts', type=int, default=5, help='Bursts per mode')
+    parser.add_argument('--latency-ms', type=float, default=5, help='Simulated latency per statement')
+    args = parser.parse_args()
+
+    from flaskr.services.single_flight import get_flight
+    from flaskr.services.dashboard_snapshot import get_snapshots
+    app = make_app()
+    rows = []
+    with simulated_db_latency(app, args.latency_ms / 1000):
+        for mode in ('every request', 'coalesced'):
+            durations = []
+            with count_queries(app) as queries:
+                for _ in range(args.bursts):
+                    get_flight('dashboard', app).invalidate()
+                    get_snapshots(app).invalidate()
+                    if mode == 'coalesced':
+                        durations += burst(app, args.clients)
+                    else:
+                        with without_single_flight(app):
+                            durations += burst(app, args.clients)
+            stats = summarize(durations)
+            rows.append([mode, queries[0] / args.bursts, stats['p50_ms'], stats['p95_ms']])
+    print(f'{args.clients} clients per burst, {args.bursts} bursts, {args.latency_ms} ms per statement')
+    print_table(['mode', 'queries/burst', 'p50 ms', 'p95 ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Dashboard throughput with sequential vs. concurrent statistic queries.
+
+Serves `/api/dashboard/<group_id>` from a fixed number of worker threads while
+every statement is delayed to simulate database latency, then compares the
+default concurrent mode against `DASHBOARD_CONCURRENT_QUERIES = False`.
+
+    python -m benchmarks.dashboard_concurrency [--workers 4] [--requests 80] [--latency-ms 5]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import make_app, simulated_db_latency, without_single_flight, summarize, print_table
+
+
+def run(app, workers, requests, url):
+    def one(_):
+        client = app.test_client()
+        start = time.perf_counter()
+        response = client.get(url)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        durations = list(pool.map(one, range(requests)))
+    return requests / (time.perf_counter() - start), summarize(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4, help='Number of request worker threads')
+    parser.add_argument('--requests', type=int, default=80, help='Number of requests per mode')
+    parser.add_argument('--latency-ms', type=float, default=5, help='Simulated latency per statement')
+    args = parser.parse_args()
+
+    app = make_app()
+    rows = []
+    # Every request must compute the dashboard, so measure with coalescing off.
+    with simulated_db_latency(app, args.latency_ms / 1000), without_single_flight(app):
+        for url in ('/api/dashboard/1', '/api/dashboard/1?compare_time_range=week'):
+            for concurrent in (False, True):
+                app.config['DASHBOARD_CONCURRENT_QUERIES'] = concurrent
+                throughput, stats = run(app, args.workers, args.requests, url)
+                rows.append([url, 'concurrent' if concurrent else 'sequential', throughput,
+                             stats['p50_ms'], stats['p95_ms']])
+    print(f'{args.workers} workers, {args.requests} requests per mode, {args.latency_ms} ms per statement')
+    print_table(['endpoint', 'mode', 'req/s', 'p50 ms', 'p95 ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
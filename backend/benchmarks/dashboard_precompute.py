@@ -0,0 +1,58 @@
+"""First dashboard request after a quiet period, computed on demand vs. precomputed.
+
+Every SQL statement is delayed by `--latency-ms`. For each round, the
+results of earlier requests are dropped, as after a quiet period longer than
+the single-flight buckets, and `/api/dashboard/<group_id>` is requested
+once per `compare_time_range`. With precomputation, the leader has refreshed
+the snapshots beforehand, as the background worker does every
+`DASHBOARD_PRECOMPUTE_INTERVAL` seconds. Reports the latency of those first
+requests and the statements they ran.
+
+    python -m benchmarks.dashboard_precompute [--rounds 5] [--latency-ms 5]
+"""
+import argparse
+import time
+
+from benchmarks import make_app, simulated_db_latency, count_queries, summarize, print_table
+
+URLS = ('/api/dashboard/1', '/api/dashboard/1?compare_time_range=week', '/api/dashboard/1?compare_time_range=month')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=5, help='Quiet periods per mode')
+    parser.add_argument('--latency-ms', type=float, default=5, help='Simulated latency per statement')
+    args = parser.parse_args()
+
+    from flaskr.services.single_flight import get_flight
+    from flaskr.services.dashboard_snapshot import get_snapshots
+    app = make_app()
+    client = app.test_client()
+    rows = []
+    with simulated_db_latency(app, args.latency_ms / 1000):
+        for mode in ('on demand', 'precomputed'):
+            durations, precompute, total = [], [], 0
+            with count_queries(app) as queries:
+                for _ in range(args.rounds):
+                    get_flight('dashboard', app).invalidate()
+                    get_snapshots(app).invalidate()
+                    if mode == 'precomputed':
+                        with app.app_context():
+                            start = time.perf_counter()
+                            get_snapshots(app).precompute()
+                            precompute.append(time.perf_counter() - start)
+                    queries[0] = 0
+                    for url in URLS:
+                        start = time.perf_counter()
+                        assert client.get(url).status_code == 200
+                        durations.append(time.perf_counter() - start)
+                    total += queries[0]
+            stats = summarize(durations)
+            rows.append([mode, total / (args.rounds * len(URLS)), stats['p50_ms'], stats['p95_ms'],
+                         summarize(precompute)['mean_ms'] if precompute else '-'])
+    print(f'{args.rounds} rounds, {args.latency_ms} ms per statement')
+    print_table(['mode', 'queries/request', 'p50 ms', 'p95 ms', 'precompute pass ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Daily trend of a group: one dashboard query per bucket vs. the series endpoint.
+
+Without `/api/dashboard/<group_id>/series`, a chart of the last `--days` days
+is built bucket by bucket: completed tests, failed tests and reservation time
+are queried for each day, as repeated dashboard calls with a sliding range
+do. The series endpoint returns every bucket, plus a 7-day moving average,
+from one GROUP BY query. Every SQL statement is delayed by `--latency-ms`.
+
+    python -m benchmarks.dashboard_series [--days 30] [--latency-ms 5]
+"""
+import argparse
+import contextlib
+import io
+from datetime import datetime, timedelta
+
+from benchmarks import make_app, simulated_db_latency, count_queries, timed, summarize, print_table
+
+
+def per_bucket(app, group_id, days):
+    from flaskr.controllers.dashboard import get_total_tests_completed, get_test_time
+    from flaskr.db import db, Test, TestStatusEnum
+    end = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    with app.app_context():
+        for day in range(days, 0, -1):
+            start = end - timedelta(days=day)
+            get_total_tests_completed(group_id, start, start + timedelta(days=1))
+            db.session.query(Test).filter(
+                Test.group_id == group_id, Test.status == TestStatusEnum.Failed,
+                Test.created_at >= start, Test.created_at <= start + timedelta(days=1),
+            ).count()
+            get_test_time(group_id, start, start + timedelta(days=1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=30, help='Daily buckets in the chart')
+    parser.add_argument('--groups', type=int, default=2, help='Groups to generate')
+    parser.add_argument('--tests-per-group', type=int, default=300, help='Tests (with reservations) per group')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per mode')
+    parser.add_argument('--latency-ms', type=float, default=5, help='Simulated latency per statement')
+    args = parser.parse_args()
+
+    from flaskr.db import db, Group, gen_mock_data_for_dashboard
+    app = make_app()
+    with app.app_context(), contextlib.redirect_stdout(io.StringIO()):
+        end = datetime.now()
+        gen_mock_data_for_dashboard(start_time=end - timedelta(days=args.days), end_time=end, num_groups=args.groups,
+                                    num_tests_per_group=args.tests_per_group, random_seed=0)
+        group_id = db.session.query(db.func.max(Group.id)).scalar()
+    client = app.test_client()
+    url = f'/api/dashboard/{group_id}/series?granularity=day&moving_average=7&start={(end - timedelta(days=args.days - 1)).date()}'
+    modes = {
+        'query per bucket': lambda: per_bucket(app, group_id, args.days),
+        'series endpoint': lambda: client.get(url),
+    }
+    rows = []
+    with simulated_db_latency(app, args.latency_ms / 1000):
+        for mode, run in modes.items():
+            with count_queries(app) as queries:
+                stats = summarize(timed(run, args.repeat))
+            rows.append([mode, queries[0] // args.repeat, stats['mean_ms'], stats['p95_ms']])
+    print(f'{args.days} daily buckets, {args.latency_ms} ms per statement')
+    print_table(['mode', 'queries', 'mean_ms', 'p95_ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Polling a list endpoint: full refetch vs. `?updated_since=` delta sync.
+
+Seeds a few thousand tests, then simulates a client polling `/api/test`
+while a handful of tests change between polls. Reports the body size and
+latency of refetching the whole list against fetching only the delta.
+
+    python -m benchmarks.delta_sync [--groups 10] [--tests-per-group 300] [--changes 5] [--polls 10]
+"""
+import argparse
+
+from benchmarks import make_app, timed, summarize, print_table
+
+URL = '/api/test'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--groups', type=int, default=10, help='Groups to generate')
+    parser.add_argument('--tests-per-group', type=int, default=300, help='Tests per group')
+    parser.add_argument('--changes', type=int, default=5, help='Tests updated between polls')
+    parser.add_argument('--polls', type=int, default=10, help='Polls per mode')
+    args = parser.parse_args()
+
+    from flaskr.db import db, Test, gen_mock_data_for_dashboard
+    app = make_app()
+    with app.app_context():
+        gen_mock_data_for_dashboard(num_groups=args.groups, num_tests_per_group=args.tests_per_group, random_seed=0)
+    client = app.test_client()
+
+    def change(offset):
+        with app.app_context():
+            tests = db.session.query(Test).order_by(Test.id).offset(offset).limit(args.changes).all()
+            for test in tests:
+                test.description = test.description.removesuffix(' *') if test.description.endswith(' *') \
+                    else f'{test.description[:200]} *'
+            db.session.commit()
+
+    rows = []
+    for mode in ('full', 'delta'):
+        sizes, durations = [], []
+        token = int(client.get(URL).headers['X-Sync-Token'])
+        for poll in range(args.polls):
+            change(poll * args.changes)
+            query = {'updated_since': token} if mode == 'delta' else {}
+            response = None
+
+            def fetch():
+                nonlocal response
+                response = client.get(URL, query_string=query)
+            durations += timed(fetch)
+            assert response.status_code == 200, response.status_code
+            sizes.append(len(response.get_data()))
+            if mode == 'delta':
+                data = response.get_json()
+                assert len(data['items']) == args.changes, len(data['items'])
+                token = data['sync_token']
+        stats = summarize(durations)
+        rows.append([mode, sum(sizes) // len(sizes) // 1024, stats['p50_ms'], stats['p95_ms']])
+    print(f'{args.changes} tests changed between polls, {args.polls} polls per mode')
+    print_table(['mode', 'KiB/poll', 'p50 ms', 'p95 ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Device utilization statistics: Python loops vs. vectorized NumPy.
+
+Generates `--sizes` random reservations spread over `--devices` devices and
+30 days, then computes per-device busy time and idle gaps, the fleet's peak
+concurrency and the hour-of-week heatmap twice: with a loop over sorted
+reservations, as a straightforward implementation would, and with the array
+functions of `flaskr.services.device_utilization`. Database loading is not
+included.
+
+    python -m benchmarks.device_utilization [--sizes 10000 100000 1000000] [--devices 200]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks import print_table
+from flaskr.services.device_utilization import (
+    HOUR, merge_intervals, idle_gaps, concurrency, hour_of_week_heatmap,
+)
+
+SPAN = 30 * 24 * HOUR
+
+
+def generate(size, devices, seed=0):
+    rng = np.random.default_rng(seed)
+    keys = rng.integers(0, devices, size)
+    starts = rng.integers(0, SPAN - HOUR, size)
+    ends = np.minimum(starts + rng.integers(15 * 60, 8 * HOUR, size), SPAN)
+    return keys, starts, ends
+
+
+def with_loops(count, keys, starts, ends):
+    busy, gaps, longest = [0] * count, [0] * count, [0] * count
+    merged = []
+    for key, start, end in sorted(zip(keys.tolist(), starts.tolist(), ends.tolist())):
+        if merged and merged[-1][0] == key and start <= merged[-1][2]:
+            merged[-1][2] = max(merged[-1][2], end)
+        else:
+            merged.append([key, start, end])
+    previous = [0] * count
+    for key, start, end in merged:
+        busy[key] += end - start
+        if start > previous[key]:
+            gaps[key] += 1
+            longest[key] = max(longest[key], start - previous[key])
+        previous[key] = end
+    for key in range(count):
+        if SPAN > previous[key]:
+            gaps[key] += 1
+            longest[key] = max(longest[key], SPAN - previous[key])
+    events = sorted([(start, 1) for _, start, _ in merged] + [(end, -1) for _, _, end in merged])
+    level = peak = 0
+    for _, step in events:
+        level += step
+        peak = max(peak, level)
+    heatmap = [0] * (7 * 24)
+    for _, start, end in merged:
+        t = start
+        while t < end:
+            hour_end = min((t // HOUR + 1) * HOUR, end)
+            heatmap[(t // HOUR + 72) % (7 * 24)] += hour_end - t
+            t = hour_end
+    return busy, peak
+
+
+def vectorized(count, keys, starts, ends):
+    keys, starts, ends = merge_intervals(keys, starts, ends)
+    busy = np.bincount(keys, weights=ends - starts, minlength=count)
+    gap_keys, gap_lengths = idle_gaps(count, keys, starts, ends, 0, SPAN)
+    longest = np.zeros(count, dtype=np.int64)
+    np.maximum.at(longest, gap_keys, gap_lengths)
+    peak, _, _ = concurrency(starts, ends, 0, SPAN)
+    hour_of_week_heatmap(count, starts, ends, 0, SPAN)
+    return busy.tolist(), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000], help='Reservations')
+    parser.add_argument('--devices', type=int, default=200, help='Devices')
+    args = parser.parse_args()
+
+    rows = []
+    for size in args.sizes:
+        data = generate(size, args.devices)
+        timings = []
+        results = []
+        for compute in (with_loops, vectorized):
+            start = time.perf_counter()
+            results.append(compute(args.devices, *data))
+            timings.append((time.perf_counter() - start) * 1000)
+        assert results[0][1] == results[1][1] and np.allclose(results[0][0], results[1][0])
+        rows.append([size, timings[0], timings[1], timings[0] / timings[1]])
+    print_table(['reservations', 'loops_ms', 'numpy_ms', 'speedup'], rows)
+
+
+if __name__ == '__main__':
+    main()
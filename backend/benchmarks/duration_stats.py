@@ -0,0 +1,75 @@
+"""Duration percentiles per method: ORM objects vs. column arrays vs. cached.
+
+Computes p50/p90/p99 and a histogram of reservation durations per method
+three ways: loading `DeviceReservation` objects and their tests and sorting
+durations in Python, as `get_test_time` does for its statistics; loading
+only the `(method, minutes)` columns into NumPy arrays, as
+`get_duration_stats` does on SQLite; and through `/api/dashboard/durations`,
+whose result is reused between requests. Every SQL statement is delayed by
+`--latency-ms`.
+
+    python -m benchmarks.duration_stats [--groups 5] [--tests-per-group 300] [--latency-ms 2]
+"""
+import argparse
+import contextlib
+import io
+import statistics
+from collections import defaultdict
+
+from benchmarks import make_app, simulated_db_latency, count_queries, timed, summarize, print_table
+
+
+def with_objects(app):
+    from flaskr.db import db, DeviceReservation
+    with app.app_context():
+        durations = defaultdict(list)
+        for reservation in db.session.query(DeviceReservation).all():
+            durations[reservation.test.method_id].append(reservation.duration)
+        stats = {}
+        for method_id, values in durations.items():
+            values.sort()
+            cuts = statistics.quantiles(values, n=100, method='inclusive') if len(values) > 1 else values * 99
+            stats[method_id] = (cuts[49], cuts[89], cuts[98])
+        db.session.remove()
+        return stats
+
+
+def with_arrays(app):
+    from flaskr.db import db
+    from flaskr.services.duration_stats import get_duration_stats
+    with app.app_context():
+        stats = get_duration_stats('method', 'all', 20)
+        db.session.remove()
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--groups', type=int, default=5, help='Groups to generate')
+    parser.add_argument('--tests-per-group', type=int, default=300, help='Tests (with reservations) per group')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per mode')
+    parser.add_argument('--latency-ms', type=float, default=2, help='Simulated latency per statement')
+    args = parser.parse_args()
+
+    from flaskr.db import gen_mock_data_for_dashboard
+    app = make_app()
+    with app.app_context(), contextlib.redirect_stdout(io.StringIO()):
+        gen_mock_data_for_dashboard(num_groups=args.groups, num_tests_per_group=args.tests_per_group, random_seed=0)
+    client = app.test_client()
+    modes = {
+        'ORM objects + Python': lambda: with_objects(app),
+        'column arrays + NumPy': lambda: with_arrays(app),
+        'endpoint, cached': lambda: client.get('/api/dashboard/durations?window=all'),
+    }
+    rows = []
+    with simulated_db_latency(app, args.latency_ms / 1000):
+        for mode, run in modes.items():
+            with count_queries(app) as queries:
+                stats = summarize(timed(run, args.repeat))
+            rows.append([mode, queries[0] / args.repeat, stats['mean_ms'], stats['p50_ms']])
+    print(f'{args.groups} groups, {args.latency_ms} ms per statement')
+    print_table(['mode', 'queries', 'mean_ms', 'p50_ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
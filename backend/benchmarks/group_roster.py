@@ -0,0 +1,81 @@
+"""Group member listing: per-user serialization vs. set-based loading.
+
+Builds groups of 10/100/1000 members (each with skills and assigned tests) and
+compares the query count and latency of the legacy per-membership
+`membership.user.serialize` path with the `full` and `roster` views of
+`GET /api/group/<group_id>/user`.
+
+    python -m benchmarks.group_roster [--sizes 10 100 1000] [--repeat 5]
+"""
+import argparse
+
+from werkzeug.security import generate_password_hash
+
+from benchmarks import make_app, count_queries, timed, summarize, print_table
+
+
+def seed_group(size, password):
+    from flaskr.db import get_db, User, Group, BelongsToGroup, UserSkill, Test, AssignedTest
+    db = get_db()
+    group = Group(name=f'Roster {size}', description=f'{size} members', leader_id=1)
+    db.session.add(group)
+    db.session.flush()
+    users = [User(username=f'roster{size}_{i}', email=f'roster{size}_{i}@test.com', password=password, role_id=3)
+             for i in range(size)]
+    db.session.add_all(users)
+    db.session.flush()
+    tests = [Test(display_id=f'R-{i:04d}', group_id=group.id, method_id=1 + i % 3, name=f'Roster test {i}',
+                  status='Pending', description='Roster benchmark test') for i in range(size)]
+    db.session.add_all(tests)
+    db.session.flush()
+    for i, (user, test) in enumerate(zip(users, tests)):
+        db.session.add(BelongsToGroup(user_id=user.id, group_id=group.id))
+        db.session.add(UserSkill(user_id=user.id, skill_id=1 + i % 3))
+        db.session.add(AssignedTest(user_id=user.id, test_id=test.id))
+    db.session.commit()
+    return group.id
+
+
+def legacy(group_id):
+    from flaskr.db import get_db, BelongsToGroup
+    db = get_db()
+    memberships = db.session.query(BelongsToGroup).filter_by(group_id=group_id).all()
+    result = [membership.user.serialize for membership in memberships]
+    db.session.expunge_all()
+    return result
+
+
+def current(group_id, view):
+    from flaskr.db import get_db
+    from flaskr.services.group import get_group_members
+    result = get_group_members(group_id, view=view)
+    get_db().session.expunge_all()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000], help='Group sizes to test')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case')
+    args = parser.parse_args()
+
+    app = make_app()
+    password = generate_password_hash('password')
+    rows = []
+    with app.app_context():
+        for size in args.sizes:
+            group_id = seed_group(size, password)
+            for label, func in (
+                ('legacy', lambda: legacy(group_id)),
+                ('full', lambda: current(group_id, 'full')),
+                ('roster', lambda: current(group_id, 'roster')),
+            ):
+                with count_queries(app) as queries:
+                    func()
+                stats = summarize(timed(func, args.repeat))
+                rows.append([size, label, queries[0], stats['mean_ms'], stats['p95_ms']])
+    print_table(['members', 'path', 'queries', 'mean ms', 'p95 ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Client retries of a reservation: plain POSTs vs. `Idempotency-Key`.
+
+Each simulated client creates one reservation and then retries the same
+POST `--retries` times, as lab clients do after a timeout. Without a key
+every retry runs the write path again and ends in a 409 conflict; with a
+key, retries replay the stored response. Reports statements per client,
+the status codes seen and the latency of a retry.
+
+    python -m benchmarks.idempotent_retries [--clients 50] [--retries 3] [--latency-ms 1]
+"""
+import argparse
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+from benchmarks import make_app, simulated_db_latency, count_queries, timed, summarize, print_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=50, help='Clients, each making one reservation')
+    parser.add_argument('--retries', type=int, default=3, help='Retries per client')
+    parser.add_argument('--latency-ms', type=float, default=1, help='Simulated latency per statement')
+    args = parser.parse_args()
+
+    app = make_app()
+    client = app.test_client()
+    rows = []
+    with simulated_db_latency(app, args.latency_ms / 1000):
+        for offset, mode in enumerate(('plain', 'idempotency key')):
+            statuses = Counter()
+            durations = []
+            with count_queries(app) as queries:
+                for i in range(args.clients):
+                    start = datetime.now() + timedelta(days=1000 + offset * 100, hours=i)
+                    body = {"device_id": 1, "user_id": 1, "test_id": 1, "start_time": start.isoformat(), "duration": 30}
+                    headers = {'Idempotency-Key': str(uuid.uuid4())} if mode != 'plain' else {}
+                    post = lambda: statuses.update([client.post('/api/device/reservation', json=body, headers=headers).status_code])
+                    post()
+                    durations += timed(post, args.retries)
+            stats = summarize(durations)
+            codes = ' '.join(f'{code}x{count}' for code, count in sorted(statuses.items()))
+            rows.append([mode, queries[0] / args.clients, codes, stats['p50_ms']])
+    print(f'{args.clients} clients, {args.retries} retries each, {args.latency_ms} ms per statement')
+    print_table(['mode', 'statements/client', 'statuses', 'retry p50 ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
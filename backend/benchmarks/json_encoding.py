@@ -0,0 +1,64 @@
+"""JSON encoding of large list responses: standard library `json` vs. `orjson`.
+
+Seeds a few thousand tests and reservations, then for the large list
+endpoints reports the response size, the time spent encoding the serialized
+payload alone, and the end-to-end request latency with `JSON_ENCODER = 'json'`
+and `JSON_ENCODER = 'orjson'`.
+
+    python -m benchmarks.json_encoding [--groups 10] [--tests-per-group 300] [--repeat 10]
+"""
+import argparse
+
+from benchmarks import make_app, timed, summarize, print_table
+from flaskr.encoding import ENCODERS
+
+ENDPOINTS = ('/api/test', '/api/device', '/api/device/reservation')
+
+
+def seed(app, groups, tests_per_group):
+    from flaskr.db import gen_mock_data_for_dashboard
+    with app.app_context():
+        gen_mock_data_for_dashboard(num_groups=groups, num_tests_per_group=tests_per_group, random_seed=0)
+
+
+def payload(app, url):
+    """Return the serialized (not yet encoded) data behind a list endpoint."""
+    from flaskr.db import get_db, Test, Device, DeviceReservation
+    with app.app_context():
+        session = get_db().session
+        if url == '/api/test':
+            return [t.serialize for t in session.query(Test).all()]
+        if url == '/api/device':
+            return [d.serialize for d in session.query(Device).all()]
+        return [r.serialize for r in session.query(DeviceReservation).all()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--groups', type=int, default=10, help='Groups to generate')
+    parser.add_argument('--tests-per-group', type=int, default=300, help='Tests (with reservations) per group')
+    parser.add_argument('--repeat', type=int, default=10, help='Timed runs per case')
+    args = parser.parse_args()
+
+    apps = {}
+    for name in sorted(ENCODERS):
+        apps[name] = make_app(JSON_ENCODER=name)
+        seed(apps[name], args.groups, args.tests_per_group)
+
+    rows = []
+    for url in ENDPOINTS:
+        data = payload(apps['json'], url)
+        for name, app in apps.items():
+            encode = ENCODERS[name]
+            size = len(encode(data))
+            encode_stats = summarize(timed(lambda: encode(data), args.repeat))
+            client = app.test_client()
+            client.get(url)  # warm up
+            request_stats = summarize(timed(lambda: client.get(url), args.repeat))
+            rows.append([url, name, len(data), size // 1024, encode_stats['p50_ms'],
+                         request_stats['p50_ms'], request_stats['p95_ms']])
+    print_table(['endpoint', 'encoder', 'items', 'KiB', 'encode p50 ms', 'request p50 ms', 'request p95 ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""A misbehaving script hammering the test name search, with and without rate limiting.
+
+`--clients` threads (all from the same address, like one script) search
+`/api/test?name=...` in a loop, ignoring 429s; `--rtt-ms` simulates the
+network round trip of each request. Each SQL statement takes `--latency-ms`
+and at most `--db-capacity` run at once. Meanwhile a probe requests
+`/api/device/1` every 100 ms. Reports probe latency and how many searches
+were served or limited. A second table shows the cost of one bucket update
+per backend (Redis via `fakeredis`, if installed).
+
+    python -m benchmarks.rate_limiting [--clients 8] [--seconds 5] [--latency-ms 5] [--db-capacity 4] [--rtt-ms 2]
+"""
+import argparse
+import threading
+import time
+from collections import Counter
+
+from benchmarks import make_app, simulated_db_latency, summarize, timed, print_table
+from flaskr.ratelimit import MemoryBackend, RedisBackend
+
+
+def run(app, clients, seconds, rtt):
+    stop = threading.Event()
+    searches = Counter()
+    probe_durations = []
+
+    def hammer():
+        client = app.test_client()
+        while not stop.is_set():
+            searches[client.get('/api/test?name=%25a%25').status_code] += 1
+            time.sleep(rtt)
+
+    def probe():
+        client = app.test_client()
+        while not stop.is_set():
+            start = time.perf_counter()
+            client.get('/api/device/1')
+            probe_durations.append(time.perf_counter() - start)
+            time.sleep(0.1)
+
+    threads = [threading.Thread(target=hammer) for _ in range(clients)] + [threading.Thread(target=probe)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return searches, probe_durations
+
+
+def backends():
+    yield 'memory', MemoryBackend()
+    try:
+        import fakeredis
+        import lupa  # noqa: F401
+    except ImportError:
+        return
+    yield 'redis (fakeredis)', RedisBackend(fakeredis.FakeRedis())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=8, help='Threads hammering the search')
+    parser.add_argument('--seconds', type=float, default=5, help='Duration per mode')
+    parser.add_argument('--latency-ms', type=float, default=5, help='Simulated latency per statement')
+    parser.add_argument('--db-capacity', type=int, default=4, help='Statements the simulated database runs at once')
+    parser.add_argument('--rtt-ms', type=float, default=2, help='Simulated network round trip per search')
+    parser.add_argument('--takes', type=int, default=10000, help='Bucket updates per backend')
+    args = parser.parse_args()
+
+    rows = []
+    for mode, enabled in (('off', False), ('on', True)):
+        # Admission control is off to isolate the effect of rate limiting.
+        app = make_app(RATELIMIT_ENABLED=enabled, ADMISSION_CONTROL=False)
+        with simulated_db_latency(app, args.latency_ms / 1000, args.db_capacity):
+            searches, probes = run(app, args.clients, args.seconds, args.rtt_ms / 1000)
+        stats = summarize(probes)
+        rows.append([mode, searches[200], searches[429], stats['p50_ms'], stats['p95_ms']])
+    print(f'{args.clients} clients searching, {args.latency_ms} ms per statement, '
+          f'{args.db_capacity} statements at once, {args.rtt_ms} ms per round trip, {args.seconds} s per mode')
+    print_table(['rate limit', 'searches 200', 'searches 429', 'probe p50 ms', 'probe p95 ms'], rows)
+    print()
+
+    rows = []
+    for name, backend in backends():
+        durations = timed(lambda: backend.take('bench', 100, 1.0), repeat=args.takes)
+        stats = summarize(durations)
+        rows.append([name, stats['mean_ms'] * 1000, stats['p95_ms'] * 1000])
+    print_table(['backend', 'mean µs', 'p95 µs'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Response size and decode cost of JSON vs. MessagePack, row vs. columnar.
+
+Seeds a few thousand tests and reservations and fetches the bulk list
+endpoints in every combination of `Accept: application/json` /
+`application/msgpack` and `?format=rows` / `?format=columnar`. Reports the
+body size, the request latency and the time a client spends decoding the body.
+
+    python -m benchmarks.response_formats [--groups 10] [--tests-per-group 300] [--repeat 10]
+"""
+import argparse
+import json
+
+import msgpack
+
+from benchmarks import make_app, timed, summarize, print_table
+
+ENDPOINTS = ('/api/test', '/api/device/reservation')
+MODES = (
+    ('json', 'rows', 'application/json', json.loads),
+    ('json', 'columnar', 'application/json', json.loads),
+    ('msgpack', 'rows', 'application/msgpack', msgpack.unpackb),
+    ('msgpack', 'columnar', 'application/msgpack', msgpack.unpackb),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--groups', type=int, default=10, help='Groups to generate')
+    parser.add_argument('--tests-per-group', type=int, default=300, help='Tests (with reservations) per group')
+    parser.add_argument('--repeat', type=int, default=10, help='Timed runs per case')
+    args = parser.parse_args()
+
+    from flaskr.db import gen_mock_data_for_dashboard
+    app = make_app()
+    with app.app_context():
+        gen_mock_data_for_dashboard(num_groups=args.groups, num_tests_per_group=args.tests_per_group, random_seed=0)
+    client = app.test_client()
+
+    rows = []
+    for url in ENDPOINTS:
+        for encoding, shape, mimetype, decode in MODES:
+            fetch = lambda: client.get(url, query_string={'format': shape}, headers={'Accept': mimetype})
+            response = fetch()
+            assert response.status_code == 200, response.status_code
+            assert response.content_type == mimetype
+            body = response.get_data()
+            request_stats = summarize(timed(fetch, args.repeat))
+            decode_stats = summarize(timed(lambda: decode(body), args.repeat))
+            rows.append([url, encoding, shape, len(body) // 1024, request_stats['p50_ms'], decode_stats['p50_ms']])
+    print_table(['endpoint', 'encoding', 'format', 'KiB', 'request p50 ms', 'decode p50 ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
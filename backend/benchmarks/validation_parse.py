@@ -0,0 +1,95 @@
+"""Request body parse cost: per-request `reqparse.RequestParser` vs. precompiled schemas.
+
+For a few write endpoints, compares building a `RequestParser` and calling
+`parse_args()` (what the handlers used to do on every request) with the
+`flaskr.validation` schema the handler uses now. Each iteration runs in a
+fresh request context so JSON decoding is included for both.
+
+    python -m benchmarks.validation_parse [--iterations 5000]
+"""
+import argparse
+import time
+
+from flask_restful import reqparse
+
+from benchmarks import make_app, summarize, print_table
+
+
+def reqparse_create_test():
+    from flaskr.db import TestStatusEnum
+    parser = reqparse.RequestParser()
+    parser.add_argument('name', type=str, required=True, help='Test name is required')
+    parser.add_argument('display_id', type=str, required=True, help='Display ID is required')
+    parser.add_argument('status', type=TestStatusEnum, required=True, help='Status is required. {error_msg}')
+    parser.add_argument('group_id', type=int, required=True, help='Group ID is required')
+    parser.add_argument('method_id', type=int, required=True, help='Method ID is required')
+    parser.add_argument('description', type=str)
+    return parser.parse_args(strict=True)
+
+def reqparse_create_reservation():
+    parser = reqparse.RequestParser()
+    parser.add_argument('device_id', type=int, required=True, help='ID of the device')
+    parser.add_argument('user_id', type=int, required=True, help='ID of the user')
+    parser.add_argument('test_id', type=int, required=False, help='ID of the test')
+    parser.add_argument('start_time', type=str, required=True, help='Start time of the reservation')
+    parser.add_argument('duration', type=int, required=True, help='Duration of the reservation in minutes')
+    return parser.parse_args()
+
+def reqparse_update_device():
+    from flaskr.db import DeviceStatusEnum
+    parser = reqparse.RequestParser()
+    parser.add_argument('name', type=str, required=False, help='Device name {error_msg}', trim=True)
+    parser.add_argument('status', type=DeviceStatusEnum, trim=True, required=False, help='Device status {error_msg}', choices=list(DeviceStatusEnum))
+    parser.add_argument('device_type_id', type=int, required=False, help='Device type ID {error_msg}')
+    parser.add_argument('description', type=str, required=False, help='Device description {error_msg}')
+    parser.add_argument('previous_maintenance_date', type=str, required=False, help='Previous maintenance date in ISO format {error_msg}')
+    parser.add_argument('next_maintenance_date', type=str, required=False, help='Next maintenance date in ISO format {error_msg}')
+    parser.add_argument('position', type=str, trim=True, required=False, help='Device position {error_msg}')
+    return parser.parse_args(strict=True)
+
+
+def cases():
+    from flaskr.controllers.test import CREATE_TEST
+    from flaskr.controllers.device_reservation import CREATE_DEVICE_RESERVATION
+    from flaskr.controllers.device import UPDATE_DEVICE
+    return [
+        ('POST /api/test', {
+            'name': 'Bench', 'display_id': 'B-0001', 'status': 'Pending',
+            'group_id': 1, 'method_id': 1, 'description': 'Benchmark test',
+        }, reqparse_create_test, CREATE_TEST.parse),
+        ('POST /api/device/reservation', {
+            'device_id': 1, 'user_id': 4, 'test_id': 1, 'start_time': '2025-01-01T10:00:00', 'duration': 60,
+        }, reqparse_create_reservation, CREATE_DEVICE_RESERVATION.parse),
+        ('PUT /api/device/<id>', {
+            'name': 'Bench Device', 'status': 'Available', 'position': 'Rack 1',
+        }, reqparse_update_device, UPDATE_DEVICE.parse),
+    ]
+
+
+def measure(app, payload, parse, iterations):
+    durations = []
+    for _ in range(iterations):
+        with app.test_request_context(method='POST', json=payload):
+            start = time.perf_counter()
+            parse()
+            durations.append(time.perf_counter() - start)
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=5000, help='Parses per case and mode')
+    args = parser.parse_args()
+
+    app = make_app(seed=False)
+    rows = []
+    for label, payload, legacy, compiled in cases():
+        for mode, parse in (('reqparse', legacy), ('schema', compiled)):
+            measure(app, payload, parse, 100)  # warm up
+            stats = summarize(measure(app, payload, parse, args.iterations))
+            rows.append([label, mode, stats['mean_ms'] * 1000, stats['p50_ms'] * 1000, stats['p95_ms'] * 1000])
+    print_table(['endpoint', 'parser', 'mean us', 'p50 us', 'p95 us'], rows)
+
+
+if __name__ == '__main__':
+    main()
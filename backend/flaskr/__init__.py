@@ -1,18 +1,26 @@
 import os
-from flask import Flask, render_template, request, g, Response
+from flask import Flask, render_template, request, Response
 from sqlalchemy import URL
 from flasgger import Swagger
 import werkzeug
 import time
-from flaskr import db
+from flaskr import db, admission, ratelimit, encoding, compression, idempotency
+from flaskr.compression import precompressed
+from flaskr.idempotency import idempotent
+from flaskr.validation import swagger_definitions
+from flaskr.services import device_status, events as event_hub, identity_cache, login_activity
+from flaskr.services import catalog as catalog_snapshot, single_flight, batch as batch_requests
+from flaskr.services import dashboard_snapshot, jobs as job_queue
 from flask_restful import Api
 from flask_jwt_extended import JWTManager
+from flaskr.utils import init_query_executor
 
 from flaskr.controllers import (
     auth, group, belongs_to_group, test,
     device, test_report, assigned_test, method,
     skill, device_reservation,
-    device_type, user_skill, dashboard
+    device_type, user_skill, dashboard, events,
+    catalog, batch, jobs
 )
 
 from prometheus_client import (
@@ -32,6 +40,7 @@ def create_app(test_config=None):
     app = Flask(__name__, instance_relative_config=True)
 
     registry = CollectorRegistry()
+    app.extensions['prometheus_registry'] = registry
     # 自動收集 Python process & 主機瞭解的指標（如 CPU / Memory）
     PlatformCollector(registry=registry)
     ProcessCollector(registry=registry)
@@ -52,13 +61,14 @@ def create_app(test_config=None):
         registry=registry
     )
 
+    # Kept in the WSGI environ rather than `g`, which batched sub-requests share.
     @app.before_request
     def _start_timer():
-        g.start_time = time.time()
+        request.environ['flaskr.start_time'] = time.time()
 
     @app.after_request
     def _record_request_data(response):
-        latency = time.time() - g.start_time
+        latency = time.time() - request.environ['flaskr.start_time']
         endpoint = request.endpoint or 'unknown'
         status_code = response.status_code
 
@@ -90,9 +100,25 @@ def create_app(test_config=None):
         app.config.from_mapping(test_config)
     app.config.from_prefixed_env()
 
-    swagger = Swagger(app, template=swagger_template)
+    # Request body schemas declared with flaskr.validation document themselves.
+    swagger = Swagger(app, template={**swagger_template, 'definitions': swagger_definitions()})
     db.init_app(app)
+    admission.init_app(app)
+    ratelimit.init_app(app)
+    encoding.init_app(app, api)
+    compression.init_app(app)
+    idempotency.init_app(app)
     jwt.init_app(app)
+    init_query_executor(app)
+    device_status.init_app(app)
+    event_hub.init_app(app)
+    login_activity.init_app(app)
+    identity_cache.init_app(app)
+    catalog_snapshot.init_app(app)
+    single_flight.init_app(app)
+    dashboard_snapshot.init_app(app, dashboard.build_dashboard)
+    batch_requests.init_app(app)
+    job_queue.init_app(app)
     api.add_resource(auth.UserResource, '/api/user')
     api.add_resource(auth.UserDetailResource, '/api/user/<int:user_id>')
     api.add_resource(auth.UserLoginResource, '/api/login')
@@ -107,6 +133,7 @@ def create_app(test_config=None):
     api.add_resource(test_report.TestReportDetailResource, '/api/test/report/<int:report_id>')
     api.add_resource(assigned_test.AssignedTestByUserResource, '/api/user/<int:user_id>/test')
     api.add_resource(assigned_test.AssignedTestByTestResource, '/api/test/<int:test_id>/user')
+    api.add_resource(assigned_test.AssignedTestInboxResource, '/api/user/<int:user_id>/inbox')
     api.add_resource(method.MethodResource, '/api/method')
     api.add_resource(method.MethodDetailResource, '/api/method/<int:method_id>')
     api.add_resource(skill.SkillResource, '/api/skill')
@@ -116,9 +143,25 @@ def create_app(test_config=None):
     api.add_resource(device_reservation.DeviceReservationResource, '/api/device/reservation')
     api.add_resource(device_reservation.DeviceReservationDetailResource, '/api/device/reservation/<int:reservation_id>')
     api.add_resource(device_type.DeviceTypeResource, '/api/device/type')
+    api.add_resource(jobs.JobResource, '/api/jobs')
+    api.add_resource(jobs.JobDetailResource, '/api/jobs/<int:job_id>')
+
+    # Clients retry these writes on timeouts; a retry with the same Idempotency-Key gets the stored response.
+    for resource in (test.TestResource, test_report.TestReportResource, device_reservation.DeviceReservationResource,
+                     jobs.JobResource):
+        endpoint = resource.__name__.lower()
+        app.view_functions[endpoint] = idempotent(app.view_functions[endpoint])
+
+    # The generated API spec only changes with the code, so keep it for the process lifetime.
+    for spec in swagger.config['specs']:
+        endpoint = f"{swagger.config.get('endpoint', 'flasgger')}.{spec['endpoint']}"
+        app.view_functions[endpoint] = precompressed()(app.view_functions[endpoint])
 
     # register dashboard blueprint
     app.register_blueprint(dashboard.dashboard_bp, url_prefix='/api/dashboard')
+    app.register_blueprint(events.events_bp, url_prefix='/api/events')
+    app.register_blueprint(catalog.catalog_bp, url_prefix='/api/catalog')
+    app.register_blueprint(batch.batch_bp, url_prefix='/api/batch')
 
     # ensure the instance folder exists
     try:
@@ -131,13 +174,17 @@ def create_app(test_config=None):
     def hello():
         return 'Hello, World!'
     
+    templates = os.path.join(os.path.dirname(__file__), 'templates')
+
     @app.route('/')
+    @precompressed(os.path.join(templates, 'index.html'), os.path.join(templates, 'layout.html'))
     def index():
-        with open(os.path.join(os.path.dirname(__file__), 'templates', 'index.html'), 'r') as f:
+        with open(os.path.join(templates, 'index.html'), 'r') as f:
             content = f.read()
         return render_template("layout.html", content=content)
 
     @app.route('/readme')
+    @precompressed('README.md', os.path.join(templates, 'layout.html'))
     def readme():
         import markdown
         with open('README.md', 'r') as f:
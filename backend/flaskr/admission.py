@@ -0,0 +1,224 @@
+"""Adaptive admission control.
+
+Every API request belongs to a class. In decreasing priority:
+`auth` (logins), `reservation_write`, `write`, `read` and `dashboard`.
+A request is admitted while the number of API requests in flight is below
+its class's share of the current limit (`ADMISSION_SHARES`). As the server
+fills up, dashboards are turned away first, then reads, then other writes,
+and logins last. A rejected request gets an immediate 503 with
+`Retry-After: ADMISSION_RETRY_AFTER`, instead of waiting behind a slow
+database.
+
+The limit follows database latency (AIMD). Every `ADMISSION_INTERVAL`
+seconds, if the moving average of statement latency is above
+`ADMISSION_TARGET_LATENCY_MS`, the limit is multiplied by
+`ADMISSION_BACKOFF`; otherwise it grows by one. It stays between
+`ADMISSION_MIN_LIMIT` and `ADMISSION_MAX_LIMIT`.
+
+Pages, `/metrics`, event streams and batch requests themselves are never
+limited; the sub-requests of a batch are, one by one.
+"""
+import threading
+import time
+from collections import Counter
+from flask import current_app, request
+from prometheus_client import Counter as PrometheusCounter
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+
+from flaskr.db import db
+
+CLASSES = ('auth', 'reservation_write', 'write', 'read', 'dashboard')
+DEFAULT_SHARES = {'auth': 1.0, 'reservation_write': 0.9, 'write': 0.8, 'read': 0.7, 'dashboard': 0.4}
+# Long-lived or merely dispatching other requests.
+EXEMPT_ENDPOINTS = ('events.events', 'batch.batch')
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Weight of the latest statement in the latency moving average.
+LATENCY_SMOOTHING = 0.1
+ENVIRON_KEY = 'flaskr.admission_class'
+
+
+def classify() -> str:
+    """Return the admission class of the current request."""
+    if request.endpoint == 'userloginresource':
+        return 'auth'
+    if request.blueprint == 'dashboard':
+        return 'dashboard'
+    if request.method in SAFE_METHODS:
+        return 'read'
+    if request.endpoint in ('devicereservationresource', 'devicereservationdetailresource'):
+        return 'reservation_write'
+    return 'write'
+
+
+class AdmissionController:
+    """Limits API requests in flight, see the module docstring."""
+    def __init__(self, shares: dict = None, initial_limit: float = 100, min_limit: float = 10,
+                 max_limit: float = 400, target_latency: float = 0.05, backoff: float = 0.7,
+                 interval: float = 1, retry_after: int = 1, shed_counter: PrometheusCounter = None):
+        self.shares = shares or DEFAULT_SHARES
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.interval = interval
+        self.retry_after = retry_after
+        self.shed_counter = shed_counter
+        self._lock = threading.Lock()
+        self._in_flight = Counter()  # class -> requests
+        self._total = 0
+        self._latency = None         # moving average, seconds
+        self._samples = 0            # statements observed since the last adjustment
+        self._adjusted_at = time.monotonic()
+
+    def try_acquire(self, cls: str) -> bool:
+        """Admit a request of class `cls`, or count it as shed and return False."""
+        with self._lock:
+            self._adjust(time.monotonic())
+            if self._total >= max(1, self.limit * self.shares[cls]):
+                admitted = False
+            else:
+                self._total += 1
+                self._in_flight[cls] += 1
+                admitted = True
+        if not admitted and self.shed_counter is not None:
+            self.shed_counter.labels(**{'class': cls}).inc()
+        return admitted
+
+    def release(self, cls: str):
+        with self._lock:
+            self._total -= 1
+            self._in_flight[cls] -= 1
+
+    def observe(self, seconds: float):
+        """Record the duration of one database statement."""
+        with self._lock:
+            if self._latency is None:
+                self._latency = seconds
+            else:
+                self._latency += LATENCY_SMOOTHING * (seconds - self._latency)
+            self._samples += 1
+
+    def _adjust(self, now: float):
+        # Caller holds self._lock.
+        if now - self._adjusted_at < self.interval:
+            return
+        self._adjusted_at = now
+        if not self._samples:
+            return
+        self._samples = 0
+        if self._latency > self.target_latency:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'limit': self.limit,
+                'latency': self._latency or 0.0,
+                'in_flight': {cls: self._in_flight[cls] for cls in CLASSES},
+            }
+
+
+class AdmissionCollector:
+    """Prometheus collector exporting the current limit, requests in flight and database latency."""
+    def __init__(self, app):
+        self.app = app
+
+    def describe(self):
+        yield GaugeMetricFamily('flaskr_admission_limit', 'Current limit of API requests in flight')
+        yield GaugeMetricFamily('flaskr_admission_in_flight', 'API requests in flight', labels=['class'])
+        yield GaugeMetricFamily('flaskr_admission_db_latency_seconds', 'Moving average of database statement latency')
+
+    def collect(self):
+        stats = get_controller(self.app).stats()
+        yield GaugeMetricFamily('flaskr_admission_limit', 'Current limit of API requests in flight', value=stats['limit'])
+        in_flight = GaugeMetricFamily('flaskr_admission_in_flight', 'API requests in flight', labels=['class'])
+        for cls, count in stats['in_flight'].items():
+            in_flight.add_metric([cls], count)
+        yield in_flight
+        yield GaugeMetricFamily('flaskr_admission_db_latency_seconds', 'Moving average of database statement latency',
+                                value=stats['latency'])
+
+
+def _admit():
+    """`before_request` hook rejecting API requests over their class's share of the limit."""
+    if not request.path.startswith('/api/') or request.endpoint in EXEMPT_ENDPOINTS:
+        return None
+    controller = get_controller()
+    cls = classify()
+    if controller.try_acquire(cls):
+        request.environ[ENVIRON_KEY] = cls
+        return None
+    return ({"message": "The server is overloaded, please retry later"}, 503,
+            {'Retry-After': str(controller.retry_after)})
+
+def _release(exc=None):
+    cls = request.environ.pop(ENVIRON_KEY, None)
+    if cls is not None:
+        get_controller().release(cls)
+
+def _track_latency(engine, controller):
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('flaskr_admission_started', []).append(time.perf_counter())
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('flaskr_admission_started')
+        if started:
+            controller.observe(time.perf_counter() - started.pop())
+
+    def failed(context):
+        # A failed statement never reaches after_cursor_execute.
+        started = context.connection.info.get('flaskr_admission_started') if context.connection else None
+        if started:
+            started.pop()
+
+    event.listen(engine, 'before_cursor_execute', before)
+    event.listen(engine, 'after_cursor_execute', after)
+    event.listen(engine, 'handle_error', failed)
+
+def get_controller(app=None) -> AdmissionController:
+    """Return the admission controller of the given (or current) app."""
+    app = app or current_app
+    return app.extensions['admission']
+
+def init_app(app):
+    """Attach the admission controller to the app and its database engine.
+
+    Call after `db.init_app`, so the engine exists.
+    """
+    app.config.setdefault('ADMISSION_CONTROL', True)
+    app.config.setdefault('ADMISSION_SHARES', DEFAULT_SHARES)
+    app.config.setdefault('ADMISSION_INITIAL_LIMIT', 100)
+    app.config.setdefault('ADMISSION_MIN_LIMIT', 10)
+    app.config.setdefault('ADMISSION_MAX_LIMIT', 400)
+    app.config.setdefault('ADMISSION_TARGET_LATENCY_MS', 50)
+    app.config.setdefault('ADMISSION_BACKOFF', 0.7)
+    app.config.setdefault('ADMISSION_INTERVAL', 1)  # seconds
+    app.config.setdefault('ADMISSION_RETRY_AFTER', 1)  # seconds
+    if not app.config['ADMISSION_CONTROL']:
+        return
+    shed_counter = None
+    registry = app.extensions.get('prometheus_registry')
+    if registry is not None:
+        shed_counter = PrometheusCounter('flaskr_admission_shed', 'API requests rejected by admission control',
+                                         ['class'], registry=registry)
+    controller = app.extensions['admission'] = AdmissionController(
+        shares={**DEFAULT_SHARES, **app.config['ADMISSION_SHARES']},
+        initial_limit=app.config['ADMISSION_INITIAL_LIMIT'],
+        min_limit=app.config['ADMISSION_MIN_LIMIT'],
+        max_limit=app.config['ADMISSION_MAX_LIMIT'],
+        target_latency=app.config['ADMISSION_TARGET_LATENCY_MS'] / 1000,
+        backoff=app.config['ADMISSION_BACKOFF'],
+        interval=app.config['ADMISSION_INTERVAL'],
+        retry_after=app.config['ADMISSION_RETRY_AFTER'],
+        shed_counter=shed_counter,
+    )
+    if registry is not None:
+        registry.register(AdmissionCollector(app))
+    with app.app_context():
+        _track_latency(db.engine, controller)
+    app.before_request(_admit)
+    app.teardown_request(_release)
@@ -0,0 +1,226 @@
+"""Response compression.
+
+`init_app` registers an `after_request` hook compressing responses for
+clients that send `Accept-Encoding`: brotli when the `brotli` package is
+installed and accepted, gzip otherwise.
+
+- Buffered responses are compressed only from `COMPRESS_MIN_SIZE` bytes.
+- Streamed responses are compressed chunk by chunk and flushed after each
+  chunk, so the client still receives data as it is produced.
+- Only the mimetypes in `COMPRESS_MIMETYPES` are compressed. Server-sent
+  events are never compressed.
+
+Pages that are rendered from files on disk can be wrapped with
+`precompressed`. The page is then rendered and compressed once per encoding,
+and rendered again only when the modification time of one of its source
+files changes.
+"""
+import functools
+import hashlib
+import os
+import threading
+import zlib
+from flask import current_app, make_response, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+DEFAULT_MIMETYPES = (
+    'application/json', 'application/msgpack', 'application/x-msgpack',
+    'text/html', 'text/plain', 'text/css', 'text/csv', 'application/javascript',
+)
+# Never compressed, even if listed: proxies and browsers buffer compressed event streams.
+UNCOMPRESSED_MIMETYPES = ('text/event-stream',)
+
+
+def encodings() -> tuple:
+    """Return the supported content codings, most preferred first."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def choose_encoding():
+    """Return the content coding to use for the current request, or None."""
+    if not request.accept_encodings:
+        return None
+    return request.accept_encodings.best_match(encodings())
+
+
+class _Compressor:
+    """Incremental gzip or brotli compressor with a common interface."""
+    def __init__(self, encoding: str, config):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._brotli = brotli.Compressor(quality=config['COMPRESS_BROTLI_QUALITY'])
+        else:
+            # wbits=31 writes the gzip header and trailer.
+            self._zlib = zlib.compressobj(config['COMPRESS_GZIP_LEVEL'], zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == 'br':
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def flush(self) -> bytes:
+        """Return everything compressed so far, keeping the stream open."""
+        if self.encoding == 'br':
+            return self._brotli.flush()
+        return self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == 'br':
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+def compress(data: bytes, encoding: str, config=None) -> bytes:
+    """Compress a whole body."""
+    compressor = _Compressor(encoding, config or current_app.config)
+    return compressor.compress(data) + compressor.finish()
+
+def _compress_stream(chunks, compressor):
+    try:
+        for chunk in chunks:
+            data = compressor.compress(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def _set_encoding(response, encoding: str):
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    # The compressed body is not byte-identical to the uncompressed one.
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+def compress_response(response):
+    """`after_request` hook compressing the response if the client accepts it."""
+    config = current_app.config
+    if (request.method == 'HEAD'
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.direct_passthrough
+            or response.mimetype in UNCOMPRESSED_MIMETYPES
+            or response.mimetype not in config['COMPRESS_MIMETYPES']):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding()
+    if encoding is None:
+        return response
+    if response.is_streamed:
+        response.response = _compress_stream(response.iter_encoded(), _Compressor(encoding, config))
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < config['COMPRESS_MIN_SIZE']:
+            return response
+        response.set_data(compress(data, encoding, config))
+    _set_encoding(response, encoding)
+    return response
+
+
+class _Page:
+    """A rendered page and its compressed variants."""
+    def __init__(self, stamp, body: bytes, mimetype: str):
+        self.stamp = stamp
+        self.mimetype = mimetype
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.variants = {None: body}
+
+    def variant(self, encoding, config) -> bytes:
+        body = self.variants.get(encoding)
+        if body is None:
+            # Compressing the same page twice under a race is harmless.
+            body = self.variants[encoding] = compress(self.variants[None], encoding, config)
+        return body
+
+
+class PageCache:
+    """Rendered pages keyed by endpoint and view arguments, invalidated by source mtimes."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pages = {}
+
+    def get(self, key, stamp):
+        with self._lock:
+            page = self._pages.get(key)
+        return page if page is not None and page.stamp == stamp else None
+
+    def put(self, key, stamp, response) -> _Page:
+        page = _Page(stamp, response.get_data(), response.mimetype)
+        with self._lock:
+            self._pages[key] = page
+        return page
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pages)
+
+
+def _stamp(sources) -> tuple:
+    stamp = []
+    for path in sources:
+        try:
+            stamp.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+def precompressed(*sources):
+    """Cache a view's `200` responses in compressed form until one of `sources` is modified.
+
+    `sources` are file paths; without any, the page is cached for the
+    lifetime of the process.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_page_cache()
+            key = (request.endpoint, tuple(sorted(kwargs.items())))
+            stamp = _stamp(sources)
+            page = cache.get(key, stamp)
+            if page is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                page = cache.put(key, stamp, response)
+            return _page_response(page)
+        return wrapper
+    return decorator
+
+def _page_response(page: _Page):
+    config = current_app.config
+    encoding = choose_encoding()
+    if len(page.variants[None]) < config['COMPRESS_MIN_SIZE']:
+        encoding = None
+    response = current_app.response_class(page.variant(encoding, config), mimetype=page.mimetype)
+    response.vary.add('Accept-Encoding')
+    if encoding is None:
+        response.set_etag(page.etag)
+    else:
+        response.headers['Content-Encoding'] = encoding
+        response.set_etag(f'{page.etag}-{encoding}')
+    return response.make_conditional(request)
+
+
+def get_page_cache(app=None) -> PageCache:
+    """Return the page cache of the given (or current) app."""
+    app = app or current_app
+    return app.extensions['page_cache']
+
+def init_app(app):
+    """Register response compression and the precompressed page cache."""
+    app.config.setdefault('COMPRESS_MIN_SIZE', 500)  # bytes
+    app.config.setdefault('COMPRESS_GZIP_LEVEL', 6)
+    app.config.setdefault('COMPRESS_BROTLI_QUALITY', 4)
+    app.config.setdefault('COMPRESS_MIMETYPES', DEFAULT_MIMETYPES)
+    app.extensions['page_cache'] = PageCache()
+    app.after_request(compress_response)
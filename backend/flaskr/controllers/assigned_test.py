@@ -1,4 +1,15 @@
-from flask_restful import Resource, reqparse
+from flask_restful import Resource
+from flask import request
+from flaskr.validation import Schema, Field
+
+CREATE_ASSIGNED_TEST_BY_USER = Schema('CreateAssignedTestByUserSchema', {
+    'test_id': Field(int, required=True, help='Test ID is required', example=1),
+    'status': Field(str, required=True, help='Status is required', example='Pending'),
+})
+
+CREATE_ASSIGNED_TEST_BY_TEST = Schema('CreateAssignedTestByTestSchema', {
+    'user_id': Field(int, required=True, help='User ID is required', example=4),
+})
 
 class AssignedTestByUserResource(Resource):
     """Resource for managing assigned tests by user."""
@@ -65,14 +76,6 @@ class AssignedTestByUserResource(Resource):
             - AssignedTest
             - User
             - Test
-        definitions:
-            CreateAssignedTestByUserSchema:
-                type: object
-                properties:
-                    test_id:
-                        type: integer
-                    status:
-                        type: string
         parameters:
             - name: user_id
               in: path
@@ -106,10 +109,7 @@ class AssignedTestByUserResource(Resource):
                             type: string
                             example: "Assigned test already exists"
         """
-        parser = reqparse.RequestParser()
-        parser.add_argument('test_id', type=int, required=True, help='Test ID is required')
-        parser.add_argument('status', type=str, required=True, help='Status is required')
-        args = parser.parse_args(strict=True)
+        args = CREATE_ASSIGNED_TEST_BY_USER.parse()
         from flaskr.db import get_db, AssignedTest
         try:
             db = get_db()
@@ -173,12 +173,6 @@ class AssignedTestByTestResource(Resource):
         tags:
             - AssignedTest
             - Test
-        definitions:
-            CreateAssignedTestByTestSchema:
-                type: object
-                properties:
-                    user_id:
-                        type: integer
         parameters:
             - name: test_id
               in: path
@@ -212,9 +206,7 @@ class AssignedTestByTestResource(Resource):
                             type: string
                             example: "Assigned test already exists"
         """
-        parser = reqparse.RequestParser()
-        parser.add_argument('user_id', type=int, required=True, help='User ID is required')
-        args = parser.parse_args(strict=True)
+        args = CREATE_ASSIGNED_TEST_BY_TEST.parse()
         from flaskr.db import get_db, AssignedTest
         try:
             db = get_db()
@@ -230,3 +222,104 @@ class AssignedTestByTestResource(Resource):
                 return {"message": "Assigned test already exists"}, 409
             return {"message": str(e)}, 500
 
+
+class AssignedTestInboxResource(Resource):
+    """Resource for a user's inbox: assigned tests, upcoming reservations and pending reports."""
+
+    def get(self, user_id):
+        """Retrieve a user's inbox in a single request.
+        ---
+        tags:
+            - AssignedTest
+            - User
+            - Test
+        definitions:
+            InboxResponseSchema:
+                type: object
+                properties:
+                    tests:
+                        type: array
+                        items:
+                            $ref: '#/definitions/TestResponseSchema'
+                    total:
+                        type: integer
+                        description: Number of assigned tests matching the status filter.
+                    reservations:
+                        type: array
+                        description: Current and upcoming reservations made by the user, soonest first.
+                        items:
+                            $ref: '#/definitions/DeviceReservationResponseSchema'
+                    pending_reports:
+                        type: array
+                        description: The user's reports that are still awaiting review.
+                        items:
+                            $ref: '#/definitions/TestReportResponseSchema'
+        parameters:
+            - name: user_id
+              in: path
+              type: integer
+              required: true
+              description: The user ID.
+            - name: status
+              in: query
+              type: array
+              items:
+                  type: string
+                  enum: ["Pending", "InProgress", "Completed", "Failed", "Cancelled"]
+              collectionFormat: csv
+              required: false
+              description: Only include assigned tests with these statuses.
+            - name: sort
+              in: query
+              type: string
+              enum: ["-created_at", "created_at"]
+              required: false
+              description: Sort assigned tests by creation time, newest first by default.
+            - name: page
+              in: query
+              type: integer
+              required: false
+              description: 1-based page of assigned tests. If omitted, all matching tests are returned.
+            - name: per_page
+              in: query
+              type: integer
+              required: false
+              description: Page size when `page` is given (default 50, max 500).
+        responses:
+            200:
+                description: The user's inbox.
+                schema:
+                    $ref: '#/definitions/InboxResponseSchema'
+            400:
+                description: Invalid query parameters.
+                schema:
+                    type: object
+                    properties:
+                        message:
+                            type: string
+                            example: "Invalid status: Done. Must be one of Pending, InProgress, Completed, Failed, Cancelled"
+            404:
+                description: User not found.
+                schema:
+                    type: object
+                    properties:
+                        message:
+                            type: string
+                            example: "User not found"
+        """
+        from flaskr.services.inbox import get_user_inbox
+        page = request.args.get('page', type=int)
+        per_page = request.args.get('per_page', 50, type=int)
+        if (page is not None and page < 1) or not 1 <= per_page <= 500:
+            return {'message': 'Invalid pagination parameters'}, 400
+        statuses = [s for value in request.args.getlist('status') for s in value.split(',') if s]
+        try:
+            inbox = get_user_inbox(
+                user_id, statuses=statuses, sort=request.args.get('sort', '-created_at'),
+                page=page, per_page=per_page,
+            )
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        if inbox is None:
+            return {'message': 'User not found'}, 404
+        return inbox, 200
@@ -1,5 +1,5 @@
 from typing import overload
-from flask_restful import Resource, reqparse
+from flask_restful import Resource
 import functools
 from flask import (
     Blueprint, flash, g, redirect, render_template, request, session, url_for, jsonify
@@ -16,24 +16,33 @@ from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from logging import getLogger
 import traceback
 # from flaskr.utils import jwt_identity_matches_user_id, role_required
+from ..validation import Schema, Field
+from ..services.sync import current_token, updated_since, delta
 
 logger = getLogger(__name__)
 
+CREATE_USER = Schema('CreateUserSchema', {
+    'username': Field(str, required=True, help='Username cannot be blank', example='johndoe'),
+    'password': Field(str, required=True, help='Password cannot be blank', example='password123'),
+    'email': Field(str, required=True, help='Email cannot be blank', example='admin@test.com'),
+    'role_id': Field(int, required=True, help='Role ID cannot be blank', example=1),
+    'skill_ids': Field(list, items=int, help='List of skills for the user {error_msg}', example=[1]),
+})
+
+UPDATE_USER = Schema('UpdateUserSchema', {
+    'username': Field(str, help='Username cannot be blank', example='johndoe'),
+    'password': Field(str, help='Password cannot be blank', example='password123'),
+    'email': Field(str, help='Email cannot be blank', example='admin@test.com'),
+    'role_id': Field(int, help='Role ID cannot be blank', example=1),
+    'skill_ids': Field(list, items=int, help='List of skill IDs for the user {error_msg}', example=[1]),
+})
+
+LOGIN = Schema('LoginSchema', {
+    'username': Field(str, required=True, help='Username cannot be blank', example='johndoe'),
+    'password': Field(str, required=True, help='Password cannot be blank', example='password123'),
+}, strict=False)
+
 class UserResource(Resource):
-    def __init__(self):
-        self.parser = reqparse.RequestParser()
-        self.parser.add_argument(
-            'username', type=str, required=True, help='Username cannot be blank')
-        self.parser.add_argument(
-            'password', type=str, required=True, help='Password cannot be blank')
-        self.parser.add_argument(
-            'email', type=str, required=True, help='Email cannot be blank')
-        self.parser.add_argument(
-            'role_id', type=int, required=True, help='Role ID cannot be blank')
-        self.parser.add_argument(
-            'skill_ids', type=list, location='json', required=False,
-            help='List of skills for the user {error_msg}'
-        )
     @jwt_required()
     def post(self):
         """
@@ -44,46 +53,6 @@ class UserResource(Resource):
         tags:
           - User
         definitions:
-          CreateUserSchema: 
-            type: object
-            properties:
-              username:
-                type: string
-                example: johndoe
-              password:
-                type: string
-                example: password123
-              email:
-                type: string
-                example: admin@test.com
-              role_id:
-                type: integer
-                example: 1
-              skill_ids:
-                type: array
-                items:
-                  type: integer
-                  example: 1
-          UpdateUserSchema:
-            type: object
-            properties:
-              username:
-                type: string
-                example: johndoe
-              password:
-                type: string
-                example: password123
-              email:
-                type: string
-                example: admin@test.com
-              role_id:
-                type: integer
-                example: 1
-              skill_ids:
-                type: array
-                items:
-                  type: integer
-                  example: 1
           UserResponseSchema:
             type: object
             properties:
@@ -179,7 +148,7 @@ class UserResource(Resource):
             schema:
                 $ref: '#/definitions/UserResponseSchema'
         """
-        args = self.parser.parse_args(strict=True)
+        args = CREATE_USER.parse()
         try:
             user = create(
                 args['username'], args['password'], args['email'], args['role_id'], args['skill_ids'])
@@ -216,9 +185,18 @@ For privacy and security reasons, only if the email is fully matched, it will be
             type: string
             required: false
             description: Search term to filter users by username or email
+          - in: query
+            name: updated_since
+            type: integer
+            required: false
+            description: "A `sync_token` from a previous response. Returns only the users created or changed since then, plus the IDs of deleted ones."
         responses:
           200:
-            description: A list of users
+            description: A list of users, or a `DeltaSyncSchema` object with `updated_since`.
+            headers:
+              X-Sync-Token:
+                type: integer
+                description: Pass as `updated_since` to fetch only later changes.
             schema:
               type: array
               items:
@@ -233,11 +211,16 @@ For privacy and security reasons, only if the email is fully matched, it will be
                   example: Missing Authorization Header
         """
         current_app.logger.info(f"Fetching users with args")
+        since = updated_since()
         try:
-            users = get_all_users(query=request.args.get('search', None))
+            token = current_token()
+            users = get_all_users(query=request.args.get('search', None), updated_since=since)
             current_app.logger.info(f"Fetched users: {users}")
+            if since is not None:
+                from ..db import User
+                return delta(User, [u.serialize for u in users], since, token), 200
             if users:
-                return {'users': [u.serialize for u in users]}, 200
+                return {'users': [u.serialize for u in users]}, 200, {'X-Sync-Token': str(token)}
             else:
                 return {'message': 'No users found'}, 404
 
@@ -246,20 +229,6 @@ For privacy and security reasons, only if the email is fully matched, it will be
             return {'message': 'Internal server error'}, 500
 
 class UserDetailResource(Resource):
-    def __init__(self):
-        self.parser = reqparse.RequestParser()
-        self.parser.add_argument(
-            'username', type=str, required=False, help='Username cannot be blank')
-        self.parser.add_argument(
-            'password', type=str, required=False, help='Password cannot be blank')
-        self.parser.add_argument(
-            'email', type=str, required=False, help='Email cannot be blank')
-        self.parser.add_argument(
-            'role_id', type=int, required=False, help='Role ID cannot be blank')
-        self.parser.add_argument(
-            'skill_ids', type=list, location='json', required=False,
-            help='List of skill IDs for the user {error_msg}'
-        )
     @jwt_required()
     def put(self, user_id: int):
         """
@@ -320,7 +289,7 @@ If you want to update the user's tests, you need to use the `/users/<user_id>/te
                   type: string
                   example: Invalid input
         """
-        args = self.parser.parse_args(strict=True)
+        args = UPDATE_USER.parse()
         try:
             if all(arg is None for arg in args.values()):
                 return {'message': 'No fields to update'}, 400
@@ -429,12 +398,6 @@ If you want to update the user's tests, you need to use the `/users/<user_id>/te
             return {'message': 'Internal server error'}, 500
 
 class UserLoginResource(Resource):
-    def __init__(self):
-        self.parser = reqparse.RequestParser()
-        self.parser.add_argument(
-            'username', type=str, required=True, help='Username cannot be blank')
-        self.parser.add_argument(
-            'password', type=str, required=True, help='Password cannot be blank')
 
     def post(self):
         """
@@ -452,14 +415,7 @@ class UserLoginResource(Resource):
             type: object
             required: true
             schema:
-              type: object
-              properties:
-                username:
-                  type: string
-                  example: johndoe
-                password:
-                  type: string
-                  example: password123
+              $ref: '#/definitions/LoginSchema'
         responses:
           200:
             description: Login successful
@@ -481,7 +437,7 @@ class UserLoginResource(Resource):
                   type: string
                   example: Invalid credentials
         """
-        args = self.parser.parse_args()
+        args = LOGIN.parse()
         try:
             user = authenticate(args['username'], args['password'])
             token = generate_jwt_token(user)
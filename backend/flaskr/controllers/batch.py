@@ -0,0 +1,119 @@
+from flask import Blueprint, current_app
+from flask_jwt_extended import verify_jwt_in_request
+from flaskr.validation import Schema, Field
+
+batch_bp = Blueprint('batch', __name__)
+
+METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+
+def _boolean(value):
+    if not isinstance(value, bool):
+        raise ValueError('Must be true or false')
+    return value
+
+def _method(value):
+    return str(value).upper()
+
+def _api_path(value):
+    if not isinstance(value, str) or not value.startswith('/api/'):
+        raise ValueError('Must be a path starting with /api/')
+    return value
+
+def _object(value):
+    if not isinstance(value, dict):
+        raise ValueError('Must be an object')
+    return value
+
+def _array(value):
+    if not isinstance(value, list):
+        raise ValueError('Must be an array')
+    return value
+
+BATCH = Schema('BatchRequestSchema', {
+    'requests': Field(_array, required=True, nullable=False, items=dict,
+                      description='Sub-requests, see `BatchSubRequestSchema`.'),
+    'concurrent': Field(_boolean, default=False, description='Run consecutive GET sub-requests concurrently.'),
+})
+
+SUB_REQUEST = Schema('BatchSubRequestSchema', {
+    'method': Field(_method, default='GET', choices=METHODS, example='GET'),
+    'path': Field(_api_path, required=True, nullable=False, example='/api/group/1',
+                  description='Path of an API endpoint, optionally with a query string.'),
+    'query': Field(_object, description='Query parameters.', example={'group_id': 1}),
+    'headers': Field(_object, description='Headers added to those of the batch request.'),
+    'body': Field(_object, description='JSON body.'),
+})
+
+
+@batch_bp.route('', methods=['POST'])
+def batch():
+    """Run several API requests in one round trip.
+    <h3>Execution</h3>
+    Sub-requests run in order, in the app context and database session of the batch request.
+    Each one is handled exactly as if it had been sent on its own, with the headers of the batch
+    request, e.g. `Authorization`, plus its own. The token is verified once for the whole batch.
+    A failing sub-request does not stop the others: check the `status` of each response.
+
+    With `concurrent`, consecutive GET sub-requests run concurrently, each in its own database
+    session. Other sub-requests wait for the reads before them, so that later reads see their writes.
+    At most `BATCH_MAX_REQUESTS` sub-requests are accepted; event streams cannot be batched.
+
+    ---
+    tags:
+        - Batch
+    parameters:
+        - in: body
+          name: body
+          required: true
+          schema:
+            $ref: '#/definitions/BatchRequestSchema'
+    definitions:
+        BatchSubResponseSchema:
+            type: object
+            properties:
+                status:
+                    type: integer
+                headers:
+                    type: object
+                body:
+                    description: The decoded JSON body, or the body as text.
+        BatchResponseSchema:
+            type: object
+            properties:
+                responses:
+                    type: array
+                    description: One response per sub-request, in order.
+                    items:
+                        $ref: '#/definitions/BatchSubResponseSchema'
+    responses:
+        200:
+            description: The responses of the sub-requests.
+            schema:
+                $ref: '#/definitions/BatchResponseSchema'
+        400:
+            description: Invalid batch.
+        401:
+            description: The given token is invalid or expired.
+    """
+    from flask import request
+    from flaskr.services.batch import run_batch
+    verify_jwt_in_request(optional=True)
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return {"message": "Request body must be a JSON object", "errors": {}}, 400
+    args, errors = BATCH.validate(data)
+    subrequests = []
+    for i, item in enumerate(args.get('requests') or ()):
+        if not isinstance(item, dict):
+            errors[f'requests[{i}]'] = 'Must be an object'
+            continue
+        sub, sub_errors = SUB_REQUEST.validate(item)
+        errors.update({f'requests[{i}].{key}': error for key, error in sub_errors.items()})
+        subrequests.append(sub)
+    if errors:
+        return {"message": next(iter(errors.values())), "errors": errors}, 400
+    limit = current_app.config['BATCH_MAX_REQUESTS']
+    if len(subrequests) > limit:
+        return {"message": f"At most {limit} requests can be batched"}, 400
+    return {"responses": run_batch(subrequests, concurrent=args['concurrent'])}, 200
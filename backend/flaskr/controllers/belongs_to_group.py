@@ -18,13 +18,37 @@ class BelongsToGroupResource(Resource):
               type: integer
               required: true
               description: The ID of the group to retrieve users from.
+            - name: view
+              in: query
+              type: string
+              enum: ["full", "roster"]
+              required: false
+              description: "`full` (default) returns complete user objects; `roster` returns id, username, email, role, skill names and group names only."
+            - name: page
+              in: query
+              type: integer
+              required: false
+              description: 1-based page number. If omitted, all members are returned.
+            - name: per_page
+              in: query
+              type: integer
+              required: false
+              description: Page size when `page` is given (default 50, max 500).
         responses:
             200:
-                description: A list of users in the group.
+                description: A list of users in the group. The `X-Total-Count` header carries the total number of members.
                 schema:
                     type: array
                     items:
                         $ref: '#/definitions/UserResponseSchema'
+            400:
+                description: Invalid query parameters.
+                schema:
+                    type: object
+                    properties:
+                        message:
+                            type: string
+                            example: "Invalid view: compact. Must be one of full, roster"
             404:
                 description: Group not found.
                 schema:
@@ -34,12 +58,20 @@ class BelongsToGroupResource(Resource):
                             type: string
                             example: "Group not found"
         """
-        db = get_db()
-        memberships = db.session.query(BelongsToGroup).filter_by(group_id=group_id).all()
-        if not memberships:
+        from flaskr.services.group import get_group_members
+        page = request.args.get('page', type=int)
+        per_page = request.args.get('per_page', 50, type=int)
+        if (page is not None and page < 1) or not 1 <= per_page <= 500:
+            return {'message': 'Invalid pagination parameters'}, 400
+        try:
+            members, total = get_group_members(
+                group_id, page=page, per_page=per_page, view=request.args.get('view', 'full')
+            )
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        if not total:
             return {'message': 'Group not found'}, 404
-        
-        return [membership.user.serialize for membership in memberships], 200
+        return members, 200, {'X-Total-Count': str(total)}
     def post(self, group_id):
         """Add a user to a specific group.
         
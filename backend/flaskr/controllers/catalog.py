@@ -0,0 +1,97 @@
+from flask import Blueprint, Response, request
+
+catalog_bp = Blueprint('catalog', __name__)
+
+@catalog_bp.route('', methods=['GET'])
+def catalog():
+    """Return all reference data needed to fill forms and dropdowns in one payload.
+    <h3>Caching</h3>
+    The response carries an `ETag` equal to its `version`, a hash of the content.
+    Send it back in `If-None-Match` to get an empty `304 Not Modified` while nothing changed.
+
+    ---
+    tags:
+        - Catalog
+    parameters:
+        - in: header
+          name: If-None-Match
+          type: string
+          required: false
+          description: The `ETag` of a previously fetched catalog.
+    definitions:
+        CatalogEntrySchema:
+            type: object
+            properties:
+                id:
+                    type: integer
+                name:
+                    type: string
+                description:
+                    type: string
+        CatalogMethodSchema:
+            type: object
+            properties:
+                id:
+                    type: integer
+                name:
+                    type: string
+                description:
+                    type: string
+                device_ids:
+                    type: array
+                    items:
+                        type: integer
+                skill_ids:
+                    type: array
+                    items:
+                        type: integer
+        CatalogGroupSchema:
+            type: object
+            properties:
+                id:
+                    type: integer
+                name:
+                    type: string
+                description:
+                    type: string
+                leader_id:
+                    type: integer
+        CatalogResponseSchema:
+            type: object
+            properties:
+                version:
+                    type: string
+                roles:
+                    type: array
+                    items:
+                        $ref: '#/definitions/CatalogEntrySchema'
+                skills:
+                    type: array
+                    items:
+                        $ref: '#/definitions/CatalogEntrySchema'
+                device_types:
+                    type: array
+                    items:
+                        $ref: '#/definitions/CatalogEntrySchema'
+                methods:
+                    type: array
+                    items:
+                        $ref: '#/definitions/CatalogMethodSchema'
+                groups:
+                    type: array
+                    items:
+                        $ref: '#/definitions/CatalogGroupSchema'
+    responses:
+        200:
+            description: The catalog.
+            schema:
+                $ref: '#/definitions/CatalogResponseSchema'
+        304:
+            description: The catalog has not changed since the given `If-None-Match` version.
+    """
+    from flaskr.services.catalog import get_catalog
+    body, version = get_catalog().get()
+    response = Response(body, mimetype='application/json')
+    response.set_etag(version)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
@@ -1,5 +1,7 @@
-from flask import Blueprint, request, jsonify
+import asyncio
+from flask import Blueprint, request, jsonify, current_app
 from datetime import datetime, timedelta
+from flaskr.utils import run_in_app_context
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
@@ -26,14 +28,17 @@ def get_active_users(group_id, start=None, end=None):
         q.filter(User.created_at <= end)
     return q.count()  # Count of active users in the group
 
-def get_available_devices(group_id):
-    from flaskr.db import Device, get_db, DeviceStatusEnum
-    db = get_db()
-    devices = db.session.query(Device).filter_by(status=DeviceStatusEnum.Available)
+def get_device_counts():
+    """Return the effective `{DeviceStatusEnum: count}` counts both device statistics are derived from."""
+    from flaskr.services.device_status import get_effective_status_counts
+    return get_effective_status_counts()
+
+def get_available_devices(counts):
+    from flaskr.db import DeviceStatusEnum
     # Count of available devices in the group
     return {
-        'available': devices.count(),  
-        'total': db.session.query(Device).count()
+        'available': counts[DeviceStatusEnum.Available],
+        'total': sum(counts.values())
     }
 
 def get_test_time(group_id, start=None, end=None):
@@ -85,35 +90,15 @@ def get_test_time(group_id, start=None, end=None):
         'reservations_count': count
     }
 
-def get_device_status():
-    from flaskr.db import Device, get_db, DeviceStatusEnum
-    db = get_db()
-    devices = db.session.query(Device).all()
-#    Available='Available'
-    # Reserved='Reserved'
-    # Occupied='Occupied'
-    # Error='Error'
-    # Maintaince='Maintaince' # TODO: corret the spelling to Maintenance
-
-    status_counts = {
-        'available': 0,
-        'reserved': 0,
-        'occupied': 0,
-        'maintenance': 0,
-        'broken': 0
+def get_device_status(counts):
+    from flaskr.db import DeviceStatusEnum
+    return {
+        'available': counts[DeviceStatusEnum.Available],
+        'reserved': counts[DeviceStatusEnum.Reserved],
+        'occupied': counts[DeviceStatusEnum.Occupied],
+        'maintenance': counts[DeviceStatusEnum.Maintaince],
+        'broken': counts[DeviceStatusEnum.Error]
     }
-    for device in devices:
-        if device.status == DeviceStatusEnum.Available:
-            status_counts['available'] += 1
-        elif device.status == DeviceStatusEnum.Occupied:
-            status_counts['occupied'] += 1
-        elif device.status == DeviceStatusEnum.Maintaince:
-            status_counts['maintenance'] += 1
-        elif device.status == DeviceStatusEnum.Error:
-            status_counts['broken'] += 1
-        elif device.status == DeviceStatusEnum.Reserved:
-            status_counts['reserved'] += 1
-    return status_counts
 
 def parse_time_range(time_range):
     now = datetime.now()
@@ -125,11 +110,100 @@ def parse_time_range(time_range):
         start = None
     return start, now
 
+def parse_datetime(value):
+    """Parse an ISO 8601 query parameter, None if empty; raise ValueError if invalid.
+
+    Datetimes are naive local wall time, like the `datetime.now()` defaults and the reservation
+    times in the database: an offset (`Z`, `+02:00`) is dropped and the wall time kept.
+    """
+    if not value:
+        return None
+    value = datetime.fromisoformat(value)
+    return value.replace(tzinfo=None)
+
+async def gather_stats(*calls):
+    """Run `(func, *args)` statistic calls and return their results in order.
+
+    Calls run concurrently, each with its own database session, when
+    `DASHBOARD_CONCURRENT_QUERIES` is enabled, and one after another otherwise.
+    """
+    if current_app.config.get('DASHBOARD_CONCURRENT_QUERIES', True):
+        return await asyncio.gather(*(run_in_app_context(func, *args) for func, *args in calls))
+    return [func(*args) for func, *args in calls]
+
+async def build_dashboard(group_id, compare_time_range=None):
+    """Compute the dashboard payload for a group."""
+    if compare_time_range:
+        # Compare current period with previous period
+        start, end = parse_time_range(compare_time_range)
+        prev_start = start - (end - start)
+        prev_end = start
+        (
+            current_completed, current_users, current_test_time,
+            previous_completed, previous_users, previous_test_time,
+            device_counts,
+        ) = await gather_stats(
+            (get_total_tests_completed, group_id, start, end),
+            (get_active_users, group_id, start, end),
+            (get_test_time, group_id, start, end),
+            (get_total_tests_completed, group_id, prev_start, prev_end),
+            (get_active_users, group_id, prev_start, prev_end),
+            (get_test_time, group_id, prev_start, prev_end),
+            # Device availability is not time-ranged, so both periods share one lookup.
+            (get_device_counts,),
+        )
+        available_devices = get_available_devices(device_counts)
+        device_status = get_device_status(device_counts)
+        return {
+            "current": {
+                "total_tests_completed": current_completed,
+                "active_users": current_users,
+                "available_devices": available_devices,
+                "test_time": current_test_time,
+            },
+            "previous": {
+                "total_tests_completed": previous_completed,
+                "active_users": previous_users,
+                "available_devices": available_devices,
+                "test_time": previous_test_time
+            },
+            "compare_time_range": compare_time_range,
+            "device_status": device_status
+        }
+    completed, users, test_time, device_counts = await gather_stats(
+        (get_total_tests_completed, group_id),
+        (get_active_users, group_id),
+        (get_test_time, group_id),
+        (get_device_counts,),
+    )
+    available_devices = get_available_devices(device_counts)
+    device_status = get_device_status(device_counts)
+    return {
+        "total_tests_completed": completed,
+        "active_users": users,
+        "available_devices": available_devices,
+        "test_time": test_time,
+        "device_status": device_status
+    }
+
 @dashboard_bp.route('/<int:group_id>', methods=['GET'])
-def dashboard(group_id):
+async def dashboard(group_id):
     """Get dashboard statistics for a group.
     <h3>Statistic Unit</h3>
     Duration is in minutes, counts are integers.
+    <h3>Concurrency</h3>
+    The independent statistic queries run concurrently on the shared query pool
+    unless `DASHBOARD_CONCURRENT_QUERIES` is disabled.
+    <h3>Caching</h3>
+    Dashboards of active groups are precomputed every `DASHBOARD_PRECOMPUTE_INTERVAL` seconds
+    and returned from the stored snapshot. A snapshot older than `DASHBOARD_SNAPSHOT_TTL` is
+    still returned while it is recomputed in the background.
+    Without a snapshot, identical concurrent requests share one computation, whose result is
+    reused for the rest of the current `DASHBOARD_BUCKET_SECONDS` time bucket. For
+    `DASHBOARD_STALE_SECONDS` after that, the previous result is still returned while it is
+    recomputed in the background.
+    Changes to tests, users, memberships, reservations or devices made through the API are
+    reflected immediately.
 
     ---
     tags:
@@ -165,37 +239,334 @@ def dashboard(group_id):
                         description: Total test time in minutes
                 
     """
+    from flaskr.services.single_flight import get_flight, dashboard_version
+    from flaskr.services.dashboard_snapshot import get_snapshots
     compare_time_range = request.args.get('compare_time_range')
-    if compare_time_range:
-        # Compare current period with previous period
-        start, end = parse_time_range(compare_time_range)
-        prev_start = start - (end - start)
-        prev_end = start
+    snapshots = get_snapshots()
+    result = snapshots.get(group_id, compare_time_range)
+    if result is None:
+        result = await get_flight('dashboard').get(
+            (group_id, compare_time_range),
+            lambda: snapshots.compute(group_id, compare_time_range),
+            version=dashboard_version(),
+        )
+    return jsonify(result)
 
-        current_stats = {
-            "total_tests_completed": get_total_tests_completed(group_id, start, end),
-            "active_users": get_active_users(group_id, start, end),
-            "available_devices": get_available_devices(group_id),
-            "test_time": get_test_time(group_id, start, end),
-        }
-        previous_stats = {
-            "total_tests_completed": get_total_tests_completed(group_id, prev_start, prev_end),
-            "active_users": get_active_users(group_id, prev_start, prev_end),
-            "available_devices": get_available_devices(group_id),
-            "test_time": get_test_time(group_id, prev_start, prev_end)
-        }
-        return jsonify({
-            "current": current_stats,
-            "previous": previous_stats,
-            "compare_time_range": compare_time_range,
-            "device_status": get_device_status()
-        })
-    else:
-        stats = {
-            "total_tests_completed": get_total_tests_completed(group_id),
-            "active_users": get_active_users(group_id),
-            "available_devices": get_available_devices(group_id),
-            "test_time": get_test_time(group_id),
-            "device_status": get_device_status()
+@dashboard_bp.route('/<int:group_id>/series', methods=['GET'])
+def dashboard_series(group_id):
+    """Get time-bucketed trend series of a group for charts.
+    <h3>Buckets</h3>
+    The range from `start` (rounded down to its bucket) to `end` is split into hour, day or
+    week buckets; weeks start on Monday. Buckets without activity are returned with zeros.
+    Without `start`, the last 48 hours, 30 days or 12 weeks are returned.
+    <h3>Metrics</h3>
+    - `completed_tests`, `failed_tests`: tests by creation time.
+    - `reservation_minutes`: reserved device time, in the bucket where the reservation starts.
+    - `active_users`: distinct users who reserved a device or submitted a test report.
+
+    Each metric is a list aligned with `buckets`. With `moving_average=N`, `moving_average`
+    holds the trailing average of each metric over the last N buckets.
+
+    ---
+    tags:
+        - Dashboard
+    parameters:
+        - in: path
+          name: group_id
+          type: integer
+          required: true
+        - in: query
+          name: granularity
+          type: string
+          enum: [hour, day, week]
+          default: day
+          required: false
+        - in: query
+          name: start
+          type: string
+          format: date-time
+          required: false
+        - in: query
+          name: end
+          type: string
+          format: date-time
+          required: false
+          description: Defaults to now.
+        - in: query
+          name: moving_average
+          type: integer
+          required: false
+          description: Window of the trailing moving averages, in buckets.
+    responses:
+        200:
+            description: The series.
+            schema:
+                type: object
+                properties:
+                    group_id:
+                        type: integer
+                    granularity:
+                        type: string
+                    start:
+                        type: string
+                        format: date-time
+                    end:
+                        type: string
+                        format: date-time
+                    buckets:
+                        type: array
+                        items:
+                            type: string
+                            format: date-time
+                    series:
+                        type: object
+                        properties:
+                            completed_tests:
+                                type: array
+                                items:
+                                    type: integer
+                            failed_tests:
+                                type: array
+                                items:
+                                    type: integer
+                            reservation_minutes:
+                                type: array
+                                items:
+                                    type: number
+                            active_users:
+                                type: array
+                                items:
+                                    type: integer
+                    moving_average:
+                        type: object
+                        description: Same keys as `series`, only with `moving_average`.
+        400:
+            description: Invalid granularity, range or window.
+    """
+    from flaskr.services.dashboard_series import get_series, moving_average
+    args = request.args
+    try:
+        start = parse_datetime(args.get('start'))
+        end = parse_datetime(args.get('end'))
+        window = args.get('moving_average', type=int)
+        if 'moving_average' in args and (window is None or window < 1):
+            raise ValueError('moving_average must be a positive integer')
+        result = get_series(group_id, args.get('granularity', 'day'), start, end)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    if window:
+        result['moving_average'] = {
+            metric: moving_average(values, window) for metric, values in result['series'].items()
         }
-        return jsonify(stats)
\ No newline at end of file
+    return jsonify(result)
+
+@dashboard_bp.route('/devices/utilization', methods=['GET'])
+def device_utilization():
+    """Get the utilization of every device between `start` and `end`.
+    <h3>Statistics</h3>
+    The window is widened to whole hours, and overlapping reservations of a device count once.
+    - `devices`: per device, its reservations, busy time and ratio, and the idle gaps between
+      its busy periods (including before the first and after the last one).
+    - `fleet`: the busy ratio of all devices together, the peak number of devices busy at once
+      and when it was first reached, and `concurrency_minutes`, the time spent with 0, 1, 2, ...
+      devices busy.
+    - `heatmap`: 7 rows (Monday first) of 24 hourly busy ratios of all devices, averaged over
+      the weeks in the window.
+
+    ---
+    tags:
+        - Dashboard
+    parameters:
+        - in: query
+          name: start
+          type: string
+          format: date-time
+          required: false
+          description: Defaults to 30 days before `end`.
+        - in: query
+          name: end
+          type: string
+          format: date-time
+          required: false
+          description: Defaults to now.
+        - in: query
+          name: device_type_id
+          type: integer
+          required: false
+          description: Only include devices of this type.
+    responses:
+        200:
+            description: Device utilization.
+            schema:
+                type: object
+                properties:
+                    start:
+                        type: string
+                        format: date-time
+                    end:
+                        type: string
+                        format: date-time
+                    devices:
+                        type: array
+                        items:
+                            type: object
+                            properties:
+                                device_id:
+                                    type: integer
+                                name:
+                                    type: string
+                                reservations:
+                                    type: integer
+                                busy_minutes:
+                                    type: number
+                                busy_ratio:
+                                    type: number
+                                idle_gaps:
+                                    type: integer
+                                longest_idle_minutes:
+                                    type: number
+                                mean_idle_minutes:
+                                    type: number
+                    fleet:
+                        type: object
+                        properties:
+                            devices:
+                                type: integer
+                            busy_ratio:
+                                type: number
+                            peak_concurrency:
+                                type: integer
+                            peak_at:
+                                type: string
+                                format: date-time
+                            concurrency_minutes:
+                                type: array
+                                items:
+                                    type: number
+                    heatmap:
+                        type: array
+                        items:
+                            type: array
+                            items:
+                                type: number
+        400:
+            description: Invalid window.
+    """
+    from flaskr.services.device_utilization import get_utilization
+    args = request.args
+    try:
+        start = parse_datetime(args.get('start'))
+        end = parse_datetime(args.get('end'))
+        result = get_utilization(start, end, device_type_id=args.get('device_type_id', type=int))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    return jsonify(result)
+
+@dashboard_bp.route('/durations', methods=['GET'])
+async def duration_stats():
+    """Get percentiles and histograms of reservation durations per method or device type.
+    <h3>Statistic Unit</h3>
+    Durations are in minutes. Percentiles interpolate linearly between reservations, as
+    `percentile_cont`. Each histogram has `bins` equal-width bins from 0 to the group's maximum.
+    <h3>Caching</h3>
+    Statistics are computed once per `by`, `window` and `bins` and reused for
+    `DURATION_STATS_BUCKET_SECONDS`; for `DURATION_STATS_STALE_SECONDS` after that, the previous
+    result is still returned while it is recomputed in the background. Changes made through the
+    API are reflected immediately.
+
+    ---
+    tags:
+        - Dashboard
+    parameters:
+        - in: query
+          name: by
+          type: string
+          enum: [method, device_type]
+          default: method
+          required: false
+        - in: query
+          name: window
+          type: string
+          enum: [week, month, quarter, year, all]
+          default: month
+          required: false
+          description: Only include reservations starting within this period.
+        - in: query
+          name: id
+          type: integer
+          required: false
+          description: Only return the method or device type with this ID.
+        - in: query
+          name: bins
+          type: integer
+          default: 20
+          required: false
+          description: Number of histogram bins, at most 100.
+    responses:
+        200:
+            description: Duration statistics, one entry per method or device type with reservations.
+            schema:
+                type: object
+                properties:
+                    by:
+                        type: string
+                    window:
+                        type: string
+                    since:
+                        type: string
+                        format: date-time
+                    groups:
+                        type: array
+                        items:
+                            type: object
+                            properties:
+                                id:
+                                    type: integer
+                                name:
+                                    type: string
+                                count:
+                                    type: integer
+                                mean:
+                                    type: number
+                                min:
+                                    type: number
+                                max:
+                                    type: number
+                                p50:
+                                    type: number
+                                p90:
+                                    type: number
+                                p99:
+                                    type: number
+                                histogram:
+                                    type: object
+                                    properties:
+                                        edges:
+                                            type: array
+                                            items:
+                                                type: number
+                                        counts:
+                                            type: array
+                                            items:
+                                                type: integer
+        400:
+            description: Invalid grouping, window or number of bins.
+    """
+    from flaskr.services.duration_stats import check_arguments, get_duration_stats
+    from flaskr.services.single_flight import get_flight, duration_stats_version
+    by = request.args.get('by', 'method')
+    window = request.args.get('window', 'month')
+    bins = request.args.get('bins', type=int) if 'bins' in request.args else 20
+    try:
+        check_arguments(by, window, bins)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    result = await get_flight('duration_stats').get(
+        (by, window, bins),
+        lambda: run_in_app_context(get_duration_stats, by, window, bins),
+        version=duration_stats_version(),
+    )
+    group_id = request.args.get('id', type=int)
+    if group_id is not None:
+        result = {**result, 'groups': [group for group in result['groups'] if group['id'] == group_id]}
+    return jsonify(result)
@@ -1,6 +1,30 @@
-from flask_restful import Resource, reqparse
+from flask_restful import Resource
 from flask import request, current_app
-from flaskr.db import db, Device
+from flaskr.db import db, Device, DeviceStatusEnum
+from flaskr.services.identity_cache import get_cached
+from flaskr.validation import Schema, Field
+from flaskr.services.sync import current_token, updated_since, filter_updated_since, delta
+
+CREATE_DEVICE = Schema('CreateDeviceSchema', {
+    'name': Field(str, trim=True, required=True, help='Device name is required', example='Device A'),
+    'device_type_id': Field(int, required=True, help='Device type ID is required', example=1),
+    'status': Field(str, required=True, help='Device status is required', example='Available',
+                    description='One of Available, Reserved, Occupied, Error, Maintaince'),
+    'description': Field(str, default='', help='Device description', example='Device for electrical testing'),
+    'previous_maintenance_date': Field(str, help='Previous maintenance date in ISO format', format='date-time', example='2023-09-01T12:00:00Z'),
+    'next_maintenance_date': Field(str, help='Next maintenance date in ISO format', format='date-time', example='2023-10-01T12:00:00Z'),
+    'position': Field(str, default='', help='Device position', example='Rack 1, Slot 2'),
+})
+
+UPDATE_DEVICE = Schema('UpdateDeviceSchema', {
+    'name': Field(str, trim=True, help='Device name {error_msg}'),
+    'status': Field(DeviceStatusEnum, trim=True, help='Device status {error_msg}'),
+    'device_type_id': Field(int, help='Device type ID {error_msg}'),
+    'description': Field(str, help='Device description {error_msg}'),
+    'previous_maintenance_date': Field(str, help='Previous maintenance date in ISO format {error_msg}', format='date-time'),
+    'next_maintenance_date': Field(str, help='Next maintenance date in ISO format {error_msg}', format='date-time'),
+    'position': Field(str, trim=True, help='Device position {error_msg}', example='Rack 1, Slot 2'),
+})
 import traceback
 
 class DeviceDetailResource(Resource):
@@ -43,6 +67,11 @@ class DeviceDetailResource(Resource):
                         type: string
                         example: "Available"
                         enum: ['Available', 'Reserved', 'Occupied', 'Error', 'Maintaince']
+                    effective_status:
+                        type: string
+                        example: "Reserved"
+                        enum: ['Available', 'Reserved', 'Occupied', 'Error', 'Maintaince']
+                        description: Status derived from current reservations. Manual Error/Maintaince statuses take precedence.
                     description:
                         type: string
                         example: "Device for electrical testing"
@@ -83,11 +112,9 @@ class DeviceDetailResource(Resource):
                             type: string
                             example: "Device not found"
         """
-        from flaskr.db import get_db, Device
-        db = get_db()
         if not device_id:
             return {"message": "Device ID is required"}, 400
-        device = db.session.query(Device).filter_by(id=device_id).first()
+        device = get_cached(Device, device_id)
         if not device:
             return {"message": "Device not found"}, 404
         return device.serialize, 200
@@ -97,27 +124,6 @@ class DeviceDetailResource(Resource):
         ---
         tags:
             - Device
-        definitions:
-            UpdateDeviceSchema:
-                type: object
-                properties:
-                    name:
-                        type: string
-                    status:
-                        type: string
-                        enum: ['Available', 'Reserved', 'Occupied', 'Error', 'Maintaince']
-                    description:
-                        type: string
-                    previous_maintenance_date:
-                        type: string
-                        format: date-time
-                    next_maintenance_date:
-                        type: string
-                        format: date-time
-                    position:
-                        type: string
-                        example: "Rack 1, Slot 2"
-
         parameters:
             - name: device_id
               in: path
@@ -151,16 +157,8 @@ class DeviceDetailResource(Resource):
                             type: string
                             example: "Device not found"
         """
-        from flaskr.db import get_db, Device, DeviceStatusEnum, DeviceType
-        parser = reqparse.RequestParser()
-        parser.add_argument('name', type=str, required=False, help='Device name {error_msg}', trim=True)
-        parser.add_argument('status', type=DeviceStatusEnum, trim=True, required=False, help='Device status {error_msg}', choices=list(DeviceStatusEnum))
-        parser.add_argument('device_type_id', type=int, required=False, help='Device type ID {error_msg}')
-        parser.add_argument('description', type=str, required=False, help='Device description {error_msg}')
-        parser.add_argument('previous_maintenance_date', type=str, required=False, help='Previous maintenance date in ISO format {error_msg}')
-        parser.add_argument('next_maintenance_date', type=str, required=False, help='Next maintenance date in ISO format {error_msg}')
-        parser.add_argument('position', type=str, trim=True, required=False, help='Device position {error_msg}')
-        args = parser.parse_args(strict=True)
+        from flaskr.db import get_db, DeviceType
+        args = UPDATE_DEVICE.parse()
         
         db = get_db()
         device = db.session.query(Device).filter_by(id=device_id).first()
@@ -181,7 +179,7 @@ class DeviceDetailResource(Resource):
                 if exists:
                     return {"message": f"Device with name `{value}` already exists"}, 409
             if key == 'device_type_id':
-                device_type = db.session.query(DeviceType).filter_by(id=args.get('device_type_id')).first()
+                device_type = get_cached(DeviceType, args.get('device_type_id'))
                 if not device_type:
                     return {"message": f"Device type of id: {args.get('device_type_id')} not found"}, 400
 
@@ -227,7 +225,7 @@ class DeviceDetailResource(Resource):
             return {"message": "Device not found"}, 404
 
         # Check if the device is reserved or occupied
-        if device.status in ['Reserved', 'Occupied']:
+        if device.status in ['Reserved', 'Occupied'] or device.effective_status in ['Reserved', 'Occupied']:
             return {"message": "Cannot delete device that is reserved or occupied"}, 400
         # Check if the device is related to any existing methods 
         allowed_device = db.session.query(AllowedDevice).filter_by(device_id=device_id).all()
@@ -246,12 +244,43 @@ class DeviceResource(Resource):
 
     def get(self):
         """Retrieve a list of devices.
+        <h3>Delta sync</h3>
+        List responses of devices, tests, reservations and users carry an `X-Sync-Token` header.
+        Passing it back as `updated_since` returns a `DeltaSyncSchema` object with only the rows
+        created or changed since then, the IDs of rows deleted since then, and a new `sync_token`.
         ---
         tags:
             - Device
+        parameters:
+            - name: updated_since
+              in: query
+              type: integer
+              required: false
+              description: "A `sync_token` from a previous response. Returns only the devices created or changed since then, plus the IDs of deleted ones."
+        definitions:
+            DeltaSyncSchema:
+                type: object
+                properties:
+                    sync_token:
+                        type: integer
+                        description: Pass as `updated_since` on the next request.
+                    items:
+                        type: array
+                        description: Rows created or changed since `updated_since`.
+                        items:
+                            type: object
+                    deleted:
+                        type: array
+                        description: IDs of rows deleted since `updated_since`.
+                        items:
+                            type: integer
         responses:
             200:
-                description: A list of devices.
+                description: A list of devices, or a `DeltaSyncSchema` object with `updated_since`.
+                headers:
+                    X-Sync-Token:
+                        type: integer
+                        description: Pass as `updated_since` to fetch only later changes.
                 schema:
                     type: array
                     items:
@@ -266,9 +295,16 @@ class DeviceResource(Resource):
                             example: "No devices found"
         """
         from flaskr.db import get_db, Device
+        since = updated_since()
         db = get_db()
-        devices = db.session.query(Device).all()
-        return [device.serialize for device in devices], 200
+        token = current_token()
+        q = db.session.query(Device)
+        if since is not None:
+            q = filter_updated_since(q, Device, since)
+        devices = [device.serialize for device in q.all()]
+        if since is not None:
+            return delta(Device, devices, since, token), 200
+        return devices, 200, {'X-Sync-Token': str(token)}
         
     def post(self):
         """Create a new device.
@@ -278,34 +314,6 @@ class DeviceResource(Resource):
         consumes:
           - application/json
           - application/x-www-form-urlencoded
-        definitions:
-            CreateDeviceSchema:
-                type: object
-                properties:
-                    name:
-                        type: string
-                        example: "Device A"
-                    device_type_id:
-                        type: integer
-                        example: 1
-                    status:
-                        type: string
-                        example: "Available"
-                        enum: ['Available', 'Reserved', 'Occupied', 'Error', 'Maintaince']
-                    description:
-                        type: string
-                        example: "Device for electrical testing"
-                    previous_maintenance_date:
-                        type: string
-                        format: date-time
-                        example: "2023-09-01T12:00:00Z"
-                    next_maintenance_date:
-                        type: string
-                        format: date-time
-                        example: "2023-10-01T12:00:00Z"
-                    position:
-                        type: string
-                        example: "Rack 1, Slot 2"
         parameters:
             - name: body
               in: body
@@ -334,16 +342,8 @@ class DeviceResource(Resource):
                             type: string
                             example: "Device already exists"
         """
-        parser = reqparse.RequestParser()
-        parser.add_argument('name', type=str, trim=True, required=True, help='Device name is required')
-        parser.add_argument('device_type_id', type=int, required=True, help='Device type ID is required')
-        parser.add_argument('status', type=str, required=True, help='Device status is required')
-        parser.add_argument('description', type=str, required=False, default='', help='Device description')
-        parser.add_argument('previous_maintenance_date', type=str, required=False, help='Previous maintenance date in ISO format')
-        parser.add_argument('next_maintenance_date', type=str, required=False, help='Next maintenance date in ISO format')
-        parser.add_argument('position', type=str, required=False, default='', help='Device position')
-        args = parser.parse_args(strict=True)
-        from flaskr.db import get_db, Device, DeviceType, DeviceStatusEnum
+        args = CREATE_DEVICE.parse()
+        from flaskr.db import get_db, DeviceType
         from flask_restful import inputs
         db = get_db()
         try:
@@ -353,7 +353,7 @@ class DeviceResource(Resource):
             exists = db.session.query(Device).filter_by(name=name).first()
             if exists:
                 return {"message": f"Device with name `{name}` already exists"}, 409
-            device_type = db.session.query(DeviceType).filter_by(id=args.get('device_type_id')).first()
+            device_type = get_cached(DeviceType, args.get('device_type_id'))
             if not device_type:
                 return {"message": f"Device type of id: {args.get('device_type_id')} not found"}, 400
             try:
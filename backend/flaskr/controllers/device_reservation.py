@@ -1,10 +1,28 @@
-from flask_restful import Resource, reqparse, inputs
+from flask_restful import Resource, inputs
 from ..services.device_reservation import (
     create_device_reservation, get_device_reservation_by_id, 
     update_device_reservation, delete_device_reservation,
     list_device_reservations, DeviceReservationError
 )
 from datetime import datetime
+from flaskr.validation import Schema, Field
+from flaskr.encoding import response_format, shape_rows
+from flaskr.db import DeviceReservation
+from flaskr.services.sync import current_token, updated_since, delta
+
+CREATE_DEVICE_RESERVATION = Schema('CreateDeviceReservationSchema', {
+    'device_id': Field(int, required=True, help='ID of the device', example=1),
+    'user_id': Field(int, required=True, help='ID of the user', example=2),
+    'test_id': Field(int, help='ID of the test', example=3),
+    'start_time': Field(str, required=True, help='Start time of the reservation', format='date-time',
+                        description='Start time of the reservation, must be in ISO 8601 format'),
+    'duration': Field(int, required=True, help='Duration of the reservation in minutes', example=60),
+}, strict=False)
+
+UPDATE_DEVICE_RESERVATION = Schema('UpdateDeviceReservationSchema', {
+    'start_time': Field(str, help='Start time of the reservation', format='date-time'),
+    'duration': Field(int, help='Duration of the reservation in minutes'),
+}, strict=False)
 
 class DeviceReservationDetailResource(Resource):
     """DeviceReservation detail resource for managing a single device reservation."""
@@ -87,15 +105,6 @@ class DeviceReservationDetailResource(Resource):
         ---
         tags:
             - DeviceReservation
-        definitions:
-            UpdateDeviceReservationSchema:
-                type: object
-                properties:
-                    start_time:
-                        type: string
-                        format: date-time
-                    duration:
-                        type: integer
         parameters:
             - name: id
               in: path
@@ -130,10 +139,7 @@ class DeviceReservationDetailResource(Resource):
                             example: "Device reservation not found"
         """
         from flaskr.db import get_db, DeviceReservation
-        parser = reqparse.RequestParser()
-        parser.add_argument('start_time', type=str, required=False, help='Start time of the reservation')
-        parser.add_argument('duration', type=int, required=False, help='Duration of the reservation in minutes')
-        args = parser.parse_args()
+        args = UPDATE_DEVICE_RESERVATION.parse()
 
         try:
             reservation = update_device_reservation(
@@ -217,9 +223,28 @@ class DeviceReservationResource(Resource):
               type: integer
               required: false
               description: Filter by group ID.
+            - name: format
+              in: query
+              type: string
+              required: false
+              description: "`columnar` returns one array per field instead of an array of objects."
+              enum: ["rows", "columnar"]
+            - name: updated_since
+              in: query
+              type: integer
+              required: false
+              description: "A `sync_token` from a previous response. Returns only the reservations created or changed since then, plus the IDs of deleted ones."
+        produces:
+            - application/json
+            - application/msgpack
         responses:
             200:
-                description: A list of device reservations.
+                description: A list of device reservations, or one array per field with `format=columnar`.
+                    With `updated_since`, a `DeltaSyncSchema` object whose `items` are reservations.
+                headers:
+                    X-Sync-Token:
+                        type: integer
+                        description: Pass as `updated_since` to fetch only later changes.
                 schema:
                     type: array
                     items:
@@ -235,7 +260,10 @@ class DeviceReservationResource(Resource):
         """
         from flask import request
         args = request.args.to_dict()
+        shape = response_format()
+        since = updated_since()
         try:
+            token = current_token()
             from_time = datetime.fromisoformat(args.get('from_time')) if args.get('from_time') else None
             to_time = datetime.fromisoformat(args.get('to_time')) if args.get('to_time') else None
             reservations = list_device_reservations(
@@ -244,11 +272,15 @@ class DeviceReservationResource(Resource):
                 test_id=args.get('test_id'),
                 from_time=from_time,
                 to_time=to_time,
-                group_id=args.get('group_id')
+                group_id=args.get('group_id'),
+                updated_since=since
             )
+            rows = shape_rows([res.serialize for res in reservations], shape)
+            if since is not None:
+                return delta(DeviceReservation, rows, since, token), 200
             if not reservations:
                 return {"message": "No device reservations found"}, 404
-            return [res.serialize for res in reservations], 200
+            return rows, 200, {'X-Sync-Token': str(token)}
         except ValueError as e:
             return {"message": str(e)}, 400
         except Exception as e:
@@ -264,34 +296,17 @@ For example, to reserve a device for 60 minutes starting from Taiwan time (UTC+8
         ---
         tags:
             - DeviceReservation
-            
-        definitions:
-            CreateDeviceReservationSchema:
-                type: object
-                properties:
-                    device_id:
-                        type: integer
-                        example: 1
-                    user_id:
-                        type: integer
-                        example: 2
-                    test_id:
-                        type: integer
-                        example: 3
-                    start_time:
-                        type: string
-                        format: date-time
-                        description: Start time of the reservation, must be in ISO 8601 format
-                    duration:
-                        type: integer
-                        example: 60
-                        description: Duration of the reservation in minutes
         parameters:
             - name: body
               in: body
               required: true
               schema:
                   $ref: '#/definitions/CreateDeviceReservationSchema'
+            - name: Idempotency-Key
+              in: header
+              type: string
+              required: false
+              description: "Unique per logical request. Retries with the same key get the original response, with `Idempotent-Replayed: true`, instead of reserving the device again."
         responses:
             201:
                 description: The created device reservation.
@@ -330,13 +345,7 @@ For example, to reserve a device for 60 minutes starting from Taiwan time (UTC+8
                                     items:
                                         $ref: '#/definitions/DeviceReservationResponseSchema'
         """
-        parser = reqparse.RequestParser()
-        parser.add_argument('device_id', type=int, required=True, help='ID of the device')
-        parser.add_argument('user_id', type=int, required=True, help='ID of the user')
-        parser.add_argument('test_id', type=int, required=False, help='ID of the test')
-        parser.add_argument('start_time', type=str, required=True, help='Start time of the reservation')
-        parser.add_argument('duration', type=int, required=True, help='Duration of the reservation in minutes')
-        args = parser.parse_args()
+        args = CREATE_DEVICE_RESERVATION.parse()
         from flask import current_app
         logger = current_app.logger
         logger.info(f"start_time: {args.get('start_time')}, typeof start_time: {type(args.get('start_time'))}")
@@ -0,0 +1,68 @@
+import json
+import queue
+from flask import Blueprint, Response, request, current_app
+
+events_bp = Blueprint('events', __name__)
+
+def format_event(evt: dict) -> str:
+    """Format an event as a server-sent events message."""
+    return f"id: {evt['seq']}\nevent: {evt['type']}\ndata: {json.dumps(evt)}\n\n"
+
+def stream_events(hub, subscription, heartbeat_interval):
+    """Yield queued events, plus a comment line whenever the stream has been idle
+    for `heartbeat_interval` seconds so proxies keep the connection open."""
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            try:
+                evt = subscription.get(timeout=heartbeat_interval)
+            except queue.Empty:
+                yield ': heartbeat\n\n'
+                continue
+            yield format_event(evt)
+    finally:
+        hub.unsubscribe(subscription)
+
+@events_bp.route('', methods=['GET'])
+def events():
+    """Stream reservation, test, test report and device changes as server-sent events.
+    <h3>Event format</h3>
+    Each message carries an `event` name (`device_reservation`, `test`, `test_report` or `device`)
+    and a JSON `data` payload with the `action` (`created`, `updated`, `deleted`) and the row IDs.
+    Events are published once the change is committed. A `: heartbeat` comment is sent when the stream is idle.
+
+    ---
+    tags:
+        - Events
+    produces:
+        - text/event-stream
+    parameters:
+        - in: query
+          name: group_id
+          type: integer
+          required: false
+          description: Only receive events for tests, reports and reservations of this group.
+        - in: query
+          name: device_id
+          type: integer
+          required: false
+          description: Only receive events for this device and its reservations.
+    responses:
+        200:
+            description: An event stream.
+    """
+    from flaskr.services.events import get_hub
+    hub = get_hub()
+    subscription = hub.subscribe(
+        group_id=request.args.get('group_id', type=int),
+        device_id=request.args.get('device_id', type=int),
+    )
+    response = Response(
+        stream_events(hub, subscription, current_app.config['EVENTS_HEARTBEAT_INTERVAL']),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+    # The generator's cleanup only runs once it started; a response dropped
+    # before its first chunk must still give the subscription back.
+    response.call_on_close(lambda: hub.unsubscribe(subscription))
+    return response
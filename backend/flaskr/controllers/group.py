@@ -1,6 +1,14 @@
-from flask_restful import Resource, reqparse
+from flask_restful import Resource
 from flaskr.db import get_db, Group
 from flask import request
+from sqlalchemy.orm import joinedload
+from flaskr.validation import Schema, Field
+
+CREATE_GROUP = Schema('CreateGroupSchema', {
+    'name': Field(str, trim=True, required=True, help='Name of the group is required {error_msg}', example='Group Name'),
+    'description': Field(str, help='Description of the group {error_msg}', example='Group Description'),
+    'leader_id': Field(int, required=True, help='ID of the group leader {error_msg}', example=1),
+})
 
 class GroupDetailResource(Resource):
     """Group detail resource for managing a single group."""
@@ -11,18 +19,6 @@ class GroupDetailResource(Resource):
         tags:
             - Group
         definitions:
-            CreateGroupSchema:
-                type: object
-                properties:
-                    name:
-                        type: string
-                        example: "Group Name"
-                    description:
-                        type: string
-                        example: "Group Description"
-                    leader_id:
-                        type: integer
-                        example: 1
             GroupResponseSchema:
                 type: object
                 properties:
@@ -86,7 +82,7 @@ class GroupDetailResource(Resource):
                             example: "Group not found"
         """
         db = get_db()
-        group = db.session.query(Group).filter_by(id=group_id).first()
+        group = db.session.query(Group).options(joinedload(Group.leader)).filter_by(id=group_id).first()
         if not group:
             return {"message": "Group not found"}, 404
         return group.serialize, 200
@@ -230,7 +226,8 @@ class GroupResource(Resource):
                             example: "No groups found"
         """
         db = get_db()
-        groups = db.session.query(Group).all()
+        # Counters are stored on the group row, so the leader join is all serialize needs.
+        groups = db.session.query(Group).options(joinedload(Group.leader)).all()
         return [g.serialize for g in groups], 200
 
     def post(self):
@@ -276,12 +273,8 @@ class GroupResource(Resource):
                             example: "Internal server error"
         """
         from flaskr.db import User
-        parser = reqparse.RequestParser()
-        parser.add_argument('name', type=str, trim=True, required=True, help='Name of the group is required {error_msg}')
-        parser.add_argument('description', type=str, required=False, help='Description of the group {error_msg}')
-        parser.add_argument('leader_id', type=int, required=True, help='ID of the group leader {error_msg}')
         db = get_db()
-        args = parser.parse_args(strict=True)
+        args = CREATE_GROUP.parse()
 
         name = args.get("name")
         description = args.get("description")
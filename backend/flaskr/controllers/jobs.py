@@ -0,0 +1,174 @@
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from flaskr.validation import Schema, Field
+from ..services.jobs import JOB_KINDS, get_queue
+
+ADMIN_ROLE_ID = 1
+
+
+def _object(value):
+    if not isinstance(value, dict):
+        raise ValueError('Must be an object')
+    return value
+
+CREATE_JOB = Schema('CreateJobSchema', {
+    'kind': Field(str, required=True, choices=sorted(JOB_KINDS), help='Kind of job to run', example='reconcile_group_counters'),
+    'params': Field(_object, default=None, description='Keyword arguments of the job.', example={}),
+})
+
+
+def _is_admin():
+    return get_jwt().get('role_id') == ADMIN_ROLE_ID
+
+class JobResource(Resource):
+    """Job resource for queueing background jobs."""
+
+    @jwt_required()
+    def post(self):
+        """Queue a background job. Administrators only.
+        <h3>Kinds</h3>
+        - `gen_mock_data_dashboard`: params `days`, `num_groups`, `num_user_per_group`,
+          `num_tests_per_group`, `num_devices`, `random_seed`, as the `gen-mock-data-dashboard` command.
+        - `reconcile_group_counters`: repair drifted group counters.
+        - `purge_idempotency_keys`: delete expired idempotency keys.
+
+        The job runs in the background; poll `GET /api/jobs/<id>` (the `Location` header) for its progress.
+
+        ---
+        tags:
+            - Job
+        parameters:
+            - name: body
+              in: body
+              required: true
+              schema:
+                $ref: '#/definitions/CreateJobSchema'
+            - name: Idempotency-Key
+              in: header
+              type: string
+              required: false
+              description: "Unique per logical request. Retries with the same key get the original response, with `Idempotent-Replayed: true`, instead of queueing the job again."
+        responses:
+            202:
+                description: The queued job.
+                schema:
+                    $ref: '#/definitions/JobResponseSchema'
+            400:
+                description: Unknown kind or invalid parameters.
+            401:
+                description: Not an administrator.
+        """
+        args = CREATE_JOB.parse()
+        if not _is_admin():
+            return {'message': 'Unauthorized'}, 401
+        try:
+            job = get_queue().enqueue(args['kind'], args['params'], created_by_id=int(get_jwt_identity()))
+        except ValueError as e:
+            return {"message": str(e)}, 400
+        return job.serialize, 202, {'Location': f'/api/jobs/{job.id}'}
+
+class JobDetailResource(Resource):
+    """Job detail resource for following and cancelling a background job."""
+
+    @jwt_required()
+    def get(self, job_id):
+        """Get the status, progress and result of a background job.
+
+        ---
+        tags:
+            - Job
+        parameters:
+            - name: job_id
+              in: path
+              type: integer
+              required: true
+        definitions:
+            JobResponseSchema:
+                type: object
+                properties:
+                    id:
+                        type: integer
+                    kind:
+                        type: string
+                        example: reconcile_group_counters
+                    params:
+                        type: object
+                    status:
+                        type: string
+                        enum: [Queued, Running, Succeeded, Failed, Cancelled]
+                    progress:
+                        type: number
+                        description: Between 0 and 1.
+                    message:
+                        type: string
+                        description: Latest progress message, if any.
+                    result:
+                        type: object
+                        description: Return value of a succeeded job.
+                    error:
+                        type: string
+                        description: Error of a failed job.
+                    cancel_requested:
+                        type: boolean
+                    attempts:
+                        type: integer
+                    created_by_id:
+                        type: integer
+                    created_at:
+                        type: string
+                        format: date-time
+                    started_at:
+                        type: string
+                        format: date-time
+                    finished_at:
+                        type: string
+                        format: date-time
+        responses:
+            200:
+                description: The job.
+                schema:
+                    $ref: '#/definitions/JobResponseSchema'
+            404:
+                description: Job not found.
+        """
+        from flaskr.db import db, Job
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return {"message": "Job not found"}, 404
+        return job.serialize, 200
+
+    @jwt_required()
+    def delete(self, job_id):
+        """Cancel a background job. Administrators only.
+        A queued job is cancelled at once. A running job stops at its next progress report;
+        until then it stays `Running` with `cancel_requested` set.
+
+        ---
+        tags:
+            - Job
+        parameters:
+            - name: job_id
+              in: path
+              type: integer
+              required: true
+        responses:
+            202:
+                description: The job, cancelled or being cancelled.
+                schema:
+                    $ref: '#/definitions/JobResponseSchema'
+            401:
+                description: Not an administrator.
+            404:
+                description: Job not found.
+            409:
+                description: The job already finished.
+        """
+        if not _is_admin():
+            return {'message': 'Unauthorized'}, 401
+        try:
+            job = get_queue().cancel(job_id)
+        except ValueError as e:
+            return {"message": str(e)}, 409
+        if job is None:
+            return {"message": "Job not found"}, 404
+        return job.serialize, 202
@@ -1,4 +1,15 @@
-from flask_restful import Resource, reqparse
+from flask_restful import Resource
+from flaskr.validation import Schema, Field
+
+CREATE_METHOD = Schema('CreateMethodSchema', {
+    'name': Field(str, required=True, help='Name of the method', example='Electrical Test'),
+    'description': Field(str, help='Description of the method', example='Electrical testing method'),
+})
+
+UPDATE_METHOD = Schema('UpdateMethodSchema', {
+    'name': Field(str, required=True, help='Name of the method', example='Electrical Test'),
+    'description': Field(str, help='Description of the method', example='Electrical testing method'),
+}, strict=False)
 
 class MethodDetailResource(Resource):
     """Method detail resource for managing a single method."""
@@ -57,10 +68,10 @@ class MethodDetailResource(Resource):
                             type: string
                             example: "Method not found"
         """
-        from flaskr.db import get_db, Method
+        from flaskr.db import Method
+        from flaskr.services.identity_cache import get_cached
         try:
-            db = get_db()
-            method = db.session.query(Method).filter_by(id=method_id).first()
+            method = get_cached(Method, method_id)
             if not method:
                 return {"message": "Method not found"}, 404
             return method.serialize, 200
@@ -73,14 +84,6 @@ class MethodDetailResource(Resource):
         ---
         tags:
             - Method
-        definitions:
-            UpdateMethodSchema:
-                type: object
-                properties:
-                    name:
-                        type: string
-                    description:
-                        type: string
         parameters:
             - name: method_id
               in: path
@@ -115,10 +118,7 @@ class MethodDetailResource(Resource):
                             example: "Method not found"
         """
         from flaskr.db import get_db, Method
-        parser = reqparse.RequestParser()
-        parser.add_argument('name', type=str, required=True, help='Name of the method')
-        parser.add_argument('description', type=str, required=False, help='Description of the method')
-        args = parser.parse_args()
+        args = UPDATE_METHOD.parse()
         try:
             db = get_db()
             method = db.session.query(Method).filter_by(id=method_id).first()
@@ -211,14 +211,6 @@ class MethodResource(Resource):
         ---
         tags:
             - Method
-        definitions:
-            CreateMethodSchema:
-                type: object
-                properties:
-                    name:
-                        type: string
-                    description:
-                        type: string
         parameters:
             - name: body
               in: body
@@ -248,10 +240,7 @@ class MethodResource(Resource):
                             example: "Method already exists"
         """
         from flaskr.db import get_db, Method
-        parser = reqparse.RequestParser()
-        parser.add_argument('name', type=str, required=True, help='Name of the method')
-        parser.add_argument('description', type=str, required=False, help='Description of the method')
-        args = parser.parse_args(strict=True)
+        args = CREATE_METHOD.parse()
         try:
             db = get_db()
             existing_method = db.session.query(Method).filter_by(name=method.name).first()
@@ -1,4 +1,15 @@
-from flask_restful import Resource, reqparse
+from flask_restful import Resource
+from flaskr.validation import Schema, Field
+
+CREATE_SKILL = Schema('CreateSkillSchema', {
+    'name': Field(str, required=True, help='Name of the skill is required', example='Electrical Testing'),
+    'description': Field(str, default='', help='Description of the skill', example='Skill for performing electrical tests'),
+}, strict=False)
+
+UPDATE_SKILL = Schema('UpdateSkillSchema', {
+    'name': Field(str, required=True, help='Name of the skill is required', example='Updated Skill Name'),
+    'description': Field(str, default='', help='Description of the skill', example='Updated description of the skill'),
+}, strict=False)
 
 class SkillResource(Resource):
     """Skill resource for managing skills."""
@@ -50,14 +61,7 @@ class SkillResource(Resource):
               in: body
               required: true
               schema:
-                  type: object
-                  properties:
-                      name:
-                          type: string
-                          example: "Electrical Testing"
-                      description:
-                          type: string
-                          example: "Skill for performing electrical tests"
+                  $ref: '#/definitions/CreateSkillSchema'
         responses:
             201:
                 description: The created skill.
@@ -73,11 +77,8 @@ class SkillResource(Resource):
                             example: "Invalid input"
         """
         from flaskr.db import get_db, Skill
-        parser = reqparse.RequestParser()
-        parser.add_argument('name', type=str, required=True, help='Name of the skill is required')
-        parser.add_argument('description', type=str, required=False, default='', help='Description of the skill')
+        data = CREATE_SKILL.parse()
         try:
-            data = parser.parse_args()
             db = get_db()
             if not data or 'name' not in data:
                 return {"message": "Invalid input"}, 400
@@ -118,7 +119,6 @@ class SkillDetailResource(Resource):
                             example: "Skill not found"
         """
         from flaskr.db import get_db, Skill
-        parser = reqparse.RequestParser()
         skill_id = int(skill_id)
         if not skill_id or skill_id <= 0:
             return {"message": "Invalid skill ID"}, 400
@@ -145,14 +145,7 @@ class SkillDetailResource(Resource):
               in: body
               required: true
               schema:
-                  type: object
-                  properties:
-                      name:
-                          type: string
-                          example: "Updated Skill Name"
-                      description:
-                          type: string
-                          example: "Updated description of the skill"
+                  $ref: '#/definitions/UpdateSkillSchema'
         responses:
             200:
                 description: The updated skill.
@@ -176,11 +169,8 @@ class SkillDetailResource(Resource):
                             example: "Skill not found"
         """
         from flaskr.db import get_db, Skill
-        parser = reqparse.RequestParser()
-        parser.add_argument('name', type=str, required=True, help='Name of the skill is required')
-        parser.add_argument('description', type=str, required=False, default='', help='Description of the skill')
+        data = UPDATE_SKILL.parse()
         try:
-            data = parser.parse_args()
             db = get_db()
             skill = db.session.query(Skill).filter(Skill.id == skill_id).first()
             if not skill:
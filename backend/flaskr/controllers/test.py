@@ -1,5 +1,28 @@
-from flask_restful import Resource, reqparse
+from flask_restful import Resource
 from flask import request, current_app
+from flaskr.db import TestStatusEnum
+from flaskr.validation import Schema, Field
+from flaskr.encoding import response_format, shape_rows
+from flaskr.services.sync import current_token, updated_since, filter_updated_since, delta
+
+CREATE_TEST = Schema('CreateTestSchema', {
+    'name': Field(str, required=True, help='Test name is required', example='Test Name'),
+    'display_id': Field(str, required=True, help='Display ID is required', example='T-0001',
+                        description='Unique identifier for the test within its group, can be A-Z, a-z, 0-9, and special characters'),
+    'status': Field(TestStatusEnum, required=True, help='Status is required. {error_msg}', example='Pending'),
+    'group_id': Field(int, required=True, help='Group ID is required', example=1),
+    'method_id': Field(int, required=True, help='Method ID is required', example=1),
+    'description': Field(str, example='Test description'),
+})
+
+UPDATE_TEST = Schema('UpdateTestSchema', {
+    'name': Field(str, trim=True, help='Test name is required {error_msg}', example='Test Name'),
+    'display_id': Field(str, trim=True, help='Display ID is required {error_msg}', example='T-0001'),
+    'status': Field(TestStatusEnum, help='Status is required {error_msg}', example='InProgress'),
+    'group_id': Field(int, help='Group ID is required {error_msg}', example=1),
+    'method_id': Field(int, help='Method ID is required {error_msg}', example=1),
+    'description': Field(str, help='Description of the test {error_msg}', example='Test description'),
+})
 
 class TestDetailResource(Resource):
     """Test detail resource for managing a single test."""
@@ -116,7 +139,7 @@ For now, `display_id` is not used in any URL endpoints. That is, you cannot retr
               in: body
               required: true
               schema:
-                $ref: '#/definitions/CreateTestSchema'
+                $ref: '#/definitions/UpdateTestSchema'
         responses:
             200:
                 description: The updated test.
@@ -139,18 +162,9 @@ For now, `display_id` is not used in any URL endpoints. That is, you cannot retr
                             type: string
                             example: "Test not found"
         """
-        from flaskr.db import get_db, Test, TestStatusEnum
-        parser = reqparse.RequestParser()
-        parser.add_argument('name', type=str, trim=True, required=False, help='Test name is required {error_msg}')
-        parser.add_argument('display_id', type=str, trim=True, required=False, help='Display ID is required {error_msg}')
-        parser.add_argument('status', type=TestStatusEnum, required=False, help='Status is required {error_msg}')
-        parser.add_argument('group_id', type=int, required=False, help='Group ID is required {error_msg}')
-        parser.add_argument('method_id', type=int, required=False, help='Method ID is required {error_msg}')
-        parser.add_argument('description', type=str, required=False, help='Description of the test {error_msg}')
-        
-
+        from flaskr.db import get_db, Test
+        args = UPDATE_TEST.parse()
         try:
-            args = parser.parse_args(strict=True)
             db = get_db()
             test = db.session.query(Test).filter_by(id=test_id).first()
             if not test:
@@ -250,9 +264,28 @@ class TestResource(Resource):
               required: false
               description: The order of the tests.
               enum: ["asc", "desc"]
+            - name: format
+              in: query
+              type: string
+              required: false
+              description: "`columnar` returns one array per field instead of an array of objects."
+              enum: ["rows", "columnar"]
+            - name: updated_since
+              in: query
+              type: integer
+              required: false
+              description: "A `sync_token` from a previous response. Returns only the tests created or changed since then, plus the IDs of deleted ones."
+        produces:
+            - application/json
+            - application/msgpack
         responses:
             200:
-                description: A list of tests.
+                description: A list of tests, or one array per field with `format=columnar`.
+                    With `updated_since`, a `DeltaSyncSchema` object whose `items` are tests.
+                headers:
+                    X-Sync-Token:
+                        type: integer
+                        description: Pass as `updated_since` to fetch only later changes.
                 schema:
                     type: array
                     items:
@@ -260,8 +293,11 @@ class TestResource(Resource):
         """
         from flaskr.db import get_db, Test
         args = request.args
+        shape = response_format()
+        since = updated_since()
         try:
             db = get_db()
+            token = current_token()
             q = db.session.query(Test)
             if args.get('group_id'):
                 q = q.filter(Test.group_id == args['group_id'])
@@ -283,8 +319,13 @@ class TestResource(Resource):
                     q = q.join(AssignedTest).filter(AssignedTest.user_id.isnot(None))
                 else:
                     q = q.outerjoin(AssignedTest).filter(AssignedTest.user_id.is_(None))
+            if since is not None:
+                q = filter_updated_since(q, Test, since)
             tests = q.all()
-            return [test.serialize for test in tests], 200
+            rows = shape_rows([test.serialize for test in tests], shape)
+            if since is not None:
+                return delta(Test, rows, since, token), 200
+            return rows, 200, {'X-Sync-Token': str(token)}
         except Exception as e:
             return {"message": str(e)}, 500
 
@@ -300,37 +341,17 @@ For now, `display_id` is not used in any URL endpoints.
         ---
         tags:
             - Test
-        definitions:
-            CreateTestSchema:
-                type: object
-                properties:
-                    name:
-                        type: string
-                        example: "Test Name"
-                    display_id:
-                        type: string
-                        example: "T-0001"
-                        pattern: "^[A-Za-z0-9-_.]+$"
-                        description: "Unique identifier for the test, can be A-Z, a-z, 0-9, and special characters"
-                    status:
-                        type: string
-                        enum: ["Pending", "InProgress", "Completed", "Failed", "Cancelled"]
-                        example: "Pending"
-                    group_id:
-                        type: integer
-                        example: 1
-                    method_id:
-                        type: integer
-                        example: 1
-                    description:
-                        type: string
-                        example: "Test description"
         parameters:
             - name: body
               in: body
               required: true
               schema:
                   $ref: '#/definitions/CreateTestSchema'
+            - name: Idempotency-Key
+              in: header
+              type: string
+              required: false
+              description: "Unique per logical request. Retries with the same key get the original response, with `Idempotent-Replayed: true`, instead of creating the test again."
         responses:
             201:
                 description: The created test.
@@ -353,15 +374,8 @@ For now, `display_id` is not used in any URL endpoints.
                             type: string
                             example: "Test already exists"
         """
-        from flaskr.db import get_db, Test, TestStatusEnum
-        parser = reqparse.RequestParser()
-        parser.add_argument('name', type=str, required=True, help='Test name is required')
-        parser.add_argument('display_id', type=str, required=True, help='Display ID is required')
-        parser.add_argument('status', type=TestStatusEnum, required=True, help='Status is required. {error_msg}')
-        parser.add_argument('group_id', type=int, required=True, help='Group ID is required')
-        parser.add_argument('method_id', type=int, required=True, help='Method ID is required')
-        parser.add_argument('description', type=str)
-        args = parser.parse_args(strict=True)
+        from flaskr.db import get_db, Test
+        args = CREATE_TEST.parse()
         current_app.logger.info(f"Creating test with args: {args}")
         try:
             db = get_db()
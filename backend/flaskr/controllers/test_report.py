@@ -1,6 +1,7 @@
-from flask_restful import Resource, reqparse
+from flask_restful import Resource
 from flask import request
-from flaskr.db import db, TestReport
+from flaskr.db import db, TestReport, ReviewStatusEnum
+from flaskr.validation import Schema, Field
 from ..services.test_report import (
     create_report,
     get_report_by_id,
@@ -11,6 +12,21 @@ from ..services.test_report import (
 )
 import traceback
 
+REVIEW_STATUSES = [s.value for s in ReviewStatusEnum]
+
+CREATE_TEST_REPORT = Schema('CreateTestReportSchema', {
+    'user_id': Field(int, required=True, help='ID of the user', example=4),
+    'content': Field(str, required=True, help='Content of the test report', example='All checks passed'),
+    'review_status': Field(str, choices=REVIEW_STATUSES, default='Pending', help='Review status of the report', example='Pending'),
+    'review_comment': Field(str, help='Review comment for the report', example='Initial review comment'),
+})
+
+UPDATE_TEST_REPORT = Schema('UpdateTestReportSchema', {
+    'content': Field(str, help='Content of the test report', example='Updated content of the test report'),
+    'review_status': Field(str, choices=REVIEW_STATUSES, help='Review status of the report', example='Approved'),
+    'review_comment': Field(str, help='Review comment for the report', example='Updated review comment'),
+})
+
 class TestReportDetailResource(Resource):
     """TestReport detail resource for managing a single test report."""
 
@@ -75,20 +91,6 @@ class TestReportDetailResource(Resource):
         ---
         tags:
             - TestReport
-        definitions:
-            UpdateTestReportSchema:
-                type: object
-                properties:
-                    content:
-                        type: string
-                        example: "Updated content of the test report"
-                    review_status:
-                        type: string
-                        enum: ['Pending', 'Approved', 'Rejected']
-                        example: 'Approved'
-                    review_comment:
-                        type: string
-                        example: 'Updated review comment'
         parameters:
             - name: report_id
               in: path
@@ -122,11 +124,7 @@ class TestReportDetailResource(Resource):
                             type: string
                             example: "Test report not found"
         """
-        parser = reqparse.RequestParser()
-        parser.add_argument('content', type=str, help='Content of the test report')
-        parser.add_argument('review_status', type=str, choices=['Pending', 'Approved', 'Rejected'], default=None, help='Review status of the report')
-        parser.add_argument('review_comment', type=str, default=None, help='Review comment for the report')
-        args = parser.parse_args(strict=True)
+        args = UPDATE_TEST_REPORT.parse()
         try:
             report = update_report(
                 report_id=report_id,
@@ -215,21 +213,6 @@ class TestReportResource(Resource):
         ---
         tags:
             - TestReport
-        definitions:
-            CreateTestReportSchema:
-                type: object
-                properties:
-                    user_id:
-                        type: integer
-                    content:
-                        type: string
-                    review_status:
-                        type: string
-                        enum: ['Pending', 'Approved', 'Rejected']
-                        example: 'Pending'
-                    review_comment:
-                        type: string
-                        example: 'Initial review comment'
         parameters:
             - name: body
               in: body
@@ -242,6 +225,11 @@ class TestReportResource(Resource):
               type: integer
               required: true
               description: The ID of the test to create a report for.
+            - name: Idempotency-Key
+              in: header
+              type: string
+              required: false
+              description: "Unique per logical request. Retries with the same key get the original response, with `Idempotent-Replayed: true`, instead of creating the report again."
         responses:
             201:
                 description: The created test report.
@@ -264,12 +252,7 @@ class TestReportResource(Resource):
                             type: string
                             example: "Test report already exists"
         """
-        parser = reqparse.RequestParser()
-        parser.add_argument('user_id', type=int, required=True, help='ID of the user')
-        parser.add_argument('content', type=str, required=True, help='Content of the test report')
-        parser.add_argument('review_status', type=str, choices=['Pending', 'Approved', 'Rejected'], default='Pending', help='Review status of the report')
-        parser.add_argument('review_comment', type=str, default=None, help='Review comment for the report')
-        args = parser.parse_args(strict=True)
+        args = CREATE_TEST_REPORT.parse()
         try:
             report = create_report(
                 user_id=args.get('user_id'),
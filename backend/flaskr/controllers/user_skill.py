@@ -1,4 +1,9 @@
-from flask_restful import Resource, reqparse
+from flask_restful import Resource
+from flaskr.validation import Schema, Field
+
+CREATE_USER_SKILL = Schema('CreateUserSkillSchema', {
+    'skill_id': Field(int, required=True, help='Skill ID is required. {error_msg}', example=2),
+})
 
 class UserSkillResource(Resource):
     def get(self, user_id):
@@ -66,13 +71,6 @@ class UserSkillResource(Resource):
         tags:
             - User
             - Skill
-        definitions:
-            CreateUserSkillSchema:
-                type: object
-                properties:
-                    skill_id:
-                        type: integer
-                        example: 2
         parameters:
             - name: user_id
               in: path
@@ -98,14 +96,13 @@ class UserSkillResource(Resource):
                             type: string
                             example: "Invalid input"
         """
-        parser = reqparse.RequestParser()
-        parser.add_argument('skill_id', type=int, required=True, help='Skill ID is required. {error_msg}')
-        args = parser.parse_args(strict=True)
+        args = CREATE_USER_SKILL.parse()
 
         from flaskr.db import get_db, UserSkill, Skill
+        from flaskr.services.identity_cache import get_cached
         try:
             db = get_db()
-            skill = db.session.query(Skill).filter_by(id=args['skill_id']).first()
+            skill = get_cached(Skill, args['skill_id'])
             if not skill:
                 return {"message": "Skill not found"}, 404
             
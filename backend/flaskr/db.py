@@ -2,12 +2,15 @@ import click
 from flask_sqlalchemy import SQLAlchemy
 
 import enum
+import json
 from flask import current_app, g
-from sqlalchemy import Integer, String, DateTime, ForeignKey
+from sqlalchemy import Integer, BigInteger, String, DateTime, ForeignKey
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from werkzeug.security import generate_password_hash
-from sqlalchemy import Text, Enum
+from sqlalchemy import Text, Enum, LargeBinary, Boolean, Float
+from sqlalchemy import event, inspect, insert, select
+from collections import Counter
 
 db = SQLAlchemy()
 
@@ -30,8 +33,8 @@ class Role(db.Model):
             'id': self.id,
             'name': self.name,
             'description': self.description,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
 
 class User(db.Model):
@@ -41,6 +44,8 @@ class User(db.Model):
     email: Mapped[str] = mapped_column(String(DESCRIPTION_MAX_LENGTH), unique=True, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=db.func.current_timestamp())
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+    sync_version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default='0', index=True)
+    last_login: Mapped[datetime] = mapped_column(DateTime, nullable=True)  # written in batches by services.login_activity
     role_id: Mapped[int] = mapped_column(ForeignKey('role.id'), nullable=False)
     role: Mapped['Role'] = relationship(back_populates='users')
     assigned_tests: Mapped[list['AssignedTest']] = relationship(
@@ -95,8 +100,10 @@ class User(db.Model):
                 'status': t.status,
                 'display_id': t.display_id,
             } for t in self.tests],
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat(),
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'sync_version': self.sync_version,
+            'last_login': self.last_login,
             'groups': [{
                 'id': g.id,
                 'name': g.group.name,
@@ -114,6 +121,11 @@ class Group(db.Model):
     leader_id: Mapped[int] = mapped_column(ForeignKey('user.id'), nullable=False)
     leader: Mapped['User'] = relationship(back_populates='leader_groups', foreign_keys=[leader_id])
 
+    # Denormalized counters, maintained by `_maintain_group_counters` on flush.
+    # Use `flask reconcile-group-counters` to repair them if they drift.
+    member_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+    active_test_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+
     @property
     def serialize(self):
         """Return object data in easily serializeable format"""
@@ -129,19 +141,19 @@ class Group(db.Model):
             'memberCount': self.memberCount,
             'activeTests': self.activeTests,
             'description': self.description,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
 
     @property
     def memberCount(self):
         """Return the number of members in the group."""
-        return len(self.users)
+        return self.member_count or 0
     
     @property
     def activeTests(self):
         """Return the number of active tests in the group."""
-        return len([t for t in self.tests if t.status in [TestStatusEnum.Pending, TestStatusEnum.InProgress]])
+        return self.active_test_count or 0
 
 class BelongsToGroup(db.Model):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -165,8 +177,8 @@ class BelongsToGroup(db.Model):
             'id': self.id,
             'user_id': self.user_id,
             'group_id': self.group_id,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
     
 class Method(db.Model):
@@ -202,8 +214,8 @@ class Method(db.Model):
                 'description': s.description,
             } for s in self.skills],
             'description': self.description,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
 
 class TestStatusEnum(str, enum.Enum):
@@ -216,6 +228,8 @@ class TestStatusEnum(str, enum.Enum):
     def __str__(self):
         return self.value
 
+ACTIVE_TEST_STATUSES = (TestStatusEnum.Pending, TestStatusEnum.InProgress)
+
 class Test(db.Model):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)  # Unique among all tests
     display_id: Mapped[str] = mapped_column(String(NAME_MAX_LENGTH), nullable=False)  # Unique among groups only
@@ -242,6 +256,7 @@ class Test(db.Model):
     description: Mapped[str] = mapped_column(String(DESCRIPTION_MAX_LENGTH), nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=db.func.current_timestamp())
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+    sync_version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default='0', index=True)
 
     # contraint to ensure test_id is unique within the group
     __table_args__ = (
@@ -267,8 +282,9 @@ class Test(db.Model):
             'name': self.name,
             'status': self.status,
             'description': self.description,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'sync_version': self.sync_version
         }
 
 class AssignedTest(db.Model):
@@ -286,8 +302,8 @@ class AssignedTest(db.Model):
         return {
             'test_id': self.test_id,
             'user_id': self.user_id,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
     
 class ReviewStatusEnum(str, enum.Enum):
@@ -331,8 +347,8 @@ class TestReport(db.Model):
             'id': self.id,
             'test_id': self.test_id,
             'user_id': self.user_id,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat(),
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
             'content': self.content,
             'review_status': self.review_status,
             'review_comment': self.review_comment,
@@ -374,8 +390,8 @@ class Skill(db.Model):
                 'name': m.name,
                 'description': m.description,
             } for m in self.methods],
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
 
 class UserSkill(db.Model):
@@ -396,8 +412,8 @@ class UserSkill(db.Model):
             'skill': self.skill.serialize,
             'user_id': self.user_id,
             'skill_id': self.skill_id,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
     
 class AllowedSkill(db.Model):
@@ -414,8 +430,8 @@ class AllowedSkill(db.Model):
             'id': self.id,
             'method_id': self.method_id,
             'skill_id': self.skill_id,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
 
 class DeviceStatusEnum(str, enum.Enum):
@@ -447,8 +463,8 @@ class DeviceType(db.Model):
             'id': self.id,
             'name': self.name,
             'description': self.description,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
 
 class Device(db.Model):
@@ -480,6 +496,7 @@ class Device(db.Model):
     description: Mapped[str] = mapped_column(String(DESCRIPTION_MAX_LENGTH), nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=db.func.current_timestamp())
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+    sync_version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default='0', index=True)
 
     @property
     def serialize(self):
@@ -489,14 +506,25 @@ class Device(db.Model):
             'name': self.name,
             'device_type': self.device_type.serialize,
             'status': self.status,
+            'effective_status': self.effective_status,
             'position': self.position,
-            'previous_maintenance_date': self.previous_maintenance_date.isoformat() if self.previous_maintenance_date else None,
-            'next_maintenance_date': self.next_maintenance_date.isoformat() if self.next_maintenance_date else None,
+            'previous_maintenance_date': self.previous_maintenance_date,
+            'next_maintenance_date': self.next_maintenance_date,
             'description': self.description,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'sync_version': self.sync_version
         }
 
+    @property
+    def effective_status(self):
+        """Return the status derived from current reservations.
+
+        Manual Error/Maintaince statuses take precedence over reservations.
+        """
+        from flaskr.services.device_status import effective_device_status
+        return effective_device_status(self.id, self.status)
+
 class DeviceReservation(db.Model):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     device_id: Mapped[int] = mapped_column(ForeignKey('device.id'), nullable=False)
@@ -509,6 +537,7 @@ class DeviceReservation(db.Model):
     end_time: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=db.func.current_timestamp())
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+    sync_version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default='0', index=True)
 
     # end_time must be greater than start_time
     __table_args__ = (
@@ -535,10 +564,11 @@ class DeviceReservation(db.Model):
                 'status': self.test.status,
             },
             'duration': (self.end_time - self.start_time).total_seconds() / 60,  # duration in minutes
-            'start_time': self.start_time.isoformat(),
-            'end_time': self.end_time.isoformat(),
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'sync_version': self.sync_version
         }
 
     @property
@@ -559,10 +589,276 @@ class AllowedDevice(db.Model):
         return {
             'method_id': self.method_id,
             'device_id': self.device_id,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
 
+class SyncCounter(db.Model):
+    """Single-row counter handing out `sync_version` values, in commit order, on databases other than PostgreSQL."""
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    value: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+class Tombstone(db.Model):
+    """Record of a deleted row, so delta sync clients learn about deletions."""
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    table_name: Mapped[str] = mapped_column(String(NAME_MAX_LENGTH), nullable=False)
+    row_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    sync_version: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    deleted_at: Mapped[datetime] = mapped_column(DateTime, default=db.func.current_timestamp())
+
+    __table_args__ = (
+        db.Index('ix_tombstone_table_name_sync_version', 'table_name', 'sync_version'),
+    )
+
+class IdempotencyKey(db.Model):
+    """Response of a write request sent with an `Idempotency-Key` header, replayed on retries.
+
+    `status_code` is NULL while the first request is still being processed.
+    """
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    owner: Mapped[str] = mapped_column(String(NAME_MAX_LENGTH), nullable=False, default='')
+    key: Mapped[str] = mapped_column(String(255), nullable=False)
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    status_code: Mapped[int] = mapped_column(Integer, nullable=True)
+    headers: Mapped[str] = mapped_column(Text, nullable=True)
+    body: Mapped[bytes] = mapped_column(LargeBinary, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('owner', 'key', name='uq_idempotency_key_owner_key'),
+    )
+
+class DashboardSnapshot(db.Model):
+    """Precomputed dashboard payload of a group, shared by all processes.
+
+    `compare_time_range` is '' for the dashboard without comparison.
+    """
+    group_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    compare_time_range: Mapped[str] = mapped_column(String(16), primary_key=True, default='')
+    payload: Mapped[str] = mapped_column(Text, nullable=False)
+    computed_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+class JobStatusEnum(str, enum.Enum):
+    Queued = 'Queued'
+    Running = 'Running'
+    Succeeded = 'Succeeded'
+    Failed = 'Failed'
+    Cancelled = 'Cancelled'
+
+    def __str__(self):
+        return self.value
+
+FINISHED_JOB_STATUSES = (JobStatusEnum.Succeeded, JobStatusEnum.Failed, JobStatusEnum.Cancelled)
+
+class Job(db.Model):
+    """Background job, run by the job queue of whichever process claims it first."""
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String(NAME_MAX_LENGTH), nullable=False)
+    params: Mapped[str] = mapped_column(Text, nullable=False, default='{}')  # JSON
+    status: Mapped[str] = mapped_column(
+        Enum(JobStatusEnum, name='job_status'),
+        nullable=False,
+        default=JobStatusEnum.Queued
+    )
+    progress: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+    message: Mapped[str] = mapped_column(String(DESCRIPTION_MAX_LENGTH), nullable=True)
+    result: Mapped[str] = mapped_column(Text, nullable=True)  # JSON
+    error: Mapped[str] = mapped_column(Text, nullable=True)
+    cancel_requested: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    worker: Mapped[str] = mapped_column(String(255), nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_by_id: Mapped[int] = mapped_column(ForeignKey('user.id', ondelete='SET NULL'), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=db.func.current_timestamp())
+    started_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    heartbeat_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_job_status_created_at', 'status', 'created_at'),
+    )
+
+    @property
+    def serialize(self):
+        """Return object data in easily serializeable format"""
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'params': json.loads(self.params),
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'result': json.loads(self.result) if self.result is not None else None,
+            'error': self.error,
+            'cancel_requested': self.cancel_requested,
+            'attempts': self.attempts,
+            'created_by_id': self.created_by_id,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+class WorkerLease(db.Model):
+    """Named lease held by one process at a time, e.g. to elect the dashboard precompute leader."""
+    name: Mapped[str] = mapped_column(String(NAME_MAX_LENGTH), primary_key=True)
+    holder: Mapped[str] = mapped_column(String(255), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+def _previous_value(obj, key):
+    """Return the value an attribute held in the database before the current flush."""
+    history = inspect(obj).attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return None
+
+def _is_active_status(status):
+    return status is not None and TestStatusEnum(status) in ACTIVE_TEST_STATUSES
+
+@event.listens_for(db.session, 'after_flush')
+def _maintain_group_counters(session, flush_context):
+    """Keep `Group.member_count` and `Group.active_test_count` in step with
+    `BelongsToGroup` and `Test` rows, inside the same transaction as the flush."""
+    members = Counter()
+    active = Counter()
+    for obj in session.new:
+        if isinstance(obj, BelongsToGroup):
+            members[obj.group_id] += 1
+        elif isinstance(obj, Test) and _is_active_status(obj.status):
+            active[obj.group_id] += 1
+    for obj in session.deleted:
+        if isinstance(obj, BelongsToGroup):
+            members[_previous_value(obj, 'group_id')] -= 1
+        elif isinstance(obj, Test) and _is_active_status(_previous_value(obj, 'status')):
+            active[_previous_value(obj, 'group_id')] -= 1
+    for obj in session.dirty:
+        if not session.is_modified(obj):
+            continue
+        if isinstance(obj, BelongsToGroup):
+            members[_previous_value(obj, 'group_id')] -= 1
+            members[obj.group_id] += 1
+        elif isinstance(obj, Test):
+            if _is_active_status(_previous_value(obj, 'status')):
+                active[_previous_value(obj, 'group_id')] -= 1
+            if _is_active_status(obj.status):
+                active[obj.group_id] += 1
+
+    table = Group.__table__
+    touched = set()
+    for column, deltas in ((table.c.member_count, members), (table.c.active_test_count, active)):
+        for group_id, delta in deltas.items():
+            if group_id is None or delta == 0:
+                continue
+            session.connection().execute(
+                table.update().where(table.c.id == group_id).values({column: column + delta})
+            )
+            touched.add(group_id)
+    if touched:
+        session.info.setdefault('group_counters_touched', set()).update(touched)
+
+@event.listens_for(db.session, 'after_flush_postexec')
+def _expire_group_counters(session, flush_context):
+    """Expire counters updated behind the ORM's back so they are reloaded on next access."""
+    for group_id in session.info.pop('group_counters_touched', ()):
+        group = session.identity_map.get(inspect(Group).identity_key_from_primary_key((group_id,)))
+        if group is not None:
+            session.expire(group, ['member_count', 'active_test_count'])
+
+# Models whose changes are exposed through `?updated_since=` delta sync.
+SYNCED_MODELS = (User, Test, Device, DeviceReservation)
+
+def next_sync_version(connection):
+    """Return the `sync_version` of the rows written by the connection's transaction.
+
+    On PostgreSQL this is the transaction ID, so concurrent writers share no
+    lock; `flaskr.services.sync.current_token()` only hands out tokens below
+    the oldest transaction still in progress, so a client that has seen
+    version N never misses a later commit with a version below N. Other
+    databases allow a single writer at a time, and increment the
+    `sync_counter` row instead.
+    """
+    if connection.dialect.name == 'postgresql':
+        return connection.execute(select(db.func.txid_current())).scalar()
+    table = SyncCounter.__table__
+    version = connection.execute(
+        table.update().where(table.c.id == 1).values(value=table.c.value + 1).returning(table.c.value)
+    ).scalar()
+    if version is None:
+        connection.execute(table.insert().values(id=1, value=1))
+        version = 1
+    return version
+
+@event.listens_for(db.session, 'before_flush')
+def _stamp_sync_versions(session, flush_context, instances):
+    """Give rows of `SYNCED_MODELS` written by this flush a new `sync_version`,
+    and record a `Tombstone` for each deleted one."""
+    changed = [obj for obj in session.new if isinstance(obj, SYNCED_MODELS)]
+    changed += [obj for obj in session.dirty if isinstance(obj, SYNCED_MODELS) and session.is_modified(obj)]
+    deleted = [obj for obj in session.deleted if isinstance(obj, SYNCED_MODELS)]
+    if not changed and not deleted:
+        return
+    version = next_sync_version(session.connection())
+    for obj in changed:
+        obj.sync_version = version
+    for obj in deleted:
+        session.add(Tombstone(table_name=obj.__tablename__, row_id=inspect(obj).identity[0], sync_version=version))
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _stamp_bulk_statements(orm_execute_state):
+    """Do the same for ORM bulk UPDATE and DELETE statements of `SYNCED_MODELS`.
+
+    Statements run on a connection directly, outside the session, bypass both hooks.
+    """
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or not issubclass(mapper.class_, SYNCED_MODELS):
+        return
+    session = orm_execute_state.session
+    statement = orm_execute_state.statement
+    if orm_execute_state.is_update:
+        version = next_sync_version(session.connection())
+        if orm_execute_state.is_executemany:  # bulk UPDATE by primary key
+            return orm_execute_state.invoke_statement(params=[{'sync_version': version}] * len(orm_execute_state.parameters))
+        orm_execute_state.statement = statement.values(sync_version=version)
+    elif orm_execute_state.is_delete:
+        model = mapper.class_
+        ids = select(*mapper.primary_key)
+        if statement.whereclause is not None:
+            ids = ids.where(statement.whereclause)
+        row_ids = session.connection().execute(ids).scalars().all()
+        if row_ids:
+            version = next_sync_version(session.connection())
+            session.connection().execute(insert(Tombstone), [
+                {'table_name': model.__tablename__, 'row_id': row_id, 'sync_version': version} for row_id in row_ids
+            ])
+
+def reconcile_group_counters():
+    """Recompute the denormalized group counters from the source tables.
+
+    @return list: (group_id, member_count, active_test_count) of every group that had drifted,
+        with the corrected values.
+    """
+    db = get_db()
+    members = dict(
+        db.session.query(BelongsToGroup.group_id, db.func.count(BelongsToGroup.id))
+        .group_by(BelongsToGroup.group_id).all()
+    )
+    active = dict(
+        db.session.query(Test.group_id, db.func.count(Test.id))
+        .filter(Test.status.in_(ACTIVE_TEST_STATUSES))
+        .group_by(Test.group_id).all()
+    )
+    drifted = []
+    for group in db.session.query(Group).all():
+        member_count = members.get(group.id, 0)
+        active_test_count = active.get(group.id, 0)
+        if group.member_count != member_count or group.active_test_count != active_test_count:
+            group.member_count = member_count
+            group.active_test_count = active_test_count
+            drifted.append((group.id, member_count, active_test_count))
+    db.session.commit()
+    return drifted
+
 def get_db():
     """Get a database connection."""
     if 'db' not in g:
@@ -783,9 +1079,13 @@ def gen_mock_data_for_dashboard(
         num_devices: int=10,
         avg_test_duration: int=3,
         std_test_duration: int=2,
-        random_seed: int=None
+        random_seed: int=None,
+        progress=None
     ):
-    """Generate mock data for dashboard testing."""
+    """Generate mock data for dashboard testing.
+
+    `progress(fraction)` is called after each generated user, if given.
+    """
     # ======= Default Settings =======    
     db = get_db()
 
@@ -984,6 +1284,8 @@ def gen_mock_data_for_dashboard(
                 
                 db.session.add(test_report)
                 db.session.commit()
+            if progress is not None:
+                progress((i * num_user_per_group + idx + 1) / (num_groups * num_user_per_group))
     
     print('======== Summary ========')
     print(f'Total of {num_groups} groups generated.')
@@ -1047,6 +1349,27 @@ def gen_mock_data_dashboard_command(start_time, end_time, num_user_per_group, nu
     )
     click.echo('Generated mock data for dashboard testing.')
 
+@click.command('reconcile-group-counters')
+def reconcile_group_counters_command():
+    """Repair drifted group member and active test counters."""
+    drifted = reconcile_group_counters()
+    for group_id, member_count, active_test_count in drifted:
+        click.echo(f'Group {group_id}: memberCount={member_count}, activeTests={active_test_count}')
+    click.echo(f'Reconciled {len(drifted)} group(s).')
+
+@click.command('purge-idempotency-keys')
+def purge_idempotency_keys_command():
+    """Delete stored responses of expired idempotency keys."""
+    from flaskr.idempotency import get_store
+    click.echo(f'Purged {get_store().purge()} expired idempotency key(s).')
+
+@click.command('invalidate-dashboards')
+def invalidate_dashboards_command():
+    """Delete the stored dashboard snapshots, e.g. after changing data outside the API."""
+    from flaskr.services.dashboard_snapshot import get_snapshots
+    get_snapshots().invalidate()
+    click.echo('Invalidated the dashboard snapshots.')
+
 @click.command('gen-token')
 @click.option('--user-id', default=1, help='User ID to generate token for')
 @click.option('--expires', default=3600, help='Token expiration time in seconds')
@@ -1078,6 +1401,9 @@ def init_app(app):
     app.cli.add_command(gen_mock_data_command)
     app.cli.add_command(gen_token_command)
     app.cli.add_command(gen_mock_data_dashboard_command)
+    app.cli.add_command(reconcile_group_counters_command)
+    app.cli.add_command(purge_idempotency_keys_command)
+    app.cli.add_command(invalidate_dashboards_command)
     db.init_app(app)
     # Register any other commands or blueprints here
     # For example, you can register a blueprint for your API
@@ -0,0 +1,164 @@
+"""JSON response encoding.
+
+Every JSON response, from Flask-RESTful resources and from `jsonify` in
+blueprints alike, is encoded by one function chosen at startup with the
+`JSON_ENCODER` config key:
+
+- `orjson`: the default when the `orjson` package is installed.
+- `json`: the standard library, used when `orjson` is not available.
+
+Both encoders accept the values serializers hand over as they are:
+
+- datetimes, dates and times become ISO 8601 strings, matching `isoformat()`;
+- enums such as `TestStatusEnum` become their value;
+- NumPy scalars and arrays become numbers and lists;
+- other iterables such as sets become lists.
+
+Flask-RESTful resources can also answer in MessagePack (when the `msgpack`
+package is installed) to clients sending `Accept: application/msgpack`, and
+list endpoints can return the columnar shape, one array per field, with
+`?format=columnar`. Both reuse the same serializer output as JSON.
+"""
+import dataclasses
+import datetime
+import decimal
+import enum
+import json
+import uuid
+from flask import current_app, make_response, request
+from flask.json.provider import DefaultJSONProvider
+from flask_restful import abort
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+RESPONSE_FORMATS = ('rows', 'columnar')
+
+
+def _default(obj):
+    """Convert a value the encoder does not know natively."""
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if type(obj).__module__ == 'numpy' and hasattr(obj, 'tolist'):
+        # NumPy scalars and arrays; checked by module so numpy is never imported here.
+        return obj.tolist()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    if hasattr(obj, '__iter__') and not isinstance(obj, (str, bytes, dict)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def encode_json(obj, indent: bool = False) -> bytes:
+    """Encode `obj` with the standard library `json` module."""
+    if indent:
+        return json.dumps(obj, default=_default, indent=2).encode()
+    return json.dumps(obj, default=_default, separators=(',', ':')).encode()
+
+def encode_orjson(obj, indent: bool = False) -> bytes:
+    """Encode `obj` with `orjson`."""
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    return orjson.dumps(obj, default=_default, option=option)
+
+def encode_msgpack(obj) -> bytes:
+    """Encode `obj` as MessagePack, converting values like the JSON encoders do."""
+    return msgpack.packb(obj, default=_default)
+
+
+ENCODERS = {'json': encode_json}
+if orjson is not None:
+    ENCODERS['orjson'] = encode_orjson
+
+
+def get_encoder(app=None):
+    """Return the encode function of the given (or current) app."""
+    app = app or current_app
+    return app.extensions['json_encoder']
+
+def dumps(obj) -> bytes:
+    """Encode `obj` with the current app's encoder."""
+    return get_encoder()(obj, indent=current_app.debug)
+
+
+class JSONProvider(DefaultJSONProvider):
+    """`app.json` provider encoding with the configured encoder, so `jsonify` uses it too."""
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:
+            # Callers asking for specific `json.dumps` options get the standard library.
+            kwargs.setdefault('default', _default)
+            return json.dumps(obj, **kwargs)
+        return get_encoder(self._app)(obj).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = get_encoder(self._app)(obj, indent=indent)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def output_json(data, code, headers=None):
+    """Flask-RESTful representation for `application/json`."""
+    response = make_response(dumps(data), code)
+    response.headers.extend(headers or {})
+    response.vary.add('Accept')
+    return response
+
+def output_msgpack(data, code, headers=None):
+    """Flask-RESTful representation for `application/msgpack`."""
+    response = make_response(encode_msgpack(data), code)
+    response.headers.extend(headers or {})
+    response.vary.add('Accept')
+    return response
+
+
+def response_format() -> str:
+    """Return the `format` query parameter of a list endpoint, aborting with 400 if it is unknown."""
+    value = request.args.get('format', 'rows')
+    if value not in RESPONSE_FORMATS:
+        abort(400, message=f"Invalid format: {value}. Must be one of {', '.join(RESPONSE_FORMATS)}")
+    return value
+
+def to_columnar(rows: list) -> dict:
+    """Turn a list of serialized objects into one list per field.
+
+    Fields keep the order they first appear in; a row missing a field gets None.
+    """
+    keys = {}
+    for row in rows:
+        keys.update(dict.fromkeys(row))
+    return {key: [row.get(key) for row in rows] for key in keys}
+
+def shape_rows(rows: list, shape: str = 'rows'):
+    """Return serialized rows in the requested response shape, `rows` or `columnar`."""
+    return to_columnar(rows) if shape == 'columnar' else rows
+
+
+def init_app(app, api=None):
+    """Select the JSON encoder and install the representations on the app and a Flask-RESTful `Api`."""
+    app.config.setdefault('JSON_ENCODER', 'orjson' if orjson is not None else 'json')
+    name = app.config['JSON_ENCODER']
+    if name not in ENCODERS:
+        raise ValueError(f"Unknown JSON_ENCODER {name!r}, expected one of {', '.join(sorted(ENCODERS))}")
+    app.extensions['json_encoder'] = ENCODERS[name]
+    app.json = JSONProvider(app)
+    if api is not None:
+        api.representations['application/json'] = output_json
+        if msgpack is not None:
+            for mimetype in MSGPACK_MIMETYPES:
+                api.representations[mimetype] = output_msgpack
@@ -0,0 +1,251 @@
+"""Idempotency keys for write requests.
+
+Clients retrying a write after a timeout send the same `Idempotency-Key`
+header with every attempt. Views wrapped with `idempotent` then run once per
+key: the response of the first attempt is stored in the `idempotency_key`
+table and replayed as is, with an `Idempotent-Replayed: true` header, to
+every retry within `IDEMPOTENCY_TTL` seconds.
+
+- Keys are scoped to the JWT identity of the request, if there is one.
+- A retry with the same key but another method, path or body gets a 422:
+  the key was reused by mistake.
+- A retry arriving while the first attempt is still running gets a 409 with
+  `Retry-After`. An attempt still unfinished after `IDEMPOTENCY_LOCK_TIMEOUT`
+  seconds is considered lost, and the next retry runs the view again.
+- 5xx responses and exceptions are not stored, so the request can be retried.
+
+Completed responses are also kept in an in-process LRU cache of
+`IDEMPOTENCY_CACHE_SIZE` entries, so most replays do not query the database.
+Expired rows are deleted at most every `IDEMPOTENCY_PURGE_INTERVAL` seconds
+while storing responses, and by `flask purge-idempotency-keys`.
+"""
+import functools
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from flask import Response, current_app, request
+from prometheus_client import Counter
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from flaskr.db import db
+from flaskr.utils import optional_jwt_identity
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+# Already idempotent, never stored.
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Response headers recomputed when a stored response is replayed.
+NOT_STORED = ('Content-Length',)
+
+
+class _Stored:
+    __slots__ = ('fingerprint', 'status_code', 'headers', 'body', 'expires_at')
+
+    def __init__(self, fingerprint: str, status_code: int, headers: list, body: bytes, expires_at: datetime):
+        self.fingerprint = fingerprint
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.expires_at = expires_at
+
+    def response(self) -> Response:
+        response = Response(self.body, status=self.status_code, headers=self.headers)
+        response.headers['Idempotent-Replayed'] = 'true'
+        return response
+
+
+class IdempotencyStore:
+    """Stored responses keyed by `(owner, key)`, in the database and a front LRU cache."""
+    def __init__(self, ttl: float = 86400, lock_timeout: float = 60, cache_size: int = 1024,
+                 purge_interval: float = 3600, counter: Counter = None):
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.cache_size = cache_size
+        self.purge_interval = purge_interval
+        self.counter = counter
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # (owner, key) -> _Stored
+        self._purged_at = time.monotonic()
+
+    def begin(self, scope: tuple, fingerprint: str):
+        """Return the response to send instead of running the view, or None once `scope` is claimed."""
+        now = datetime.now()
+        stored = self._cached(scope, now)
+        if stored is None:
+            stored = self._load_or_claim(scope, fingerprint, now)
+            if stored is None:
+                self._count('executed')
+                return None
+        if stored.fingerprint != fingerprint:
+            self._count('mismatch')
+            return {"message": f"This {HEADER} was already used for a different request"}, 422
+        if stored.status_code is None:
+            self._count('in_progress')
+            return {"message": f"A request with this {HEADER} is still being processed"}, 409, {'Retry-After': '1'}
+        self._count('replayed')
+        return stored.response()
+
+    def finish(self, scope: tuple, response: Response, fingerprint: str):
+        """Store the response of the request that claimed `scope`."""
+        from flaskr.db import IdempotencyKey
+        table = IdempotencyKey.__table__
+        owner, key = scope
+        headers = [(k, v) for k, v in response.headers.items() if k not in NOT_STORED]
+        stored = _Stored(fingerprint, response.status_code, headers, response.get_data(),
+                         datetime.now() + timedelta(seconds=self.ttl))
+        with db.engine.begin() as connection:
+            connection.execute(
+                table.update()
+                .where(table.c.owner == owner, table.c.key == key, table.c.status_code.is_(None))
+                .values(status_code=stored.status_code, headers=json.dumps(headers), body=stored.body,
+                        expires_at=stored.expires_at)
+            )
+            if time.monotonic() - self._purged_at >= self.purge_interval:
+                self._purged_at = time.monotonic()
+                self.purge(connection)
+        self._remember(scope, stored)
+
+    def release(self, scope: tuple):
+        """Give up the claim on `scope`, so that a retry runs the view again."""
+        from flaskr.db import IdempotencyKey
+        table = IdempotencyKey.__table__
+        owner, key = scope
+        with db.engine.begin() as connection:
+            connection.execute(
+                table.delete().where(table.c.owner == owner, table.c.key == key, table.c.status_code.is_(None))
+            )
+
+    def purge(self, connection=None) -> int:
+        """Delete expired keys and return how many there were."""
+        from flaskr.db import IdempotencyKey
+        table = IdempotencyKey.__table__
+        statement = table.delete().where(table.c.expires_at <= datetime.now())
+        if connection is None:
+            with db.engine.begin() as connection:
+                return connection.execute(statement).rowcount
+        return connection.execute(statement).rowcount
+
+    def clear(self):
+        """Empty the front cache."""
+        with self._lock:
+            self._cache.clear()
+
+    def _cached(self, scope, now):
+        with self._lock:
+            stored = self._cache.get(scope)
+            if stored is None:
+                return None
+            if stored.expires_at <= now:
+                del self._cache[scope]
+                return None
+            self._cache.move_to_end(scope)
+            return stored
+
+    def _remember(self, scope, stored):
+        with self._lock:
+            self._cache[scope] = stored
+            self._cache.move_to_end(scope)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _load_or_claim(self, scope, fingerprint, now):
+        """Return the stored row of `scope`, or insert an in-progress row for it and return None."""
+        from flaskr.db import IdempotencyKey
+        table = IdempotencyKey.__table__
+        owner, key = scope
+        with db.engine.begin() as connection:
+            row = connection.execute(select(table).where(table.c.owner == owner, table.c.key == key)).first()
+            if row is not None:
+                abandoned = row.status_code is None and row.created_at <= now - timedelta(seconds=self.lock_timeout)
+                if row.expires_at > now and not abandoned:
+                    if row.status_code is None:
+                        return _Stored(row.fingerprint, None, None, None, row.expires_at)
+                    stored = _Stored(row.fingerprint, row.status_code, json.loads(row.headers), row.body, row.expires_at)
+                    self._remember(scope, stored)
+                    return stored
+                connection.execute(table.delete().where(table.c.id == row.id))
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(table.insert().values(
+                    owner=owner, key=key, fingerprint=fingerprint, created_at=now,
+                    expires_at=now + timedelta(seconds=self.ttl),
+                ))
+        except IntegrityError:
+            # Another attempt claimed the key in the meantime.
+            return _Stored(fingerprint, None, None, None, now)
+        return None
+
+    def _count(self, result: str):
+        if self.counter is not None:
+            self.counter.labels(result=result).inc()
+
+
+def _owner() -> str:
+    """Return the JWT identity of the current request, or '' without a valid token."""
+    identity = optional_jwt_identity()
+    return '' if identity is None else str(identity)
+
+def _fingerprint() -> str:
+    digest = hashlib.sha256()
+    for part in (request.method, request.path, request.query_string, request.get_data(cache=True)):
+        digest.update(part if isinstance(part, bytes) else part.encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def idempotent(view):
+    """Make the writes of a view idempotent per `Idempotency-Key` header, see the module docstring.
+
+    Requests without the header, and GET, HEAD and OPTIONS requests, are passed through.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None or request.method in SAFE_METHODS:
+            return view(*args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return {"message": f"{HEADER} must be between 1 and {MAX_KEY_LENGTH} characters"}, 400
+        store = get_store()
+        scope = (_owner(), key)
+        fingerprint = _fingerprint()
+        replay = store.begin(scope, fingerprint)
+        if replay is not None:
+            return replay
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except BaseException:
+            store.release(scope)
+            raise
+        if response.status_code >= 500 or response.is_streamed:
+            store.release(scope)
+        else:
+            store.finish(scope, response, fingerprint)
+        return response
+    return wrapper
+
+def get_store(app=None) -> IdempotencyStore:
+    """Return the idempotency store of the given (or current) app."""
+    app = app or current_app
+    return app.extensions['idempotency']
+
+def init_app(app):
+    """Attach the idempotency store to the app and count its outcomes in Prometheus."""
+    app.config.setdefault('IDEMPOTENCY_TTL', 86400)
+    app.config.setdefault('IDEMPOTENCY_LOCK_TIMEOUT', 60)
+    app.config.setdefault('IDEMPOTENCY_CACHE_SIZE', 1024)
+    app.config.setdefault('IDEMPOTENCY_PURGE_INTERVAL', 3600)
+    counter = None
+    registry = app.extensions.get('prometheus_registry')
+    if registry is not None:
+        counter = Counter('flaskr_idempotent_requests', 'Requests with an Idempotency-Key by outcome',
+                          ['result'], registry=registry)
+    app.extensions['idempotency'] = IdempotencyStore(
+        ttl=app.config['IDEMPOTENCY_TTL'],
+        lock_timeout=app.config['IDEMPOTENCY_LOCK_TIMEOUT'],
+        cache_size=app.config['IDEMPOTENCY_CACHE_SIZE'],
+        purge_interval=app.config['IDEMPOTENCY_PURGE_INTERVAL'],
+        counter=counter,
+    )
@@ -0,0 +1,241 @@
+"""Rate limiting of expensive endpoints.
+
+Requests matching one of `ROUTES` draw from a token bucket per budget and
+client. The client is the JWT identity when the request carries a valid
+token, and the remote address otherwise. A budget of `limit` requests per
+`period` seconds holds up to `burst` tokens (by default `limit`) and gains
+`limit / period` tokens per second. A request without a token left gets a
+429 with `Retry-After`.
+
+Limited responses, and every other response of a budgeted route, carry the
+`RateLimit-Limit`, `RateLimit-Remaining`, `RateLimit-Reset` (seconds until
+the bucket is full again) and `RateLimit-Policy` headers.
+
+Buckets live in this process by default. Set `RATELIMIT_STORAGE_URL` to a
+`redis://` URL to share them between processes; this needs the `redis`
+package. If the storage fails, requests are let through.
+
+Budgets are configured with `RATELIMIT_BUDGETS`, e.g.
+`{"login": {"limit": 10, "period": 60}}`. Adding a `default` budget limits
+every other API request as well; setting a budget to null disables it.
+"""
+import logging
+import math
+import threading
+import time
+from flask import current_app, request
+from prometheus_client import Counter
+
+from flaskr.utils import optional_jwt_identity
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGETS = {
+    # Password hashing on every attempt.
+    'login': {'limit': 10, 'period': 60},
+    # Leading-wildcard ILIKE over every test.
+    'test_search': {'limit': 60, 'period': 60, 'burst': 20},
+}
+# (endpoint, methods, query parameter that makes the request expensive or None, budget)
+ROUTES = (
+    ('userloginresource', ('POST',), None, 'login'),
+    ('testresource', ('GET',), 'name', 'test_search'),
+)
+ENVIRON_KEY = 'flaskr.ratelimit'
+
+
+class Budget:
+    """`limit` requests per `period` seconds, in bursts of up to `burst` (by default `limit`)."""
+    def __init__(self, limit: int, period: float, burst: int = None):
+        self.limit = limit
+        self.period = period
+        self.capacity = burst or limit
+        self.rate = limit / period  # tokens per second
+
+    @property
+    def policy(self) -> str:
+        """The `RateLimit-Policy` header value."""
+        policy = f'{self.limit};w={self.period:g}'
+        if self.capacity != self.limit:
+            policy += f';burst={self.capacity}'
+        return policy
+
+
+class MemoryBackend:
+    """Token buckets in this process. Every process enforces its budgets on its own."""
+    # Buckets that have refilled are dropped once there are more than this many.
+    MAX_BUCKETS = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> (tokens, updated_at, full_at)
+
+    def take(self, key: str, capacity: int, rate: float, cost: int = 1) -> tuple:
+        """Take `cost` tokens from the bucket `key` if it has them; return `(allowed, tokens left)`."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at, _ = self._buckets.get(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            if len(self._buckets) > self.MAX_BUCKETS:
+                self._buckets = {k: bucket for k, bucket in self._buckets.items() if bucket[2] > now}
+        return allowed, tokens
+
+
+# KEYS[1]: bucket; ARGV: capacity, tokens per second, cost.
+# Runs atomically on the server and uses its clock, so all processes agree.
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBackend:
+    """Token buckets in Redis (or a compatible server), shared by every process using it."""
+    def __init__(self, client, prefix: str = 'flaskr:ratelimit:'):
+        self.client = client
+        self.prefix = prefix
+        self._take = client.register_script(_TAKE_SCRIPT)
+
+    def take(self, key: str, capacity: int, rate: float, cost: int = 1) -> tuple:
+        """Take `cost` tokens from the bucket `key` if it has them; return `(allowed, tokens left)`."""
+        allowed, tokens = self._take(keys=[self.prefix + key], args=[capacity, rate, cost])
+        return bool(allowed), float(tokens)
+
+
+class Decision:
+    __slots__ = ('budget', 'allowed', 'remaining', 'reset', 'retry_after')
+
+    def __init__(self, budget: Budget, allowed: bool, tokens: float):
+        self.budget = budget
+        self.allowed = allowed
+        self.remaining = math.floor(tokens)
+        self.reset = math.ceil((budget.capacity - tokens) / budget.rate)
+        self.retry_after = 0 if allowed else max(1, math.ceil((1 - tokens) / budget.rate))
+
+    @property
+    def headers(self) -> dict:
+        return {
+            'RateLimit-Limit': str(self.budget.capacity),
+            'RateLimit-Remaining': str(self.remaining),
+            'RateLimit-Reset': str(self.reset),
+            'RateLimit-Policy': self.budget.policy,
+        }
+
+
+class RateLimiter:
+    """Applies named budgets per client on top of a bucket backend."""
+    def __init__(self, backend, budgets: dict, counter: Counter = None):
+        self.backend = backend
+        self.budgets = budgets
+        self.counter = counter
+
+    def check(self, name: str, client: str):
+        """Take a token of budget `name` for `client`; return a `Decision`, or None if the backend failed."""
+        budget = self.budgets[name]
+        try:
+            allowed, tokens = self.backend.take(f'{name}:{client}', budget.capacity, budget.rate)
+        except Exception:
+            logger.warning('Rate limit storage failed, letting the request through', exc_info=True)
+            self._count(name, 'error')
+            return None
+        self._count(name, 'allowed' if allowed else 'limited')
+        return Decision(budget, allowed, tokens)
+
+    def _count(self, name: str, result: str):
+        if self.counter is not None:
+            self.counter.labels(budget=name, result=result).inc()
+
+
+def route_budget(budgets: dict):
+    """Return the name of the budget the current request draws from, or None."""
+    for endpoint, methods, param, name in ROUTES:
+        if request.endpoint == endpoint and request.method in methods and (param is None or request.args.get(param)):
+            return name if name in budgets else None
+    return 'default' if 'default' in budgets else None
+
+def client_key() -> str:
+    """Return the JWT identity of the current request, or its remote address."""
+    identity = optional_jwt_identity()
+    if identity is not None:
+        return f'user:{identity}'
+    return f'ip:{request.remote_addr}'
+
+def _limit():
+    """`before_request` hook answering 429 once the client's budget is used up."""
+    if not request.path.startswith('/api/'):
+        return None
+    limiter = get_limiter()
+    name = route_budget(limiter.budgets)
+    if name is None:
+        return None
+    decision = limiter.check(name, client_key())
+    if decision is None:
+        return None
+    request.environ[ENVIRON_KEY] = decision
+    if not decision.allowed:
+        return ({"message": f"Too many requests, retry in {decision.retry_after} seconds"}, 429,
+                {'Retry-After': str(decision.retry_after)})
+    return None
+
+def _add_headers(response):
+    decision = request.environ.get(ENVIRON_KEY)
+    if decision is not None:
+        response.headers.update(decision.headers)
+    return response
+
+def get_limiter(app=None) -> RateLimiter:
+    """Return the rate limiter of the given (or current) app."""
+    app = app or current_app
+    return app.extensions['ratelimit']
+
+def init_app(app):
+    """Attach a rate limiter to the app and count its decisions in Prometheus."""
+    app.config.setdefault('RATELIMIT_ENABLED', True)
+    app.config.setdefault('RATELIMIT_BUDGETS', {})
+    app.config.setdefault('RATELIMIT_STORAGE_URL', None)
+    if not app.config['RATELIMIT_ENABLED']:
+        return
+    budgets = {
+        name: Budget(**budget)
+        for name, budget in {**DEFAULT_BUDGETS, **app.config['RATELIMIT_BUDGETS']}.items()
+        if budget is not None
+    }
+    url = app.config['RATELIMIT_STORAGE_URL']
+    if url:
+        if redis is None:
+            raise ValueError('RATELIMIT_STORAGE_URL requires the redis package')
+        backend = RedisBackend(redis.Redis.from_url(url))
+    else:
+        backend = MemoryBackend()
+    counter = None
+    registry = app.extensions.get('prometheus_registry')
+    if registry is not None:
+        counter = Counter('flaskr_ratelimit_requests', 'Rate limited requests by budget and decision',
+                          ['budget', 'result'], registry=registry)
+    app.extensions['ratelimit'] = RateLimiter(backend, budgets, counter=counter)
+    app.before_request(_limit)
+    app.after_request(_add_headers)
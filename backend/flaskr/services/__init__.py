@@ -7,6 +7,21 @@
 
 __all__ = [
     'user',
+    'group',
+    'inbox',
     'test_report',
-    'device_reservation'
+    'device_reservation',
+    'device_status',
+    'device_utilization',
+    'events',
+    'identity_cache',
+    'catalog',
+    'single_flight',
+    'dashboard_snapshot',
+    'dashboard_series',
+    'duration_stats',
+    'login_activity',
+    'sync',
+    'batch',
+    'jobs'
 ]
\ No newline at end of file
@@ -0,0 +1,125 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, request
+from werkzeug.datastructures import Headers
+from werkzeug.test import EnvironBuilder
+
+logger = logging.getLogger(__name__)
+
+# Headers of the batch request that are not passed on to its sub-requests.
+# Sub-responses are embedded as JSON in the batch response, which is
+# negotiated and compressed as a whole.
+NOT_FORWARDED = ('Content-Type', 'Content-Length', 'Accept', 'Accept-Encoding', 'If-None-Match', 'If-Modified-Since')
+# Sub-response headers left out of the results.
+NOT_RETURNED = ('Content-Type', 'Content-Length', 'Vary')
+
+
+def run_batch(subrequests: list, concurrent: bool = False) -> list:
+    """Run parsed sub-requests against this app and return their results in order.
+
+    Sub-requests run one after another, each in its own app context and
+    therefore its own database session, so a failed one leaves nothing
+    behind for the next. Each one goes through the usual request hooks,
+    token checks and error handlers.
+
+    With `concurrent`, consecutive GET sub-requests are spread over the batch
+    thread pool instead. Other methods still run in order, once every read
+    before them has finished.
+
+    @return list: `{"status", "headers", "body"}` for each sub-request.
+    """
+    app = current_app._get_current_object()
+    base = _base_request()
+    results = [None] * len(subrequests)
+    pending = []
+
+    def wait():
+        for i, future in pending:
+            results[i] = future.result()
+        pending.clear()
+
+    for i, sub in enumerate(subrequests):
+        if concurrent and sub['method'] == 'GET':
+            future = get_executor(app).submit(_dispatch_in_app_context, app, sub, base)
+            pending.append((i, future))
+        else:
+            wait()
+            results[i] = _dispatch_in_app_context(app, sub, base)
+    wait()
+    return results
+
+def _base_request() -> dict:
+    """Return what sub-requests take over from the current (batch) request."""
+    return {
+        'base_url': request.host_url,
+        'headers': Headers([(k, v) for k, v in request.headers.items() if k not in NOT_FORWARDED]),
+        'environ_base': {'REMOTE_ADDR': request.remote_addr},
+    }
+
+def _dispatch_in_app_context(app, sub, base):
+    with app.app_context():
+        return _dispatch(app, sub, base)
+
+def _dispatch(app, sub, base) -> dict:
+    headers = base['headers'].copy()
+    for key, value in (sub['headers'] or {}).items():
+        if key.title() not in NOT_FORWARDED:
+            headers[key] = str(value)
+    builder = EnvironBuilder(
+        path=sub['path'],
+        base_url=base['base_url'],
+        method=sub['method'],
+        query_string=sub['query'],
+        headers=headers,
+        json=sub['body'],
+        environ_base=base['environ_base'],
+    )
+    try:
+        environ = builder.get_environ()
+    finally:
+        builder.close()
+
+    # The app context pushed by the caller is reused.
+    with app.request_context(environ):
+        if request.blueprint == 'batch':
+            return _error(400, 'Batch requests cannot be nested')
+        if request.blueprint == 'events':
+            # Rejected before dispatch, which would already subscribe to the event hub.
+            return _error(400, 'Event streams cannot be batched')
+        try:
+            response = app.full_dispatch_request()
+        except Exception:
+            logger.exception('Batched %s %s failed', sub['method'], sub['path'])
+            return _error(500, 'Internal Server Error')
+        return _result(response)
+
+def _result(response) -> dict:
+    try:
+        if response.mimetype == 'text/event-stream':
+            return _error(400, 'Event streams cannot be batched')
+        body = response.get_json(silent=True) if response.is_json else response.get_data(as_text=True)
+        headers = {k: v for k, v in response.headers.items() if k not in NOT_RETURNED}
+        return {'status': response.status_code, 'headers': headers, 'body': body}
+    finally:
+        response.close()
+
+def _error(status: int, message: str) -> dict:
+    return {'status': status, 'headers': {}, 'body': {'message': message}}
+
+def get_executor(app=None) -> ThreadPoolExecutor:
+    """Return the thread pool running concurrent batched reads."""
+    app = app or current_app
+    return app.extensions['batch_executor']
+
+def init_app(app):
+    """Set the batch limits and create the thread pool for concurrent reads.
+
+    The pool is separate from the query executor, because batched dashboard
+    requests wait for their own queries on that one.
+    """
+    app.config.setdefault('BATCH_MAX_REQUESTS', 20)
+    app.config.setdefault('BATCH_WORKERS', 4)
+    app.extensions['batch_executor'] = ThreadPoolExecutor(
+        max_workers=app.config['BATCH_WORKERS'],
+        thread_name_prefix='flaskr-batch'
+    )
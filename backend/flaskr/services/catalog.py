@@ -0,0 +1,112 @@
+import hashlib
+import json
+import threading
+import time
+from flask import current_app
+
+from flaskr.db import db
+
+# Tables the catalog is built from; a change to any of them triggers a rebuild.
+# Device is not one of them: methods list their device IDs from AllowedDevice,
+# so frequent device status updates must not rebuild the catalog.
+CATALOG_MODELS = ('Role', 'Skill', 'DeviceType', 'Method', 'AllowedDevice', 'AllowedSkill', 'Group')
+
+
+def build_catalog() -> dict:
+    """Load roles, skills, device types, methods and groups with plain column queries.
+
+    Methods only carry the IDs of their allowed devices and skills; clients
+    resolve them against the other lists.
+    """
+    from flaskr.db import Role, Skill, DeviceType, Method, AllowedDevice, AllowedSkill, Group
+    device_ids, skill_ids = {}, {}
+    for method_id, device_id in db.session.query(AllowedDevice.method_id, AllowedDevice.device_id).order_by(AllowedDevice.device_id):
+        device_ids.setdefault(method_id, []).append(device_id)
+    for method_id, skill_id in db.session.query(AllowedSkill.method_id, AllowedSkill.skill_id).order_by(AllowedSkill.skill_id):
+        skill_ids.setdefault(method_id, []).append(skill_id)
+    return {
+        'roles': [
+            {'id': id, 'name': name, 'description': description}
+            for id, name, description in db.session.query(Role.id, Role.name, Role.description).order_by(Role.id)
+        ],
+        'skills': [
+            {'id': id, 'name': name, 'description': description}
+            for id, name, description in db.session.query(Skill.id, Skill.name, Skill.description).order_by(Skill.id)
+        ],
+        'device_types': [
+            {'id': id, 'name': name, 'description': description}
+            for id, name, description in db.session.query(DeviceType.id, DeviceType.name, DeviceType.description).order_by(DeviceType.id)
+        ],
+        'methods': [
+            {'id': id, 'name': name, 'description': description, 'device_ids': device_ids.get(id, []), 'skill_ids': skill_ids.get(id, [])}
+            for id, name, description in db.session.query(Method.id, Method.name, Method.description).order_by(Method.id)
+        ],
+        'groups': [
+            {'id': id, 'name': name, 'description': description, 'leader_id': leader_id}
+            for id, name, description, leader_id in db.session.query(Group.id, Group.name, Group.description, Group.leader_id).order_by(Group.id)
+        ],
+    }
+
+
+class Catalog:
+    """In-memory, pre-encoded snapshot of the reference data catalog.
+
+    The snapshot is keyed by the identity cache generations of `CATALOG_MODELS`,
+    so it is rebuilt only after one of those tables changed in this process,
+    or once it is older than `ttl` seconds (to pick up changes made by other
+    processes). Its version is a hash of the content, so a rebuild that finds
+    the same data keeps the same version.
+    """
+    def __init__(self, ttl: float = 60):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._key = None
+        self._built_at = 0
+        self._body = None
+        self._version = None
+
+    def get(self) -> tuple:
+        """Return `(body, version)`, where `body` is the JSON-encoded catalog."""
+        from flaskr.services.identity_cache import get_cache
+        key = get_cache().generation(*CATALOG_MODELS)
+        snapshot = self._current(key)
+        if snapshot is not None:
+            return snapshot
+        with self._build_lock:
+            # Another request may have rebuilt it while we waited.
+            snapshot = self._current(key)
+            if snapshot is not None:
+                return snapshot
+            body, version = self._encode(build_catalog())
+            with self._lock:
+                self._key, self._built_at, self._body, self._version = key, time.monotonic(), body, version
+            return body, version
+
+    def invalidate(self):
+        """Force a rebuild on the next `get()`."""
+        with self._lock:
+            self._key = None
+
+    def _current(self, key):
+        with self._lock:
+            if self._key == key and time.monotonic() - self._built_at < self.ttl:
+                return self._body, self._version
+        return None
+
+    @staticmethod
+    def _encode(catalog: dict) -> tuple:
+        content = json.dumps(catalog, sort_keys=True, separators=(',', ':'))
+        version = hashlib.sha256(content.encode()).hexdigest()[:32]
+        return json.dumps({'version': version, **catalog}).encode(), version
+
+
+def get_catalog(app=None) -> Catalog:
+    """Return the catalog snapshot of the given (or current) app."""
+    app = app or current_app
+    return app.extensions['catalog']
+
+def init_app(app):
+    """Attach the catalog snapshot to the app."""
+    app.config.setdefault('CATALOG_TTL', 60)  # seconds
+    app.extensions['catalog'] = Catalog(app.config['CATALOG_TTL'])
@@ -0,0 +1,172 @@
+"""Time-bucketed trend series for dashboard charts.
+
+Each series covers one group between `start` and `end`, split into hour, day
+or week buckets (weeks start on Monday). The four metrics come from a single
+`GROUP BY bucket` query over a `UNION ALL` of the group's tests, device
+reservations and test reports, bucketed with `date_trunc` on PostgreSQL and
+`strftime` on SQLite:
+
+- `completed_tests` and `failed_tests`: tests by their creation time, as the
+  dashboard totals count them;
+- `reservation_minutes`: reserved device time, attributed to the bucket in
+  which the reservation starts;
+- `active_users`: distinct users who reserved a device or submitted a test
+  report.
+
+Buckets without any row are filled with zeros in Python, and trailing moving
+averages are computed with NumPy.
+"""
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import Integer, Float, case, cast, distinct, func, literal, null, select, union_all
+
+from flaskr.db import db, Test, TestReport, DeviceReservation, TestStatusEnum
+
+GRANULARITIES = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+    'week': timedelta(weeks=1),
+}
+# Number of buckets returned when no `start` is given.
+DEFAULT_BUCKETS = {'hour': 48, 'day': 30, 'week': 12}
+METRICS = ('completed_tests', 'failed_tests', 'reservation_minutes', 'active_users')
+
+_SQLITE_BUCKETS = {
+    'hour': ('%Y-%m-%d %H:00:00',),
+    'day': ('%Y-%m-%d 00:00:00',),
+    'week': ('%Y-%m-%d 00:00:00', 'weekday 0', '-6 days'),  # back to Monday
+}
+
+
+def truncate(value: datetime, granularity: str) -> datetime:
+    """Return the start of the bucket containing `value`."""
+    value = value.replace(minute=0, second=0, microsecond=0)
+    if granularity == 'hour':
+        return value
+    value = value.replace(hour=0)
+    if granularity == 'week':
+        value -= timedelta(days=value.weekday())
+    return value
+
+
+def bucket_starts(start: datetime, end: datetime, granularity: str) -> list:
+    """Return the start of every bucket overlapping `[start, end)`."""
+    step = GRANULARITIES[granularity]
+    bucket = truncate(start, granularity)
+    buckets = []
+    while bucket < end:
+        buckets.append(bucket)
+        bucket += step
+    return buckets
+
+
+def _bucket(column, granularity: str, dialect: str):
+    if dialect == 'postgresql':
+        return func.date_trunc(granularity, column)
+    fmt, *modifiers = _SQLITE_BUCKETS[granularity]
+    return func.strftime(fmt, column, *modifiers)
+
+
+def minutes_between(start, end, dialect: str):
+    """Return the SQL expression of the minutes from `start` to `end`."""
+    if dialect == 'postgresql':
+        return func.extract('epoch', end - start) / 60
+    # Whole seconds; julianday() differences carry floating point noise.
+    return (cast(func.strftime('%s', end), Integer) - cast(func.strftime('%s', start), Integer)) / 60.0
+
+
+def series_query(group_id: int, start: datetime, end: datetime, granularity: str, dialect: str):
+    """Return the query of `(bucket, completed, failed, minutes, users)` rows of non-empty buckets."""
+    def rows(bucket, completed, failed, minutes, user_id):
+        return select(
+            _bucket(bucket, granularity, dialect).label('bucket'),
+            completed.label('completed'),
+            failed.label('failed'),
+            cast(minutes, Float).label('minutes'),
+            cast(user_id, Integer).label('user_id'),
+        )
+
+    tests = rows(
+        Test.created_at,
+        case((Test.status == TestStatusEnum.Completed, 1), else_=0),
+        case((Test.status == TestStatusEnum.Failed, 1), else_=0),
+        literal(0), null(),
+    ).where(
+        Test.group_id == group_id,
+        Test.status.in_((TestStatusEnum.Completed, TestStatusEnum.Failed)),
+        Test.created_at >= start, Test.created_at < end,
+    )
+    reservations = rows(
+        DeviceReservation.start_time, literal(0), literal(0),
+        minutes_between(DeviceReservation.start_time, DeviceReservation.end_time, dialect),
+        DeviceReservation.user_id,
+    ).join(Test, DeviceReservation.test_id == Test.id).where(
+        Test.group_id == group_id,
+        DeviceReservation.start_time >= start, DeviceReservation.start_time < end,
+    )
+    reports = rows(
+        TestReport.created_at, literal(0), literal(0), literal(0), TestReport.user_id,
+    ).join(Test, TestReport.test_id == Test.id).where(
+        Test.group_id == group_id,
+        TestReport.created_at >= start, TestReport.created_at < end,
+    )
+    combined = union_all(tests, reservations, reports).subquery()
+    return select(
+        combined.c.bucket,
+        func.sum(combined.c.completed),
+        func.sum(combined.c.failed),
+        func.sum(combined.c.minutes),
+        func.count(distinct(combined.c.user_id)),
+    ).group_by(combined.c.bucket).order_by(combined.c.bucket)
+
+
+def get_series(group_id: int, granularity: str = 'day', start: datetime = None, end: datetime = None) -> dict:
+    """Return the gap-filled series of a group; raise ValueError for an invalid range.
+
+    The result is columnar: `buckets` holds the bucket starts and `series`
+    one list per metric, aligned with them.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f'Invalid granularity: {granularity}')
+    end = end or datetime.now()
+    if start is None:
+        start = end - GRANULARITIES[granularity] * (DEFAULT_BUCKETS[granularity] - 1)
+    if start >= end:
+        raise ValueError('start must be before end')
+    buckets = bucket_starts(start, end, granularity)
+    max_buckets = current_app.config.get('DASHBOARD_SERIES_MAX_BUCKETS', 1000)
+    if len(buckets) > max_buckets:
+        raise ValueError(f'Too many buckets ({len(buckets)}), at most {max_buckets}')
+
+    query = series_query(group_id, buckets[0], end, granularity, db.engine.dialect.name)
+    index = {bucket: i for i, bucket in enumerate(buckets)}
+    series = {metric: [0] * len(buckets) for metric in METRICS}
+    for bucket, completed, failed, minutes, users in db.session.execute(query):
+        if isinstance(bucket, str):
+            bucket = datetime.fromisoformat(bucket)
+        i = index[bucket]
+        series['completed_tests'][i] = int(completed or 0)
+        series['failed_tests'][i] = int(failed or 0)
+        series['reservation_minutes'][i] = float(minutes or 0)
+        series['active_users'][i] = int(users or 0)
+    return {
+        'group_id': group_id,
+        'granularity': granularity,
+        'start': buckets[0],
+        'end': end,
+        'buckets': buckets,
+        'series': series,
+    }
+
+
+def moving_average(values, window: int) -> list:
+    """Return the trailing moving average of `values` over `window` buckets.
+
+    The first `window - 1` averages cover the buckets available so far.
+    """
+    import numpy as np
+    values = np.asarray(values, dtype=float)
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    upper = np.arange(1, len(values) + 1)
+    lower = np.maximum(upper - window, 0)
+    return ((sums[upper] - sums[lower]) / (upper - lower)).tolist()
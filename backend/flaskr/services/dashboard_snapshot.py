@@ -0,0 +1,389 @@
+"""Precomputed dashboards, served stale-while-revalidate.
+
+Dashboard payloads are stored as snapshots in the `dashboard_snapshot` table,
+shared by every process, and kept in memory once read. A snapshot younger
+than `DASHBOARD_SNAPSHOT_TTL` seconds is served as is. An older one is still
+served immediately, while a background thread recomputes it. Snapshots
+older than `DASHBOARD_SNAPSHOT_MAX_AGE` are not served at all.
+
+One process at a time, the holder of the `dashboard-precompute` lease,
+recomputes the snapshots of active groups every
+`DASHBOARD_PRECOMPUTE_INTERVAL` seconds: groups with tests changed or devices
+reserved within `DASHBOARD_ACTIVE_DAYS` days, and groups whose dashboard it
+served. Each group gets a snapshot without comparison and one per
+`compare_time_range`. The lease expires after three intervals, so another
+process takes over if the leader dies.
+
+Snapshots computed before a change made through this process to the tables
+behind the dashboard are not served, so such changes show up immediately.
+Changes are tracked per group: a test or membership hides the snapshots of its
+group only, while devices, reservations and users feed statistics shared by
+every group and hide all snapshots. Changes made by other processes show up
+once the snapshot is refreshed.
+"""
+import asyncio
+import atexit
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from prometheus_client import Counter
+from sqlalchemy import event, select, union
+from sqlalchemy.orm.attributes import get_history
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from flaskr.db import db
+
+logger = logging.getLogger(__name__)
+
+COMPARE_TIME_RANGES = (None, 'week', 'month')
+LEASE_NAME = 'dashboard-precompute'
+# Tables behind the dashboard whose rows belong to one group, by the column naming it.
+# Changes to the other tables in DASHBOARD_MODELS affect every group.
+GROUP_COLUMNS = {'Test': 'group_id', 'BelongsToGroup': 'group_id'}
+
+
+def acquire_lease(name: str, holder: str, seconds: float) -> bool:
+    """Take or renew the lease `name` for `seconds`; return False if another holder has it."""
+    from flaskr.db import WorkerLease
+    table = WorkerLease.__table__
+    now = datetime.now()
+    expires_at = now + timedelta(seconds=seconds)
+    with db.engine.begin() as connection:
+        renewed = connection.execute(
+            table.update()
+            .where(table.c.name == name, (table.c.holder == holder) | (table.c.expires_at <= now))
+            .values(holder=holder, expires_at=expires_at)
+        ).rowcount
+    if renewed:
+        return True
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(table.insert().values(name=name, holder=holder, expires_at=expires_at))
+    except IntegrityError:
+        return False
+    return True
+
+def release_lease(name: str, holder: str):
+    """Give up the lease `name` if `holder` has it."""
+    from flaskr.db import WorkerLease
+    table = WorkerLease.__table__
+    with db.engine.begin() as connection:
+        connection.execute(table.delete().where(table.c.name == name, table.c.holder == holder))
+
+
+class _Snapshot:
+    __slots__ = ('value', 'computed_at')
+
+    def __init__(self, value, computed_at: float):
+        self.value = value
+        self.computed_at = computed_at  # time.time() when the computation started
+
+
+class DashboardSnapshots:
+    """Dashboard snapshots of every group, see the module docstring.
+
+    `build(group_id, compare_time_range)` is the coroutine computing a payload.
+    """
+    def __init__(self, app, build, ttl: float = 60, max_age: float = 3600, interval: float = 30,
+                 active_days: int = 30, counter: Counter = None):
+        self.app = app
+        self.build = build
+        self.ttl = ttl
+        self.max_age = max_age
+        self.interval = interval
+        self.active_days = active_days
+        self.counter = counter
+        self.holder = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._lock = threading.Lock()
+        self._snapshots = {}     # (group_id, compare_time_range) -> _Snapshot
+        self._refreshing = set()
+        self._changed_at = 0.0   # when a change affecting every group was last seen
+        self._group_changed_at = {}  # group_id -> when a change to that group was last seen
+        self._stop = threading.Event()
+        self._thread = None
+
+    def get(self, group_id: int, compare_time_range: str = None):
+        """Return the snapshot of a dashboard, or None if there is none to serve.
+
+        A snapshot older than `ttl` is refreshed in the background.
+        """
+        if compare_time_range not in COMPARE_TIME_RANGES:
+            return None
+        key = (group_id, compare_time_range)
+        now = time.time()
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            refreshing = key in self._refreshing
+        if not refreshing and not self._fresh(key, snapshot, now):
+            # The leader may have stored a newer one.
+            snapshot = self._load(key) or snapshot
+        if not self._servable(key, snapshot, now):
+            self._count('miss')
+            return None
+        if self._fresh(key, snapshot, now):
+            self._count('fresh')
+        else:
+            self._count('stale')
+            self._refresh(key)
+        return snapshot.value
+
+    async def compute(self, group_id: int, compare_time_range: str = None):
+        """Compute a dashboard, store its snapshot and return it."""
+        started = time.time()
+        value = await self.build(group_id, compare_time_range)
+        if compare_time_range in COMPARE_TIME_RANGES:
+            self._save((group_id, compare_time_range), _Snapshot(value, started))
+        return value
+
+    def precompute(self) -> int:
+        """Recompute the snapshots of active groups if this process is the leader; return how many.
+
+        Must be called in an app context.
+        """
+        if not acquire_lease(LEASE_NAME, self.holder, self.interval * 3):
+            return 0
+        keys = [(group_id, compare_time_range)
+                for group_id in sorted(self.active_groups())
+                for compare_time_range in COMPARE_TIME_RANGES]
+
+        async def run():
+            done = 0
+            for group_id, compare_time_range in keys:
+                try:
+                    await self.compute(group_id, compare_time_range)
+                    done += 1
+                except Exception:
+                    logger.exception('Precomputing the dashboard of group %s (%s) failed', group_id, compare_time_range)
+            return done
+
+        done = asyncio.run(run())
+        self._count('precomputed', done)
+        return done
+
+    def active_groups(self) -> set:
+        """Return the IDs of groups whose dashboards are worth precomputing."""
+        from flaskr.db import Test, DeviceReservation
+        cutoff = datetime.now() - timedelta(days=self.active_days)
+        recent = union(
+            select(Test.group_id).where(Test.updated_at >= cutoff),
+            select(Test.group_id).join(DeviceReservation, DeviceReservation.test_id == Test.id)
+            .where(DeviceReservation.start_time >= cutoff),
+        )
+        groups = set(db.session.execute(recent).scalars())
+        with self._lock:
+            groups.update(group_id for group_id, _ in self._snapshots)
+        return groups
+
+    def changed(self, group_ids):
+        """Stop serving the snapshots of `group_ids` computed so far; None among them stands for every group."""
+        now = time.time()
+        with self._lock:
+            for group_id in group_ids:
+                if group_id is None:
+                    self._changed_at = now
+                else:
+                    self._group_changed_at[group_id] = now
+
+    def invalidate(self):
+        """Stop serving every snapshot computed so far: forget them here and
+        delete them from the database, so that other processes recompute them too."""
+        from flaskr.db import DashboardSnapshot
+        table = DashboardSnapshot.__table__
+        now = time.time()
+        with self._lock:
+            self._changed_at = now
+            self._snapshots.clear()
+        try:
+            with self.app.app_context(), db.engine.begin() as connection:
+                connection.execute(table.delete().where(table.c.computed_at <= datetime.fromtimestamp(now)))
+        except SQLAlchemyError:
+            logger.warning('Deleting the dashboard snapshots failed', exc_info=True)
+
+    def start(self):
+        """Start the precompute thread, unless it runs already."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None and self.interval > 0:
+                self._thread = threading.Thread(target=self._run, name='dashboard-precompute', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Stop the precompute thread and hand the lease over."""
+        self._stop.set()
+        if self._thread is not None:
+            with self.app.app_context():
+                try:
+                    release_lease(LEASE_NAME, self.holder)
+                except SQLAlchemyError:
+                    pass
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self.app.app_context():
+                try:
+                    self.precompute()
+                except Exception:
+                    logger.exception('Dashboard precomputation failed')
+            self._stop.wait(self.interval)
+
+    def _fresh(self, key, snapshot, now) -> bool:
+        return self._servable(key, snapshot, now) and now - snapshot.computed_at < self.ttl
+
+    def _servable(self, key, snapshot, now) -> bool:
+        changed_at = max(self._changed_at, self._group_changed_at.get(key[0], 0.0))
+        return (snapshot is not None and snapshot.computed_at >= changed_at
+                and now - snapshot.computed_at < self.max_age)
+
+    def _load(self, key):
+        from flaskr.db import DashboardSnapshot
+        table = DashboardSnapshot.__table__
+        group_id, compare_time_range = key
+        try:
+            with db.engine.connect() as connection:
+                row = connection.execute(
+                    select(table.c.payload, table.c.computed_at)
+                    .where(table.c.group_id == group_id, table.c.compare_time_range == (compare_time_range or ''))
+                ).first()
+        except SQLAlchemyError:
+            logger.warning('Loading the dashboard snapshot of group %s failed', group_id, exc_info=True)
+            return None
+        if row is None:
+            return None
+        snapshot = _Snapshot(json.loads(row.payload), row.computed_at.timestamp())
+        self._remember(key, snapshot)
+        return snapshot
+
+    def _save(self, key, snapshot):
+        from flaskr.db import DashboardSnapshot
+        table = DashboardSnapshot.__table__
+        group_id, compare_time_range = key
+        values = {
+            'group_id': group_id,
+            'compare_time_range': compare_time_range or '',
+            'payload': self.app.json.dumps(snapshot.value),
+            'computed_at': datetime.fromtimestamp(snapshot.computed_at),
+        }
+        self._remember(key, snapshot)
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(table.delete().where(
+                    table.c.group_id == group_id, table.c.compare_time_range == values['compare_time_range'],
+                    table.c.computed_at <= values['computed_at'],
+                ))
+                connection.execute(table.insert().values(**values))
+        except IntegrityError:
+            pass  # A newer snapshot was stored meanwhile.
+        except SQLAlchemyError:
+            logger.warning('Storing the dashboard snapshot of group %s failed', group_id, exc_info=True)
+
+    def _remember(self, key, snapshot):
+        with self._lock:
+            current = self._snapshots.get(key)
+            if current is None or current.computed_at <= snapshot.computed_at:
+                self._snapshots[key] = snapshot
+
+    def _refresh(self, key):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        app = self.app
+
+        def run():
+            with app.app_context():
+                try:
+                    asyncio.run(self.compute(*key))
+                except Exception:
+                    logger.exception('Background refresh of the dashboard of group %s failed', key[0])
+                finally:
+                    with self._lock:
+                        self._refreshing.discard(key)
+
+        threading.Thread(target=run, name='dashboard-refresh', daemon=True).start()
+
+    def _count(self, result: str, amount: int = 1):
+        if self.counter is not None:
+            self.counter.labels(result=result).inc(amount)
+
+
+def _changed_groups(obj) -> set:
+    from flaskr.services.single_flight import DASHBOARD_MODELS
+    name = type(obj).__name__
+    if name not in DASHBOARD_MODELS:
+        return set()
+    column = GROUP_COLUMNS.get(name)
+    if column is None:
+        return {None}
+    # A row moved to another group changes both.
+    history = get_history(obj, column)
+    return {*history.added, *history.unchanged, *history.deleted}
+
+def _touch(session, group_ids):
+    if not group_ids:
+        return
+    session.info.setdefault('dashboard_groups_touched', set()).update(group_ids)
+    snapshots = current_app.extensions.get('dashboard_snapshots')
+    if snapshots is not None:
+        snapshots.changed(group_ids)
+
+@event.listens_for(db.session, 'after_flush')
+def _track_flushed_changes(session, flush_context):
+    _touch(session, {group_id for objects in (session.new, session.dirty, session.deleted)
+                     for obj in objects for group_id in _changed_groups(obj)})
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _track_bulk_statements(orm_execute_state):
+    from flaskr.services.single_flight import DASHBOARD_MODELS
+    if ((orm_execute_state.is_update or orm_execute_state.is_delete) and orm_execute_state.bind_mapper is not None
+            and orm_execute_state.bind_mapper.class_.__name__ in DASHBOARD_MODELS):
+        _touch(orm_execute_state.session, {None})
+
+@event.listens_for(db.session, 'after_commit')
+@event.listens_for(db.session, 'after_rollback')
+def _end_transaction(session):
+    # Mark the groups again so snapshots computed by other sessions between the
+    # flush and the end of this transaction are not served afterwards.
+    group_ids = session.info.pop('dashboard_groups_touched', None)
+    snapshots = current_app.extensions.get('dashboard_snapshots') if group_ids else None
+    if snapshots is not None:
+        snapshots.changed(group_ids)
+
+
+def get_snapshots(app=None) -> DashboardSnapshots:
+    """Return the dashboard snapshots of the given (or current) app."""
+    app = app or current_app
+    return app.extensions['dashboard_snapshots']
+
+def init_app(app, build):
+    """Attach the dashboard snapshots to the app and start precomputing on its first request.
+
+    `build(group_id, compare_time_range)` is the coroutine computing a dashboard.
+    """
+    app.config.setdefault('DASHBOARD_SNAPSHOT_TTL', 60)  # seconds
+    app.config.setdefault('DASHBOARD_SNAPSHOT_MAX_AGE', 3600)  # seconds
+    app.config.setdefault('DASHBOARD_PRECOMPUTE', not app.testing)
+    app.config.setdefault('DASHBOARD_PRECOMPUTE_INTERVAL', 30)  # seconds
+    app.config.setdefault('DASHBOARD_ACTIVE_DAYS', 30)
+    counter = None
+    registry = app.extensions.get('prometheus_registry')
+    if registry is not None:
+        counter = Counter('flaskr_dashboard_snapshots', 'Dashboard snapshots by outcome',
+                          ['result'], registry=registry)
+    snapshots = app.extensions['dashboard_snapshots'] = DashboardSnapshots(
+        app, build,
+        ttl=app.config['DASHBOARD_SNAPSHOT_TTL'],
+        max_age=app.config['DASHBOARD_SNAPSHOT_MAX_AGE'],
+        interval=app.config['DASHBOARD_PRECOMPUTE_INTERVAL'],
+        active_days=app.config['DASHBOARD_ACTIVE_DAYS'],
+        counter=counter,
+    )
+    if app.config['DASHBOARD_PRECOMPUTE']:
+        app.before_request(snapshots.start)
+        atexit.register(snapshots.stop)
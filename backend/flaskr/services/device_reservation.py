@@ -54,7 +54,7 @@ def create_device_reservation(
             "Device is already reserved during this time.",
             details={
                 "device_id": device_id,
-                "start_time": start_time.isoformat(),
+                "start_time": start_time,
                 "duration": duration,
                 "conflicted_reservations": [r.serialize for r in conflicted_reservations]
             })
@@ -106,7 +106,7 @@ def update_device_reservation(
     if conflict:
         raise ValueError("Device is already reserved during this time.", {
             "device_id": reservation.device_id,
-            "start_time": reservation.start_time.isoformat(),
+            "start_time": reservation.start_time,
             "duration": reservation.duration,
             "conflicted_reservations": [r.serialize for r in conflicted_reservations]
         })
@@ -148,9 +148,13 @@ def list_device_reservations(
     test_id: int = None,
     from_time: datetime = None,
     to_time: datetime = None,
-    group_id: int = None
+    group_id: int = None,
+    updated_since: int = None
 ):
-    """List device reservations with optional filters."""
+    """List device reservations with optional filters.
+
+    With `updated_since`, only reservations changed after that sync version are returned.
+    """
     # This function would typically interact with the database to list reservations.
     # For now, we return a mock response.
     from flaskr.db import get_db, DeviceReservation
@@ -170,5 +174,8 @@ def list_device_reservations(
         query = query.filter(DeviceReservation.start_time <= to_time)
     if group_id:
         query = query.join(DeviceReservation.test).filter_by(group_id=group_id)
+    if updated_since is not None:
+        from flaskr.services.sync import filter_updated_since
+        query = filter_updated_since(query, DeviceReservation, updated_since)
 
     return query.all()
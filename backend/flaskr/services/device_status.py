@@ -0,0 +1,321 @@
+import bisect
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import SQLAlchemyError
+
+from flaskr.db import db, Device, DeviceReservation, DeviceStatusEnum
+
+# Statuses set by hand that always win over the reservation-derived status.
+MANUAL_OVERRIDE_STATUSES = (DeviceStatusEnum.Error, DeviceStatusEnum.Maintaince)
+# Statuses that are derived from reservations rather than edited by hand.
+RESERVATION_STATUSES = (DeviceStatusEnum.Reserved, DeviceStatusEnum.Occupied)
+
+
+class DeviceStatusRegistry:
+    """In-process snapshot of the number of devices per status.
+
+    The snapshot is loaded with a single `GROUP BY status` query and dropped
+    whenever a transaction that touched a `Device` commits, so dashboards and
+    the Prometheus exporter share the same cheap counters.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = None
+        self._generation = 0
+
+    def counts(self) -> dict:
+        """Return a `{DeviceStatusEnum: count}` mapping covering every status."""
+        with self._lock:
+            counts, generation = self._counts, self._generation
+        if counts is None:
+            counts = self._load()
+            with self._lock:
+                # Only keep the snapshot if nothing invalidated it while loading.
+                if generation == self._generation:
+                    self._counts = counts
+        return dict(counts)
+
+    def invalidate(self):
+        """Drop the snapshot; the next `counts()` call reloads it."""
+        with self._lock:
+            self._counts = None
+            self._generation += 1
+
+    def _load(self) -> dict:
+        counts = {status: 0 for status in DeviceStatusEnum}
+        rows = db.session.query(Device.status, db.func.count(Device.id)).group_by(Device.status).all()
+        for status, count in rows:
+            counts[DeviceStatusEnum(status)] = count
+        return counts
+
+
+def _as_stored(value: datetime) -> datetime:
+    """Return a datetime the way a naive `DateTime` column stores it (wall time, offset dropped)."""
+    if value is not None and value.tzinfo is not None:
+        return value.replace(tzinfo=None)
+    return value
+
+
+class ReservationTimeline:
+    """Per-device timeline of current and upcoming reservation intervals.
+
+    Intervals are kept sorted by start time so the status of a device at a
+    given instant is found with a binary search. The timeline is loaded from
+    `DeviceReservation` on first use, kept up to date from committed changes
+    in this process and fully reloaded every `refresh_interval` seconds to
+    pick up changes made by other processes.
+    """
+    def __init__(self, refresh_interval: float = 300):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._starts = {}   # device_id -> [start_time, ...]
+        self._entries = {}  # device_id -> [(start_time, end_time, reservation_id), ...]
+        self._devices = {}  # reservation_id -> device_id
+        self._loaded_at = None
+        self._reloading = False
+        self._changes = []  # changes applied while a reload was in flight
+
+    def status(self, device_id: int, now: datetime = None, horizon: timedelta = timedelta(0)) -> DeviceStatusEnum:
+        """Return Occupied, Reserved or Available for a device at `now`.
+
+        A device is Reserved when its next reservation starts within `horizon`.
+        """
+        now = now or datetime.now()
+        self._ensure_loaded(now)
+        with self._lock:
+            starts = self._starts.get(device_id)
+            if not starts:
+                return DeviceStatusEnum.Available
+            entries = self._entries[device_id]
+            index = bisect.bisect_right(starts, now) - 1
+            if index >= 0 and entries[index][1] > now:
+                return DeviceStatusEnum.Occupied
+            if index + 1 < len(starts) and starts[index + 1] <= now + horizon:
+                return DeviceStatusEnum.Reserved
+            return DeviceStatusEnum.Available
+
+    def busy_devices(self, now: datetime = None, horizon: timedelta = timedelta(0)) -> dict:
+        """Return `{device_id: status}` for every device that is not Available at `now`."""
+        now = now or datetime.now()
+        self._ensure_loaded(now)
+        with self._lock:
+            device_ids = list(self._starts)
+        busy = {}
+        for device_id in device_ids:
+            status = self.status(device_id, now, horizon)
+            if status != DeviceStatusEnum.Available:
+                busy[device_id] = status
+        return busy
+
+    def upsert(self, reservation_id: int, device_id: int, start_time: datetime, end_time: datetime):
+        """Insert or move a reservation interval."""
+        with self._lock:
+            if self._reloading:
+                self._changes.append((reservation_id, device_id, start_time, end_time))
+            self._remove(reservation_id)
+            starts = self._starts.setdefault(device_id, [])
+            entries = self._entries.setdefault(device_id, [])
+            index = bisect.bisect_right(starts, start_time)
+            starts.insert(index, start_time)
+            entries.insert(index, (start_time, end_time, reservation_id))
+            self._devices[reservation_id] = device_id
+
+    def remove(self, reservation_id: int):
+        """Drop a reservation interval."""
+        with self._lock:
+            if self._reloading:
+                self._changes.append((reservation_id, None, None, None))
+            self._remove(reservation_id)
+
+    def reload(self, now: datetime = None):
+        """Rebuild the timeline from the reservations that have not ended yet."""
+        now = now or datetime.now()
+        with self._lock:
+            self._reloading = True
+            self._changes = []
+        try:
+            rows = db.session.query(
+                DeviceReservation.id, DeviceReservation.device_id,
+                DeviceReservation.start_time, DeviceReservation.end_time
+            ).filter(
+                DeviceReservation.end_time > now
+            ).order_by(
+                DeviceReservation.device_id, DeviceReservation.start_time
+            ).all()
+        except Exception:
+            with self._lock:
+                self._reloading = False
+            raise
+        starts, entries, devices = {}, {}, {}
+        for reservation_id, device_id, start_time, end_time in rows:
+            starts.setdefault(device_id, []).append(start_time)
+            entries.setdefault(device_id, []).append((start_time, end_time, reservation_id))
+            devices[reservation_id] = device_id
+        with self._lock:
+            self._starts, self._entries, self._devices = starts, entries, devices
+            self._loaded_at = time.monotonic()
+            self._reloading = False
+            changes, self._changes = self._changes, []
+        # Replay changes committed while the reload query was running.
+        for reservation_id, device_id, start_time, end_time in changes:
+            if device_id is None:
+                self.remove(reservation_id)
+            else:
+                self.upsert(reservation_id, device_id, start_time, end_time)
+
+    def invalidate(self):
+        """Force a full reload on next use."""
+        with self._lock:
+            self._loaded_at = None
+
+    def _ensure_loaded(self, now):
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > self.refresh_interval:
+            self.reload(now)
+
+    def _remove(self, reservation_id):
+        device_id = self._devices.pop(reservation_id, None)
+        if device_id is None:
+            return
+        entries = self._entries[device_id]
+        for index, entry in enumerate(entries):
+            if entry[2] == reservation_id:
+                del entries[index]
+                del self._starts[device_id][index]
+                break
+        if not entries:
+            del self._entries[device_id]
+            del self._starts[device_id]
+
+
+class DeviceStatusCollector:
+    """Prometheus collector exporting the stored status counts from the registry as
+    `flaskr_devices_by_status`, and the effective ones, as the dashboard reports them,
+    as `flaskr_devices_by_effective_status`."""
+    def __init__(self, app):
+        self.app = app
+
+    def _gauges(self):
+        return (
+            GaugeMetricFamily('flaskr_devices_by_status', 'Number of devices per stored status', labels=['status']),
+            GaugeMetricFamily('flaskr_devices_by_effective_status',
+                              'Number of devices per status derived from reservations', labels=['status']),
+        )
+
+    def describe(self):
+        # Describing without samples keeps registration from querying the database.
+        yield from self._gauges()
+
+    def collect(self):
+        stored, effective = self._gauges()
+        try:
+            with self.app.app_context():
+                stored_counts = get_registry(self.app).counts()
+                effective_counts = get_effective_status_counts()
+        except SQLAlchemyError as e:
+            self.app.logger.warning(f"Unable to collect device status counts: {str(e)}")
+            return
+        for gauge, counts in ((stored, stored_counts), (effective, effective_counts)):
+            for status, count in counts.items():
+                gauge.add_metric([status.value], count)
+            yield gauge
+
+
+@event.listens_for(db.session, 'after_flush')
+def _track_device_changes(session, flush_context):
+    changed = list(session.new) + [o for o in session.dirty if session.is_modified(o)]
+    if any(isinstance(obj, Device) for obj in changed + list(session.deleted)):
+        session.info['device_status_changed'] = True
+    reservations = session.info.setdefault('reservation_changes', [])
+    for obj in changed:
+        if isinstance(obj, DeviceReservation):
+            reservations.append((obj.id, obj.device_id, _as_stored(obj.start_time), _as_stored(obj.end_time)))
+    for obj in session.deleted:
+        if isinstance(obj, DeviceReservation):
+            reservations.append((inspect(obj).identity[0], None, None, None))
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_device_status(session):
+    changed = session.info.pop('device_status_changed', False)
+    reservations = session.info.pop('reservation_changes', [])
+    if changed:
+        registry = current_app.extensions.get('device_status')
+        if registry is not None:
+            registry.invalidate()
+    timeline = current_app.extensions.get('reservation_timeline')
+    if timeline is None:
+        return
+    for reservation_id, device_id, start_time, end_time in reservations:
+        if device_id is None:
+            timeline.remove(reservation_id)
+        else:
+            timeline.upsert(reservation_id, device_id, start_time, end_time)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_device_changes(session):
+    session.info.pop('device_status_changed', None)
+    session.info.pop('reservation_changes', None)
+
+
+def get_registry(app=None) -> DeviceStatusRegistry:
+    """Return the device status registry of the given (or current) app."""
+    app = app or current_app
+    return app.extensions['device_status']
+
+def get_device_status_counts() -> dict:
+    """Return the current `{DeviceStatusEnum: count}` snapshot."""
+    return get_registry().counts()
+
+def get_timeline(app=None) -> ReservationTimeline:
+    """Return the reservation timeline of the given (or current) app."""
+    app = app or current_app
+    return app.extensions['reservation_timeline']
+
+def _reserved_horizon() -> timedelta:
+    return timedelta(minutes=current_app.config['DEVICE_RESERVED_HORIZON'])
+
+def effective_device_status(device_id: int, status, now: datetime = None) -> DeviceStatusEnum:
+    """Return the status a device effectively has at `now`.
+
+    Error and Maintaince are manual overrides and are returned as stored;
+    otherwise the device is Occupied during a reservation, Reserved when a
+    reservation starts within `DEVICE_RESERVED_HORIZON` minutes, and Available.
+    """
+    status = DeviceStatusEnum(status)
+    if status in MANUAL_OVERRIDE_STATUSES or 'reservation_timeline' not in current_app.extensions:
+        return status
+    return get_timeline().status(device_id, now, _reserved_horizon())
+
+def get_effective_status_counts(now: datetime = None) -> dict:
+    """Return a `{DeviceStatusEnum: count}` mapping of effective device statuses.
+
+    A single query counts the devices per stored status and returns the
+    handful whose stored and derived statuses can differ one by one, so both
+    come from the same state of the `device` table.
+    """
+    busy = get_timeline().busy_devices(now, _reserved_horizon())
+    candidate = db.or_(Device.id.in_(list(busy)), Device.status.in_(RESERVATION_STATUSES))
+    candidate_id = db.case((candidate, Device.id), else_=None).label('candidate_id')
+    rows = db.session.query(Device.status, candidate_id, db.func.count(Device.id)).group_by(Device.status, candidate_id).all()
+    counts = {status: 0 for status in DeviceStatusEnum}
+    for status, device_id, count in rows:
+        status = DeviceStatusEnum(status)
+        if device_id is not None and status not in MANUAL_OVERRIDE_STATUSES:
+            status = busy.get(device_id, DeviceStatusEnum.Available)
+        counts[status] += count
+    return counts
+
+def init_app(app):
+    """Attach the device status registry and reservation timeline to the app,
+    and export the status counts to Prometheus."""
+    app.config.setdefault('DEVICE_RESERVED_HORIZON', 60)  # minutes
+    app.config.setdefault('DEVICE_TIMELINE_REFRESH_INTERVAL', 300)  # seconds
+    app.extensions['device_status'] = DeviceStatusRegistry()
+    app.extensions['reservation_timeline'] = ReservationTimeline(app.config['DEVICE_TIMELINE_REFRESH_INTERVAL'])
+    registry = app.extensions.get('prometheus_registry')
+    if registry is not None:
+        registry.register(DeviceStatusCollector(app))
@@ -0,0 +1,203 @@
+"""Device utilization analytics.
+
+Reservations overlapping the requested window are loaded as three NumPy
+arrays (device, start and end, in epoch seconds computed by the database),
+clipped to the window, and every statistic is computed with array
+operations, without a Python loop over reservations:
+
+- per device, overlapping reservations are merged into busy intervals, from
+  which the busy ratio and the idle gaps between them follow;
+- across devices, the busy intervals are turned into +1/-1 events whose
+  running sum is the number of busy devices over time: its maximum is the
+  peak concurrency, and the time spent at each level is the concurrency
+  profile;
+- the hour-of-week heatmap integrates the busy intervals over an hourly grid
+  and averages each hour of the week over the weeks in the window.
+
+The window is widened to whole hours. Datetimes are naive local wall time, as
+everywhere in the database, and converted to epoch seconds as if they were
+UTC, which keeps their differences and hours of the week intact.
+"""
+import calendar
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import BigInteger, Integer, cast, func, select
+
+from flaskr.db import db, Device, DeviceReservation
+
+HOUR = 3600
+HOURS_PER_WEEK = 7 * 24
+# The Unix epoch was a Thursday; shifts epoch hours so that hour 0 of the week is Monday 00:00.
+_EPOCH_HOUR_OF_WEEK = 3 * 24
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_timestamp(value: datetime) -> int:
+    return calendar.timegm(value.timetuple())
+
+
+def from_timestamp(value) -> datetime:
+    return _EPOCH + timedelta(seconds=int(value))
+
+
+def _epoch(column, dialect: str):
+    if dialect == 'postgresql':
+        return cast(func.extract('epoch', column), BigInteger)
+    return cast(func.strftime('%s', column), Integer)
+
+
+def merge_intervals(keys, starts, ends):
+    """Merge overlapping or touching intervals with the same key.
+
+    Return `(keys, starts, ends)` of the merged intervals, sorted by key and start.
+    """
+    import numpy as np
+    if len(starts) == 0:
+        return keys[:0], starts[:0], ends[:0]
+    order = np.lexsort((starts, keys))
+    keys, starts, ends = keys[order], starts[order], ends[order]
+    # Offset each key by more than the whole time span, so that the running
+    # maximum of ends never carries over from one key to the next.
+    origin = starts.min()
+    offset = keys * (ends.max() - origin + 1) - origin
+    reach = np.maximum.accumulate(ends + offset)
+    first = np.empty(len(starts), dtype=bool)
+    first[0] = True
+    first[1:] = starts[1:] + offset[1:] > reach[:-1]
+    heads = np.flatnonzero(first)
+    return keys[heads], starts[heads], np.maximum.reduceat(ends, heads)
+
+
+def idle_gaps(count: int, keys, starts, ends, window_start: int, window_end: int):
+    """Return `(keys, lengths)` of the non-empty gaps around the merged intervals of each of `count` keys."""
+    import numpy as np
+    every = np.arange(count)
+    gap_keys = np.concatenate((every, keys))
+    gap_starts = np.concatenate((np.full(count, window_start), ends))
+    gap_ends = np.concatenate((starts, np.full(count, window_end)))
+    # Per key, the gaps run from [window start, end of each interval] to [start of each interval, window end].
+    gap_starts = gap_starts[np.lexsort((gap_starts, gap_keys))]
+    end_keys = np.concatenate((keys, every))
+    order = np.lexsort((gap_ends, end_keys))
+    gap_ends = gap_ends[order]
+    gap_keys = end_keys[order]
+    lengths = gap_ends - gap_starts
+    positive = lengths > 0
+    return gap_keys[positive], lengths[positive]
+
+
+def concurrency(starts, ends, window_start: int, window_end: int):
+    """Return `(peak, peak_at, seconds_per_level)` of the number of intervals in progress."""
+    import numpy as np
+    if len(starts) == 0:
+        return 0, None, np.array([window_end - window_start])
+    times = np.concatenate((starts, ends))
+    steps = np.concatenate((np.ones(len(starts), dtype=np.int64), -np.ones(len(ends), dtype=np.int64)))
+    order = np.lexsort((steps, times))  # ends before starts at the same instant
+    times, levels = times[order], np.cumsum(steps[order])
+    durations = np.diff(times, append=window_end)
+    seconds = np.bincount(levels, weights=durations)
+    seconds[0] += times[0] - window_start
+    peak = int(levels.max())
+    return peak, int(times[np.argmax(levels)]), seconds
+
+
+def busy_seconds_until(edges, starts, ends):
+    """Return, for each edge, the total time covered by the intervals before it."""
+    import numpy as np
+    starts, ends = np.sort(starts), np.sort(ends)
+    started = np.searchsorted(starts, edges)
+    ended = np.searchsorted(ends, edges)
+    start_sums = np.concatenate(([0], np.cumsum(starts)))
+    end_sums = np.concatenate(([0], np.cumsum(ends)))
+    return (started * edges - start_sums[started]) - (ended * edges - end_sums[ended])
+
+
+def hour_of_week_heatmap(count: int, starts, ends, window_start: int, window_end: int):
+    """Return the 7 x 24 busy ratios of `count` devices, Monday first, per hour of the week."""
+    import numpy as np
+    edges = np.arange(window_start, window_end + 1, HOUR)
+    busy = np.diff(busy_seconds_until(edges, starts, ends))
+    hour_of_week = (edges[:-1] // HOUR + _EPOCH_HOUR_OF_WEEK) % HOURS_PER_WEEK
+    busy = np.bincount(hour_of_week, weights=busy, minlength=HOURS_PER_WEEK)
+    capacity = np.bincount(hour_of_week, minlength=HOURS_PER_WEEK) * HOUR * count
+    ratios = np.divide(busy, capacity, out=np.zeros(HOURS_PER_WEEK), where=capacity > 0)
+    return ratios.reshape(7, 24)
+
+
+def load_reservations(window_start: datetime, window_end: datetime, device_type_id: int = None):
+    """Return `(devices, rows)`: the `(id, name)` of the devices and an `(n, 3)` array of
+    `device_id, start, end` of their reservations overlapping the window."""
+    import numpy as np
+    dialect = db.engine.dialect.name
+    devices = select(Device.id, Device.name).order_by(Device.id)
+    reservations = select(
+        DeviceReservation.device_id,
+        _epoch(DeviceReservation.start_time, dialect),
+        _epoch(DeviceReservation.end_time, dialect),
+    ).where(DeviceReservation.start_time < window_end, DeviceReservation.end_time > window_start)
+    if device_type_id is not None:
+        devices = devices.where(Device.device_type_id == device_type_id)
+        reservations = reservations.join(Device, DeviceReservation.device_id == Device.id).where(
+            Device.device_type_id == device_type_id)
+    devices = db.session.execute(devices).all()
+    rows = np.array(db.session.execute(reservations).all(), dtype=np.int64).reshape(-1, 3)
+    return devices, rows
+
+
+def get_utilization(start: datetime = None, end: datetime = None, device_type_id: int = None) -> dict:
+    """Return the utilization of every device (of a type) between `start` and `end`.
+
+    Raise ValueError for an invalid window.
+    """
+    import numpy as np
+    end = end or datetime.now()
+    start = start or end - timedelta(days=30)
+    if start >= end:
+        raise ValueError('start must be before end')
+    window_start = to_timestamp(start) // HOUR * HOUR
+    window_end = -(-to_timestamp(end) // HOUR) * HOUR
+    max_days = current_app.config.get('DEVICE_UTILIZATION_MAX_DAYS', 366)
+    if window_end - window_start > max_days * 24 * HOUR:
+        raise ValueError(f'The window may span at most {max_days} days')
+    span = window_end - window_start
+
+    devices, rows = load_reservations(from_timestamp(window_start), from_timestamp(window_end), device_type_id)
+    count = len(devices)
+    device_ids = np.array([device.id for device in devices], dtype=np.int64)
+    keys = np.searchsorted(device_ids, rows[:, 0])
+    starts = np.clip(rows[:, 1], window_start, window_end)
+    ends = np.clip(rows[:, 2], window_start, window_end)
+
+    reservations = np.bincount(keys, minlength=count)
+    keys, starts, ends = merge_intervals(keys, starts, ends)
+    busy = np.bincount(keys, weights=ends - starts, minlength=count)
+    gap_keys, gap_lengths = idle_gaps(count, keys, starts, ends, window_start, window_end)
+    gap_counts = np.bincount(gap_keys, minlength=count)
+    longest_gaps = np.zeros(count, dtype=np.int64)
+    np.maximum.at(longest_gaps, gap_keys, gap_lengths)
+    peak, peak_at, seconds_per_level = concurrency(starts, ends, window_start, window_end)
+    heatmap = hour_of_week_heatmap(count, starts, ends, window_start, window_end)
+
+    return {
+        'start': from_timestamp(window_start),
+        'end': from_timestamp(window_end),
+        'devices': [{
+            'device_id': device.id,
+            'name': device.name,
+            'reservations': int(reservations[i]),
+            'busy_minutes': float(busy[i]) / 60,
+            'busy_ratio': float(busy[i]) / span,
+            'idle_gaps': int(gap_counts[i]),
+            'longest_idle_minutes': int(longest_gaps[i]) / 60,
+            'mean_idle_minutes': (span - float(busy[i])) / 60 / int(gap_counts[i]) if gap_counts[i] else 0,
+        } for i, device in enumerate(devices)],
+        'fleet': {
+            'devices': count,
+            'busy_ratio': float(busy.sum() / (span * count)) if count else 0,
+            'peak_concurrency': peak,
+            'peak_at': from_timestamp(peak_at) if peak_at is not None else None,
+            'concurrency_minutes': (seconds_per_level / 60).tolist(),
+        },
+        'heatmap': heatmap.tolist(),
+    }
@@ -0,0 +1,121 @@
+"""Distribution of reservation durations per method or device type.
+
+For every method (through the reservation's test) or device type (through
+the reserved device) with reservations starting within the window, returns
+the count, mean, minimum, maximum, the `PERCENTILES` and a histogram of
+`bins` equal-width bins from 0 to the maximum. Durations are in minutes.
+
+On PostgreSQL everything is computed in the database: percentiles with
+`percentile_cont`, the histogram with `width_bucket`. Other databases lack
+both, so the durations are loaded as NumPy arrays and `numpy.percentile`
+(whose default linear interpolation matches `percentile_cont`) and
+`numpy.histogram` are used instead.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import case, func, select
+
+from flaskr.db import db, DeviceReservation, Test, Method, Device, DeviceType
+from flaskr.services.dashboard_series import minutes_between
+
+PERCENTILES = (50, 90, 99)
+# Window name -> days, None for every reservation.
+WINDOWS = {'week': 7, 'month': 30, 'quarter': 90, 'year': 365, 'all': None}
+GROUPINGS = ('method', 'device_type')
+# Tables the statistics are computed from.
+DURATION_MODELS = ('DeviceReservation', 'Test', 'Method', 'Device', 'DeviceType')
+
+
+def _durations(by: str, since: datetime, dialect: str):
+    """Return the `(key, minutes)` query of the reservations starting after `since`."""
+    minutes = minutes_between(DeviceReservation.start_time, DeviceReservation.end_time, dialect).label('minutes')
+    if by == 'method':
+        query = select(Test.method_id.label('key'), minutes).join(Test, DeviceReservation.test_id == Test.id)
+    else:
+        query = select(Device.device_type_id.label('key'), minutes).join(Device, DeviceReservation.device_id == Device.id)
+    if since is not None:
+        query = query.where(DeviceReservation.start_time >= since)
+    return query
+
+
+def _in_database(durations, bins: int) -> dict:
+    rows = durations.subquery()
+    summaries = db.session.execute(
+        select(
+            rows.c.key,
+            func.count(),
+            func.avg(rows.c.minutes),
+            func.min(rows.c.minutes),
+            func.max(rows.c.minutes),
+            *(func.percentile_cont(p / 100).within_group(rows.c.minutes) for p in PERCENTILES),
+        ).group_by(rows.c.key)
+    ).all()
+    top = func.max(rows.c.minutes).over(partition_by=rows.c.key)
+    # The maximum itself falls just past the last bin; count it in the last one, as numpy.histogram does.
+    # width_bucket rejects an empty range, so when every duration is 0 they all go to the first bin.
+    bucket = func.greatest(func.least(func.width_bucket(rows.c.minutes, 0, top, bins), bins), 1)
+    binned = select(rows.c.key, case((top > 0, bucket), else_=1).label('bin')).subquery()
+    counts = {}
+    for key, index, count in db.session.execute(
+        select(binned.c.key, binned.c.bin, func.count()).group_by(binned.c.key, binned.c.bin)
+    ):
+        counts.setdefault(key, [0] * bins)[index - 1] = count
+    return {
+        key: (count, float(mean), float(low), float(high), [float(v) for v in percentiles], counts[key])
+        for key, count, mean, low, high, *percentiles in summaries
+    }
+
+
+def _with_numpy(durations, bins: int) -> dict:
+    import numpy as np
+    rows = db.session.execute(durations).all()
+    keys = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    minutes = np.fromiter((row[1] for row in rows), dtype=float, count=len(rows))
+    order = np.argsort(keys, kind='stable')
+    keys, minutes = keys[order], minutes[order]
+    heads = np.flatnonzero(np.diff(keys, prepend=-1))
+    stats = {}
+    for key, values in zip(keys[heads].tolist(), np.split(minutes, heads[1:])):
+        # With every duration 0, numpy would center the range on 0; count them in the first bin, as on PostgreSQL.
+        counts, _ = np.histogram(values, bins=bins, range=(0, values.max() or 1))
+        stats[key] = (len(values), float(values.mean()), float(values.min()), float(values.max()),
+                      np.percentile(values, PERCENTILES).tolist(), counts.tolist())
+    return stats
+
+
+def check_arguments(by: str, window: str, bins: int):
+    """Raise ValueError unless `get_duration_stats` accepts these arguments."""
+    if by not in GROUPINGS:
+        raise ValueError(f'Invalid grouping: {by}')
+    if window not in WINDOWS:
+        raise ValueError(f'Invalid window: {window}')
+    if bins is None or not 1 <= bins <= 100:
+        raise ValueError('bins must be between 1 and 100')
+
+
+def get_duration_stats(by: str = 'method', window: str = 'month', bins: int = 20) -> dict:
+    """Return the duration statistics of every method or device type; raise ValueError for invalid arguments."""
+    check_arguments(by, window, bins)
+    since = datetime.now() - timedelta(days=WINDOWS[window]) if WINDOWS[window] else None
+    dialect = db.engine.dialect.name
+    durations = _durations(by, since, dialect)
+    stats = _in_database(durations, bins) if dialect == 'postgresql' else _with_numpy(durations, bins)
+
+    model = Method if by == 'method' else DeviceType
+    names = dict(db.session.execute(select(model.id, model.name).where(model.id.in_(stats))).all())
+    groups = []
+    for key in sorted(stats):
+        count, mean, low, high, percentiles, counts = stats[key]
+        groups.append({
+            'id': key,
+            'name': names.get(key),
+            'count': count,
+            'mean': mean,
+            'min': low,
+            'max': high,
+            **{f'p{p}': value for p, value in zip(PERCENTILES, percentiles)},
+            'histogram': {
+                'edges': [high * i / bins for i in range(bins + 1)],
+                'counts': counts,
+            },
+        })
+    return {'by': by, 'window': window, 'since': since, 'groups': groups}
@@ -0,0 +1,153 @@
+import itertools
+import queue
+import threading
+from flask import current_app
+from sqlalchemy import event, inspect
+
+from flaskr.db import db, Device, DeviceReservation, Test, TestReport
+
+
+class Subscription:
+    """A client's bounded event queue plus the filters it subscribed with.
+
+    When the client falls behind, the oldest queued events are dropped so a
+    slow consumer never blocks publishers or grows memory without bound.
+    """
+    def __init__(self, group_id=None, device_id=None, maxsize=100):
+        self.group_id = group_id
+        self.device_id = device_id
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=maxsize)
+
+    def matches(self, evt: dict) -> bool:
+        if self.group_id is not None and evt.get('group_id') != self.group_id:
+            return False
+        if self.device_id is not None and evt.get('device_id') != self.device_id:
+            return False
+        return True
+
+    def put(self, evt: dict):
+        while True:
+            try:
+                self._queue.put_nowait(evt)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None) -> dict:
+        """Return the next event, raising `queue.Empty` after `timeout` seconds."""
+        return self._queue.get(timeout=timeout)
+
+
+class EventHub:
+    """In-process fan-out of committed model changes to subscribed clients."""
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+        self._sequence = itertools.count(1)
+
+    def subscribe(self, group_id=None, device_id=None) -> Subscription:
+        subscription = Subscription(group_id, device_id, self.queue_size)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, evt: dict) -> int:
+        """Deliver an event to every matching subscription and return how many received it."""
+        evt = dict(evt, seq=next(self._sequence))
+        with self._lock:
+            targets = [s for s in self._subscriptions if s.matches(evt)]
+        for subscription in targets:
+            subscription.put(evt)
+        return len(targets)
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscriptions)
+
+
+def _value(value):
+    return getattr(value, 'value', value)
+
+def _group_of_test(session, test_id):
+    # Deleted rows cannot lazy-load their relationships, so look the group up directly.
+    if test_id is None:
+        return None
+    return session.query(Test.group_id).filter(Test.id == test_id).scalar()
+
+def _describe(session, obj, action):
+    """Build the event payload for a changed model instance, or None if it is not tracked."""
+    if isinstance(obj, DeviceReservation):
+        return {
+            'type': 'device_reservation', 'action': action, 'id': obj.id,
+            'device_id': obj.device_id, 'test_id': obj.test_id, 'user_id': obj.user_id,
+            'group_id': _group_of_test(session, obj.test_id),
+        }
+    if isinstance(obj, Test):
+        return {
+            'type': 'test', 'action': action, 'id': obj.id,
+            'group_id': obj.group_id, 'status': _value(obj.status),
+        }
+    if isinstance(obj, TestReport):
+        return {
+            'type': 'test_report', 'action': action, 'id': obj.id, 'test_id': obj.test_id,
+            'group_id': _group_of_test(session, obj.test_id),
+            'review_status': _value(obj.review_status),
+        }
+    if isinstance(obj, Device):
+        return {
+            'type': 'device', 'action': action, 'id': obj.id,
+            'device_id': obj.id, 'status': _value(obj.status),
+        }
+    return None
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_events(session, flush_context):
+    pending = session.info.setdefault('pending_events', [])
+    with session.no_autoflush:
+        for objects, action in (
+            (session.new, 'created'),
+            ([o for o in session.dirty if session.is_modified(o)], 'updated'),
+            (session.deleted, 'deleted'),
+        ):
+            for obj in objects:
+                evt = _describe(session, obj, action)
+                if evt is not None:
+                    if action == 'deleted':
+                        evt['id'] = inspect(obj).identity[0]
+                    pending.append(evt)
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_events(session):
+    pending = session.info.pop('pending_events', [])
+    hub = current_app.extensions.get('event_hub') if pending else None
+    if hub is None:
+        return
+    for evt in pending:
+        hub.publish(evt)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_events(session):
+    session.info.pop('pending_events', None)
+
+
+def get_hub(app=None) -> EventHub:
+    """Return the event hub of the given (or current) app."""
+    app = app or current_app
+    return app.extensions['event_hub']
+
+def init_app(app):
+    """Attach an event hub to the app."""
+    app.config.setdefault('EVENTS_HEARTBEAT_INTERVAL', 15)  # seconds
+    app.config.setdefault('EVENTS_QUEUE_SIZE', 100)
+    app.extensions['event_hub'] = EventHub(app.config['EVENTS_QUEUE_SIZE'])
@@ -0,0 +1,62 @@
+ROSTER_VIEWS = ('full', 'roster')
+
+def get_group_members(group_id: int, page: int = None, per_page: int = 50, view: str = 'full'):
+    """List the members of a group in a constant number of queries.
+
+    The `full` view returns `User.serialize` for every member, with roles, skills
+    (and their methods), tests and group memberships loaded by set-based queries
+    instead of per-user lazy loads. The `roster` view returns a compact shape
+    built from plain column queries.
+
+    @return tuple: (members, total)
+        - members: List of serialized members, in the order they joined the group.
+        - total: Number of members in the group.
+    """
+    from flaskr.db import get_db, User, BelongsToGroup
+    if view not in ROSTER_VIEWS:
+        raise ValueError(f"Invalid view: {view}. Must be one of {', '.join(ROSTER_VIEWS)}")
+    db = get_db()
+    memberships = db.session.query(BelongsToGroup.user_id).filter(BelongsToGroup.group_id == group_id)
+    total = memberships.count()
+    members = memberships.order_by(BelongsToGroup.id)
+    if page is not None:
+        members = members.offset((page - 1) * per_page).limit(per_page)
+    user_ids = [user_id for user_id, in members.all()]
+    if not user_ids:
+        return [], total
+    if view == 'roster':
+        return _roster(user_ids), total
+
+    from flaskr.services.user import user_serialize_options
+    users = db.session.query(User).filter(User.id.in_(user_ids)).options(*user_serialize_options()).all()
+    by_id = {user.id: user for user in users}
+    return [by_id[user_id].serialize for user_id in user_ids if user_id in by_id], total
+
+def _roster(user_ids):
+    """Build compact member entries with one query per attribute set."""
+    from flaskr.db import get_db, User, Role, Skill, UserSkill, Group, BelongsToGroup
+    db = get_db()
+    rows = db.session.query(
+        User.id, User.username, User.email, Role.id, Role.name
+    ).join(Role, User.role_id == Role.id).filter(User.id.in_(user_ids)).all()
+    members = {
+        user_id: {
+            'id': user_id,
+            'username': username,
+            'email': email,
+            'role': {'id': role_id, 'name': role_name},
+            'skills': [],
+            'groups': [],
+        } for user_id, username, email, role_id, role_name in rows
+    }
+    skills = db.session.query(UserSkill.user_id, Skill.id, Skill.name).join(
+        Skill, UserSkill.skill_id == Skill.id
+    ).filter(UserSkill.user_id.in_(user_ids)).order_by(Skill.id)
+    for user_id, skill_id, name in skills:
+        members[user_id]['skills'].append({'id': skill_id, 'name': name})
+    groups = db.session.query(BelongsToGroup.user_id, Group.id, Group.name).join(
+        Group, BelongsToGroup.group_id == Group.id
+    ).filter(BelongsToGroup.user_id.in_(user_ids)).order_by(BelongsToGroup.id)
+    for user_id, group_id, name in groups:
+        members[user_id]['groups'].append({'id': group_id, 'name': name})
+    return [members[user_id] for user_id in user_ids if user_id in members]
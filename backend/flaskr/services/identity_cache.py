@@ -0,0 +1,189 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from flaskr.db import db
+
+# Reference tables that change rarely and are looked up by primary key on most requests.
+DEFAULT_CACHED_MODELS = ('Role', 'Skill', 'DeviceType', 'Method', 'Device')
+
+
+class IdentityCache:
+    """Process-wide, read-through cache of rows looked up by primary key.
+
+    Entries hold the column values of a row, keyed by `(model name, pk)`, and
+    are evicted least-recently-used once `max_size` is reached. Every mapped
+    class has a generation counter that is bumped whenever a flush, commit,
+    rollback or bulk statement touches that class; an entry is only served
+    while the generation it was loaded under is current and it is younger
+    than `ttl` seconds (the TTL bounds staleness from other processes).
+
+    The generations are also useful on their own to key snapshots of whole
+    tables, see `generation()`.
+    """
+    def __init__(self, models=DEFAULT_CACHED_MODELS, max_size: int = 1024, ttl: float = 60):
+        self.models = frozenset(models)
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (model name, pk) -> (generation, loaded_at, values)
+        self._generations = {}         # model name -> int
+        self._hits = {}                # model name -> int
+        self._misses = {}              # model name -> int
+
+    def get(self, session, model, pk):
+        """Return the instance of `model` with primary key `pk` attached to `session`, or None."""
+        if pk is None:
+            return None
+        name = model.__name__
+        if name not in self.models or name in session.info.get('identity_cache_touched', ()):
+            # Rows changed by this transaction must come from the transaction itself.
+            return session.get(model, pk)
+        mapper = inspect(model)
+        current = session.identity_map.get(mapper.identity_key_from_primary_key((pk,)))
+        if current is not None:
+            return current
+        key = (name, pk)
+        with self._lock:
+            entry = self._entries.get(key)
+            generation = self._generations.get(name, 0)
+            if entry is not None and entry[0] == generation and time.monotonic() - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self._hits[name] = self._hits.get(name, 0) + 1
+                values = entry[2]
+            else:
+                self._misses[name] = self._misses.get(name, 0) + 1
+                values = None
+        if values is not None:
+            return self._attach(session, mapper, values)
+
+        obj = session.get(model, pk)
+        if obj is not None and obj not in session.dirty:
+            values = {attr.key: getattr(obj, attr.key) for attr in mapper.column_attrs}
+            with self._lock:
+                # A change committed while loading bumped the generation; keep the old one so it is not served.
+                self._entries[key] = (generation, time.monotonic(), values)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return obj
+
+    def generation(self, *models) -> tuple:
+        """Return the current generation of each of `models` (classes or class names)."""
+        with self._lock:
+            return tuple(self._generations.get(m if isinstance(m, str) else m.__name__, 0) for m in models)
+
+    def bump(self, names):
+        """Invalidate all cached rows of the given model names."""
+        with self._lock:
+            for name in names:
+                self._generations[name] = self._generations.get(name, 0) + 1
+
+    def clear(self):
+        """Drop every entry and reset the hit/miss statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._hits.clear()
+            self._misses.clear()
+
+    def stats(self) -> dict:
+        """Return `{'size', 'hits', 'misses', 'hit_ratio', 'models'}`; `models` maps names to (hits, misses)."""
+        with self._lock:
+            names = set(self._hits) | set(self._misses)
+            models = {name: (self._hits.get(name, 0), self._misses.get(name, 0)) for name in names}
+            size = len(self._entries)
+        hits = sum(h for h, _ in models.values())
+        misses = sum(m for _, m in models.values())
+        return {
+            'size': size,
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / (hits + misses) if hits + misses else 0.0,
+            'models': models,
+        }
+
+    @staticmethod
+    def _attach(session, mapper, values):
+        instance = mapper.class_manager.new_instance()
+        for key, value in values.items():
+            set_committed_value(instance, key, value)
+        make_transient_to_detached(instance)
+        return session.merge(instance, load=False)
+
+
+class IdentityCacheCollector:
+    """Prometheus collector exporting identity cache lookups, size and hit ratio."""
+    def __init__(self, app):
+        self.app = app
+
+    def describe(self):
+        yield CounterMetricFamily('flaskr_identity_cache_lookups', 'Identity cache lookups', labels=['model', 'result'])
+        yield GaugeMetricFamily('flaskr_identity_cache_entries', 'Rows held by the identity cache')
+        yield GaugeMetricFamily('flaskr_identity_cache_hit_ratio', 'Share of identity cache lookups served from memory')
+
+    def collect(self):
+        stats = get_cache(self.app).stats()
+        lookups = CounterMetricFamily('flaskr_identity_cache_lookups', 'Identity cache lookups', labels=['model', 'result'])
+        for name, (hits, misses) in sorted(stats['models'].items()):
+            lookups.add_metric([name, 'hit'], hits)
+            lookups.add_metric([name, 'miss'], misses)
+        yield lookups
+        yield GaugeMetricFamily('flaskr_identity_cache_entries', 'Rows held by the identity cache', value=stats['size'])
+        yield GaugeMetricFamily('flaskr_identity_cache_hit_ratio', 'Share of identity cache lookups served from memory', value=stats['hit_ratio'])
+
+
+def _touch(session, names):
+    if not names:
+        return
+    session.info.setdefault('identity_cache_touched', set()).update(names)
+    cache = current_app.extensions.get('identity_cache')
+    if cache is not None:
+        cache.bump(names)
+
+@event.listens_for(db.session, 'after_flush')
+def _track_flushed_models(session, flush_context):
+    _touch(session, {type(obj).__name__ for objects in (session.new, session.dirty, session.deleted) for obj in objects})
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _track_bulk_statements(orm_execute_state):
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and orm_execute_state.bind_mapper is not None:
+        _touch(orm_execute_state.session, {orm_execute_state.bind_mapper.class_.__name__})
+
+@event.listens_for(db.session, 'after_commit')
+@event.listens_for(db.session, 'after_rollback')
+def _end_transaction(session):
+    # Bump again so rows read by other sessions between the flush and the end
+    # of this transaction are not served afterwards.
+    names = session.info.pop('identity_cache_touched', None)
+    cache = current_app.extensions.get('identity_cache') if names else None
+    if cache is not None:
+        cache.bump(names)
+
+
+def get_cache(app=None) -> IdentityCache:
+    """Return the identity cache of the given (or current) app."""
+    app = app or current_app
+    return app.extensions['identity_cache']
+
+def get_cached(model, pk):
+    """Look up `model` by primary key through the identity cache; returns None if missing."""
+    return get_cache().get(db.session, model, pk)
+
+def init_app(app):
+    """Attach an identity cache to the app and export its statistics to Prometheus."""
+    app.config.setdefault('IDENTITY_CACHE_MODELS', DEFAULT_CACHED_MODELS)
+    app.config.setdefault('IDENTITY_CACHE_SIZE', 1024)
+    app.config.setdefault('IDENTITY_CACHE_TTL', 60)  # seconds
+    app.extensions['identity_cache'] = IdentityCache(
+        app.config['IDENTITY_CACHE_MODELS'],
+        max_size=app.config['IDENTITY_CACHE_SIZE'],
+        ttl=app.config['IDENTITY_CACHE_TTL'],
+    )
+    registry = app.extensions.get('prometheus_registry')
+    if registry is not None:
+        registry.register(IdentityCacheCollector(app))
@@ -0,0 +1,80 @@
+from datetime import datetime
+from sqlalchemy.orm import joinedload, selectinload
+
+INBOX_SORTS = ('-created_at', 'created_at')
+
+def _test_options():
+    """Loader options covering every relationship `Test.serialize` reads."""
+    from flaskr.db import Test, Method, Device
+    method = joinedload(Test.method)
+    return (
+        selectinload(Test.users),
+        method.selectinload(Method.devices).joinedload(Device.device_type),
+        method.selectinload(Method.skills),
+        selectinload(Test.test_reports),
+    )
+
+def parse_statuses(statuses):
+    """Convert status names to `TestStatusEnum` members, raising ValueError on unknown names."""
+    from flaskr.db import TestStatusEnum
+    parsed = []
+    for status in statuses or []:
+        try:
+            parsed.append(TestStatusEnum(status))
+        except ValueError:
+            raise ValueError(f"Invalid status: {status}. Must be one of {', '.join(s.value for s in TestStatusEnum)}")
+    return parsed
+
+def get_user_inbox(user_id: int, statuses=None, sort: str = '-created_at', page: int = None, per_page: int = 50, now: datetime = None):
+    """Collect everything a user's home screen needs in a fixed number of queries.
+
+    @param statuses: Optional list of test status names to filter assigned tests by.
+    @param sort: `-created_at` (newest first, default) or `created_at`.
+    @param page: 1-based page of assigned tests. If omitted, all matching tests are returned.
+    @param now: Reference time for upcoming reservations; defaults to the current time.
+    @return dict: {'tests', 'total', 'reservations', 'pending_reports'}, or None if the user does not exist.
+    """
+    from flaskr.db import get_db, User, Test, AssignedTest, DeviceReservation, Device, TestReport, ReviewStatusEnum
+    from flaskr.services.user import user_serialize_options
+    if sort not in INBOX_SORTS:
+        raise ValueError(f"Invalid sort: {sort}. Must be one of {', '.join(INBOX_SORTS)}")
+    statuses = parse_statuses(statuses)
+    db = get_db()
+    if db.session.query(User.id).filter(User.id == user_id).first() is None:
+        return None
+    now = now or datetime.now()
+
+    tests = db.session.query(Test).join(AssignedTest, AssignedTest.test_id == Test.id).filter(AssignedTest.user_id == user_id)
+    if statuses:
+        tests = tests.filter(Test.status.in_(statuses))
+    total = tests.count()
+    if sort == 'created_at':
+        tests = tests.order_by(Test.created_at, Test.id)
+    else:
+        tests = tests.order_by(Test.created_at.desc(), Test.id.desc())
+    if page is not None:
+        tests = tests.offset((page - 1) * per_page).limit(per_page)
+    tests = tests.options(*_test_options()).all()
+
+    reservations = db.session.query(DeviceReservation).filter(
+        DeviceReservation.user_id == user_id,
+        DeviceReservation.end_time > now,
+    ).order_by(DeviceReservation.start_time).options(
+        joinedload(DeviceReservation.device).joinedload(Device.device_type),
+        joinedload(DeviceReservation.user),
+        joinedload(DeviceReservation.test),
+    ).all()
+
+    reports = db.session.query(TestReport).filter(
+        TestReport.user_id == user_id,
+        TestReport.review_status == ReviewStatusEnum.Pending,
+    ).order_by(TestReport.created_at.desc(), TestReport.id.desc()).options(
+        *user_serialize_options(TestReport.reviewer)
+    ).all()
+
+    return {
+        'tests': [t.serialize for t in tests],
+        'total': total,
+        'reservations': [r.serialize for r in reservations],
+        'pending_reports': [r.serialize for r in reports],
+    }
@@ -0,0 +1,325 @@
+"""Background jobs.
+
+Long-running operations are queued as rows of the `job` table and run off
+the request path by a pool of `JOBS_WORKERS` threads per process. Any
+process can run any job: the dispatcher of each process claims the oldest
+queued job with `SELECT ... FOR UPDATE SKIP LOCKED` followed by a
+conditional UPDATE (SQLite ignores the row lock, and the UPDATE alone keeps
+two processes from claiming the same job).
+
+Job functions are registered with `@job_kind(name)` and called as
+`func(context, **params)`. They report progress with
+`context.progress(fraction, message)`, which also raises `JobCancelled` once
+cancellation was requested, so cancellation takes effect at the next
+progress report. Their return value is stored as the JSON `result`.
+
+Running jobs are kept alive by a heartbeat every `JOBS_POLL_INTERVAL`
+seconds; a job whose heartbeat is older than `JOBS_STALE_AFTER` seconds, as
+when its process died, is queued again.
+"""
+import inspect
+import json
+import logging
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from prometheus_client import Counter
+from sqlalchemy import select
+
+from flaskr.db import db
+
+logger = logging.getLogger(__name__)
+
+JOB_KINDS = {}  # name -> function(context, **params)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job by `JobContext.progress` once cancellation was requested."""
+
+
+def job_kind(name: str):
+    """Register the decorated function as the job kind `name`."""
+    def register(func):
+        JOB_KINDS[name] = func
+        return func
+    return register
+
+
+class JobContext:
+    """Handed to a running job to report progress and notice cancellation."""
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+
+    def progress(self, fraction: float, message: str = None):
+        """Record progress between 0 and 1; raise `JobCancelled` if the job should stop."""
+        from flaskr.db import Job
+        table = Job.__table__
+        with db.engine.begin() as connection:
+            cancel_requested = connection.execute(
+                table.update()
+                .where(table.c.id == self.job_id)
+                .values(progress=min(1.0, max(0.0, fraction)), message=message, heartbeat_at=datetime.now())
+                .returning(table.c.cancel_requested)
+            ).scalar()
+        if cancel_requested:
+            raise JobCancelled()
+
+
+class JobQueue:
+    """Queues jobs and runs those claimed by this process, see the module docstring."""
+    def __init__(self, app, workers: int = 2, poll_interval: float = 1, stale_after: float = 300,
+                 counter: Counter = None):
+        self.app = app
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.counter = counter
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(workers)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._executor = None
+        self._thread = None
+
+    def enqueue(self, kind: str, params: dict = None, created_by_id: int = None):
+        """Queue a job and return it; raise ValueError for an unknown kind or parameters."""
+        from flaskr.db import Job
+        func = JOB_KINDS.get(kind)
+        if func is None:
+            raise ValueError(f'Unknown job kind: {kind}')
+        params = params or {}
+        try:
+            inspect.signature(func).bind(None, **params)
+        except TypeError as e:
+            raise ValueError(f'Invalid parameters for {kind}: {e}')
+        job = Job(kind=kind, params=json.dumps(params), created_by_id=created_by_id)
+        db.session.add(job)
+        db.session.commit()
+        self._wake.set()
+        return job
+
+    def cancel(self, job_id: int):
+        """Cancel a queued job, or ask a running one to stop; return the job, or None if there is none.
+
+        Raise ValueError if the job already finished.
+        """
+        from flaskr.db import Job, JobStatusEnum, FINISHED_JOB_STATUSES
+        table = Job.__table__
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return None
+        if job.status in FINISHED_JOB_STATUSES:
+            raise ValueError('Job already finished')
+        with db.engine.begin() as connection:
+            cancelled = connection.execute(
+                table.update()
+                .where(table.c.id == job_id, table.c.status == JobStatusEnum.Queued)
+                .values(status=JobStatusEnum.Cancelled, cancel_requested=True, finished_at=datetime.now())
+            ).rowcount
+            if not cancelled:
+                # It started meanwhile; it stops at its next progress report.
+                connection.execute(table.update().where(table.c.id == job_id).values(cancel_requested=True))
+            elif self.counter is not None:
+                self.counter.labels(kind=job.kind, status=JobStatusEnum.Cancelled.value).inc()
+        db.session.refresh(job)
+        return job
+
+    def claim(self):
+        """Mark the oldest queued job as running here and return its ID, or None if there is none."""
+        from flaskr.db import Job, JobStatusEnum
+        table = Job.__table__
+        now = datetime.now()
+        with db.engine.begin() as connection:
+            job_id = connection.execute(
+                select(table.c.id)
+                .where(table.c.status == JobStatusEnum.Queued)
+                .order_by(table.c.created_at, table.c.id)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            ).scalar()
+            if job_id is None:
+                return None
+            claimed = connection.execute(
+                table.update()
+                .where(table.c.id == job_id, table.c.status == JobStatusEnum.Queued)
+                .values(status=JobStatusEnum.Running, worker=self.worker_id, started_at=now, heartbeat_at=now,
+                        attempts=table.c.attempts + 1)
+            ).rowcount
+        # Without row locks, another process may have claimed it first; it is picked up at the next poll then.
+        return job_id if claimed else None
+
+    def run(self, job_id: int):
+        """Run a job claimed by this process and record its outcome. Must be called in an app context."""
+        from flaskr.db import Job, JobStatusEnum
+        table = Job.__table__
+        job = db.session.get(Job, job_id)
+        kind, params = job.kind, json.loads(job.params)
+        db.session.commit()
+        values = {'finished_at': datetime.now()}
+        func = JOB_KINDS.get(kind)
+        try:
+            if func is None:
+                raise ValueError(f'Unknown job kind: {kind}')
+            result = func(JobContext(job_id), **params)
+        except JobCancelled:
+            db.session.rollback()
+            values.update(status=JobStatusEnum.Cancelled)
+        except Exception as e:
+            db.session.rollback()
+            logger.exception('Job %s (%s) failed', job_id, kind)
+            values.update(status=JobStatusEnum.Failed, error=str(e) or type(e).__name__)
+        else:
+            values.update(status=JobStatusEnum.Succeeded, progress=1.0, result=json.dumps(result, default=str))
+        values['finished_at'] = datetime.now()
+        with db.engine.begin() as connection:
+            connection.execute(
+                table.update()
+                .where(table.c.id == job_id, table.c.worker == self.worker_id, table.c.status == JobStatusEnum.Running)
+                .values(**values)
+            )
+        if self.counter is not None:
+            self.counter.labels(kind=kind, status=values['status'].value).inc()
+
+    def work_once(self):
+        """Claim and run one job in the current thread; return its ID, or None if none was queued."""
+        job_id = self.claim()
+        if job_id is not None:
+            self.run(job_id)
+        return job_id
+
+    def heartbeat(self):
+        """Keep the jobs running here from being considered stale."""
+        from flaskr.db import Job, JobStatusEnum
+        table = Job.__table__
+        with db.engine.begin() as connection:
+            connection.execute(
+                table.update()
+                .where(table.c.worker == self.worker_id, table.c.status == JobStatusEnum.Running)
+                .values(heartbeat_at=datetime.now())
+            )
+
+    def requeue_stale(self) -> int:
+        """Queue again the running jobs whose process stopped sending heartbeats; return how many."""
+        from flaskr.db import Job, JobStatusEnum
+        table = Job.__table__
+        now = datetime.now()
+        stale = (table.c.status == JobStatusEnum.Running) & (table.c.heartbeat_at < now - timedelta(seconds=self.stale_after))
+        with db.engine.begin() as connection:
+            connection.execute(
+                table.update().where(stale, table.c.cancel_requested.is_(True))
+                .values(status=JobStatusEnum.Cancelled, finished_at=now)
+            )
+            return connection.execute(
+                table.update().where(stale).values(status=JobStatusEnum.Queued, worker=None)
+            ).rowcount
+
+    def start(self):
+        """Start the dispatcher thread and the worker pool, unless they run already."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None and self.workers > 0:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='flaskr-job')
+                self._thread = threading.Thread(target=self._dispatch, name='job-dispatcher', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Stop claiming jobs; jobs already running are left to finish."""
+        self._stop.set()
+        self._wake.set()
+        # A dispatch pass in progress could still claim a job it can no longer run.
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def _dispatch(self):
+        while not self._stop.is_set():
+            with self.app.app_context():
+                try:
+                    self.heartbeat()
+                    self.requeue_stale()
+                    while not self._stop.is_set() and self._slots.acquire(blocking=False):
+                        job_id = self.claim()
+                        if job_id is None:
+                            self._slots.release()
+                            break
+                        self._executor.submit(self._run_in_app_context, job_id)
+                except Exception:
+                    logger.exception('Dispatching jobs failed')
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _run_in_app_context(self, job_id):
+        try:
+            with self.app.app_context():
+                self.run(job_id)
+        except Exception:
+            logger.exception('Running job %s failed', job_id)
+        finally:
+            self._slots.release()
+            self._wake.set()
+
+
+@job_kind('reconcile_group_counters')
+def _reconcile_group_counters(context):
+    from flaskr.db import reconcile_group_counters
+    drifted = reconcile_group_counters()
+    return {'groups': [
+        {'group_id': group_id, 'member_count': member_count, 'active_test_count': active_test_count}
+        for group_id, member_count, active_test_count in drifted
+    ]}
+
+@job_kind('purge_idempotency_keys')
+def _purge_idempotency_keys(context):
+    from flaskr.idempotency import get_store
+    return {'purged': get_store().purge()}
+
+@job_kind('gen_mock_data_dashboard')
+def _gen_mock_data_dashboard(context, days: int = 14, num_user_per_group: int = 10, num_groups: int = 1,
+                             num_tests_per_group: int = 200, num_devices: int = 10, random_seed: int = None):
+    from flaskr.db import gen_mock_data_for_dashboard
+    end_time = datetime.now()
+    gen_mock_data_for_dashboard(
+        start_time=end_time - timedelta(days=days),
+        end_time=end_time,
+        num_user_per_group=num_user_per_group,
+        num_groups=num_groups,
+        num_tests_per_group=num_tests_per_group,
+        num_devices=num_devices,
+        random_seed=random_seed,
+        progress=context.progress,
+    )
+    return {'groups': num_groups, 'users': num_groups * num_user_per_group, 'devices': num_devices}
+
+
+def get_queue(app=None) -> JobQueue:
+    """Return the job queue of the given (or current) app."""
+    app = app or current_app
+    return app.extensions['jobs']
+
+def init_app(app):
+    """Attach the job queue to the app and start running jobs on its first request."""
+    app.config.setdefault('JOBS_WORKER', not app.testing)
+    app.config.setdefault('JOBS_WORKERS', 2)
+    app.config.setdefault('JOBS_POLL_INTERVAL', 1)  # seconds
+    app.config.setdefault('JOBS_STALE_AFTER', 300)  # seconds
+    counter = None
+    registry = app.extensions.get('prometheus_registry')
+    if registry is not None:
+        counter = Counter('flaskr_jobs', 'Finished background jobs by kind and status',
+                          ['kind', 'status'], registry=registry)
+    queue = app.extensions['jobs'] = JobQueue(
+        app,
+        workers=app.config['JOBS_WORKERS'],
+        poll_interval=app.config['JOBS_POLL_INTERVAL'],
+        stale_after=app.config['JOBS_STALE_AFTER'],
+        counter=counter,
+    )
+    if app.config['JOBS_WORKER']:
+        app.before_request(queue.start)
@@ -0,0 +1,129 @@
+import atexit
+import threading
+import time
+from datetime import timedelta
+from flask import current_app
+from prometheus_client import Counter
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+
+class LoginActivityBuffer:
+    """Write-behind buffer for `User.last_login`.
+
+    Logins only record the latest timestamp per user in memory. A background
+    thread writes the buffered timestamps with one batched UPDATE and a single
+    commit every `flush_interval` seconds, or sooner once `max_pending` users
+    are waiting. A failed flush puts the timestamps back so the next one
+    retries them.
+
+    Logins are timed with `time.monotonic()` and converted at flush time
+    against the database's `current_timestamp`, the clock every other
+    timestamp comes from. The UPDATE is a Core statement that leaves
+    `updated_at` alone, so a login neither marks the user as modified nor
+    invalidates caches keyed on `User`. It does stamp a new `sync_version`,
+    since `last_login` is part of the user payload that delta sync returns.
+    """
+    def __init__(self, app, flush_interval: float = 30, max_pending: int = 500, counter: Counter = None):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.counter = counter
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}  # user_id -> time.monotonic() of the last login
+        self._wake = threading.Event()
+        self._thread = None
+
+    def record(self, user_id: int):
+        """Buffer a login for `user_id`."""
+        when = time.monotonic()
+        with self._lock:
+            previous = self._pending.get(user_id)
+            if previous is None or when > previous:
+                self._pending[user_id] = when
+            pending = len(self._pending)
+            self._start()
+        if self.counter is not None:
+            self.counter.inc()
+        if pending >= self.max_pending:
+            self._wake.set()
+
+    @property
+    def pending(self) -> int:
+        """Number of users whose last login has not been written yet."""
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self) -> int:
+        """Write all buffered logins and return the number of users updated."""
+        from flaskr.db import db, User, next_sync_version
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            table = User.__table__
+            with self.app.app_context():
+                try:
+                    with db.engine.begin() as connection:
+                        now = connection.execute(select(func.current_timestamp())).scalar()
+                        flushed_at = time.monotonic()
+                        connection.execute(
+                            update(table).where(table.c.id == bindparam('user_id'))
+                            .values(last_login=bindparam('last_login'), updated_at=table.c.updated_at,
+                                    sync_version=next_sync_version(connection)),
+                            [{'user_id': user_id, 'last_login': now - timedelta(seconds=flushed_at - when)}
+                             for user_id, when in batch.items()],
+                        )
+                except SQLAlchemyError as e:
+                    self.app.logger.warning(f"Failed to flush login activity for {len(batch)} users: {str(e)}")
+                    self._requeue(batch)
+                    return 0
+            return len(batch)
+
+    def _requeue(self, batch):
+        with self._lock:
+            for user_id, when in batch.items():
+                previous = self._pending.get(user_id)
+                if previous is None or when > previous:
+                    self._pending[user_id] = when
+
+    def _start(self):
+        # Called with self._lock held.
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='login-activity-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+
+def get_buffer(app=None) -> LoginActivityBuffer:
+    """Return the login activity buffer of the given (or current) app."""
+    app = app or current_app
+    return app.extensions['login_activity']
+
+def record_login(user_id: int):
+    """Buffer a successful login; `last_login` is written by the next flush."""
+    get_buffer().record(user_id)
+
+def init_app(app):
+    """Attach a login activity buffer to the app and count logins in Prometheus."""
+    app.config.setdefault('LOGIN_ACTIVITY_FLUSH_INTERVAL', 30)  # seconds
+    app.config.setdefault('LOGIN_ACTIVITY_MAX_PENDING', 500)
+    counter = None
+    registry = app.extensions.get('prometheus_registry')
+    if registry is not None:
+        counter = Counter('flaskr_logins', 'Successful logins', registry=registry)
+    buffer = LoginActivityBuffer(
+        app,
+        flush_interval=app.config['LOGIN_ACTIVITY_FLUSH_INTERVAL'],
+        max_pending=app.config['LOGIN_ACTIVITY_MAX_PENDING'],
+        counter=counter,
+    )
+    app.extensions['login_activity'] = buffer
+    atexit.register(buffer.flush)
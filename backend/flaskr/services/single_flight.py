@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from flask import current_app
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+# Tables the dashboard statistics are computed from.
+DASHBOARD_MODELS = ('Test', 'User', 'BelongsToGroup', 'DeviceReservation', 'Device')
+
+
+class _Result:
+    __slots__ = ('value', 'bucket', 'version')
+
+    def __init__(self, value, bucket: int, version):
+        self.value = value
+        self.bucket = bucket
+        self.version = version
+
+
+class SingleFlight:
+    """Coalesce concurrent identical computations and reuse their results briefly.
+
+    Time is divided into buckets of `bucket` seconds. Callers asking for the
+    same key in the same bucket share one computation: the first one runs it
+    and the others wait for its result. That result is then served as is for
+    the rest of the bucket.
+
+    During the first `stale` seconds of the following bucket, the previous
+    result is still served immediately while a single background refresh
+    recomputes it (stale-while-revalidate).
+
+    `version` identifies the data a result was computed from, e.g. identity
+    cache generations. A result computed from another version is never served,
+    not even stale.
+
+    Outcomes are counted in `counter` as `executed`, `coalesced`, `cached`
+    or `stale`.
+    """
+    def __init__(self, app, name: str, bucket: float = 5, stale: float = 10, counter: Counter = None):
+        self.app = app
+        self.name = name
+        self.bucket = bucket
+        self.stale = stale
+        self.counter = counter
+        self._lock = threading.Lock()
+        self._results = {}   # key -> _Result
+        self._inflight = {}  # (key, bucket, version) -> Future
+
+    async def get(self, key, compute, version=None):
+        """Return the result of `await compute()` for `key`, sharing it as described above."""
+        now = time.time()
+        # With a zero bucket, only concurrent calls are coalesced; results are not reused.
+        bucket = int(now // self.bucket) if self.bucket > 0 else 0
+        with self._lock:
+            result = self._results.get(key) if self.bucket > 0 else None
+            if result is not None and result.version == version:
+                if result.bucket == bucket:
+                    self._count('cached')
+                    return result.value
+                if now < (result.bucket + 1) * self.bucket + self.stale:
+                    self._count('stale')
+                    self._refresh(key, bucket, version, compute)
+                    return result.value
+            future, leader = self._join(key, bucket, version)
+        if not leader:
+            self._count('coalesced')
+            return await asyncio.wrap_future(future)
+        self._count('executed')
+        return await self._run(key, bucket, version, compute, future)
+
+    def _join(self, key, bucket, version):
+        # Caller holds self._lock.
+        flight = (key, bucket, version)
+        future = self._inflight.get(flight)
+        if future is not None:
+            return future, False
+        future = self._inflight[flight] = Future()
+        return future, True
+
+    async def _run(self, key, bucket, version, compute, future):
+        try:
+            value = await compute()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+            with self._lock:
+                current = self._results.get(key)
+                if current is None or current.bucket <= bucket:
+                    self._results[key] = _Result(value, bucket, version)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop((key, bucket, version), None)
+
+    def _refresh(self, key, bucket, version, compute):
+        # Caller holds self._lock.
+        future, leader = self._join(key, bucket, version)
+        if not leader:
+            return
+        self._count('executed')
+        app = self.app
+
+        def run():
+            with app.app_context():
+                try:
+                    asyncio.run(self._run(key, bucket, version, compute, future))
+                except Exception:
+                    logger.exception('Background refresh of %s %r failed', self.name, key)
+
+        threading.Thread(target=run, name=f'flaskr-refresh-{self.name}', daemon=True).start()
+
+    def invalidate(self, key=None):
+        """Drop the stored result of `key`, or of every key."""
+        with self._lock:
+            if key is None:
+                self._results.clear()
+            else:
+                self._results.pop(key, None)
+
+    def _count(self, result: str):
+        if self.counter is not None:
+            self.counter.labels(flight=self.name, result=result).inc()
+
+
+def get_flight(name: str, app=None) -> SingleFlight:
+    """Return the named single-flight group of the given (or current) app."""
+    app = app or current_app
+    return app.extensions['single_flight'][name]
+
+def dashboard_version() -> tuple:
+    """Return the identity cache generations of the tables behind the dashboard."""
+    from flaskr.services.identity_cache import get_cache
+    return get_cache().generation(*DASHBOARD_MODELS)
+
+def duration_stats_version() -> tuple:
+    """Return the identity cache generations of the tables behind the duration statistics."""
+    from flaskr.services.identity_cache import get_cache
+    from flaskr.services.duration_stats import DURATION_MODELS
+    return get_cache().generation(*DURATION_MODELS)
+
+def init_app(app):
+    """Attach the single-flight groups to the app and count their outcomes in Prometheus."""
+    app.config.setdefault('DASHBOARD_BUCKET_SECONDS', 5)
+    app.config.setdefault('DASHBOARD_STALE_SECONDS', 10)
+    app.config.setdefault('DURATION_STATS_BUCKET_SECONDS', 300)
+    app.config.setdefault('DURATION_STATS_STALE_SECONDS', 300)
+    counter = None
+    registry = app.extensions.get('prometheus_registry')
+    if registry is not None:
+        counter = Counter('flaskr_single_flight', 'Single-flight computations by outcome',
+                          ['flight', 'result'], registry=registry)
+    app.extensions['single_flight'] = {
+        'dashboard': SingleFlight(
+            app, 'dashboard',
+            bucket=app.config['DASHBOARD_BUCKET_SECONDS'],
+            stale=app.config['DASHBOARD_STALE_SECONDS'],
+            counter=counter,
+        ),
+        'duration_stats': SingleFlight(
+            app, 'duration_stats',
+            bucket=app.config['DURATION_STATS_BUCKET_SECONDS'],
+            stale=app.config['DURATION_STATS_STALE_SECONDS'],
+            counter=counter,
+        ),
+    }
@@ -0,0 +1,55 @@
+from flask import request
+from flask_restful import abort
+from sqlalchemy import func, select
+
+from flaskr.db import db
+
+
+def current_token() -> int:
+    """Return the sync version below which every write is committed (or rolled back),
+    the token clients pass back as `updated_since`."""
+    from flaskr.db import SyncCounter
+    if db.engine.dialect.name == 'postgresql':
+        # Versions are transaction IDs: every transaction older than the oldest one in progress has ended.
+        return db.session.execute(select(func.txid_snapshot_xmin(func.txid_current_snapshot()))).scalar() - 1
+    return db.session.query(SyncCounter.value).filter(SyncCounter.id == 1).scalar() or 0
+
+def updated_since():
+    """Return the `updated_since` query parameter as an int, None if absent, or abort with 400."""
+    value = request.args.get('updated_since')
+    if value is None:
+        return None
+    try:
+        since = int(value)
+    except ValueError:
+        since = -1
+    if since < 0:
+        abort(400, message=f"Invalid updated_since: {value}. Must be a sync_token returned by a previous request")
+    return since
+
+def filter_updated_since(query, model, since: int):
+    """Restrict `query` to rows of `model` written after the sync version `since`."""
+    return query.filter(model.sync_version > since)
+
+def deleted_since(model, since: int) -> list:
+    """Return the IDs of rows of `model` deleted after the sync version `since`."""
+    from flaskr.db import Tombstone
+    rows = (
+        db.session.query(Tombstone.row_id)
+        .filter(Tombstone.table_name == model.__tablename__, Tombstone.sync_version > since)
+        .order_by(Tombstone.sync_version)
+    )
+    return [row_id for row_id, in rows]
+
+def delta(model, items: list, since: int, token: int) -> dict:
+    """Build a delta sync response.
+
+    `token` must be read with `current_token()` *before* querying `items`, so
+    that a change committed in between is returned again next time rather
+    than skipped.
+    """
+    return {
+        'sync_token': token,
+        'items': items,
+        'deleted': deleted_since(model, since),
+    }
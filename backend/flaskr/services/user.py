@@ -129,12 +129,30 @@ def authenticate(username, password):
     user = db.session.query(User).filter_by(username=username).first()
     if user is None or not check_password_hash(user.password, password):
         return None
-    user.last_login = db.func.now()  # Update last login time
-    db.session.commit()
+    from flaskr.services.login_activity import record_login
+    record_login(user.id)
     return user
-def get_all_users(query=None):
-    """Get all users."""
+def user_serialize_options(relationship=None):
+    """Loader options covering every relationship `User.serialize` reads.
+
+    Pass a relationship attribute (e.g. `TestReport.reviewer`) to apply the
+    options to users reached through it.
+    """
+    from sqlalchemy.orm import joinedload, selectinload
+    from flaskr.db import User, Skill, BelongsToGroup
+    options = (
+        joinedload(User.role),
+        selectinload(User.skills).selectinload(Skill.methods),
+        selectinload(User.tests),
+        selectinload(User.groups).joinedload(BelongsToGroup.group),
+    )
+    if relationship is None:
+        return options
+    return (joinedload(relationship).options(*options),)
+def get_all_users(query=None, updated_since=None):
+    """Get all users, or only those changed after the sync version `updated_since`."""
     from flaskr.db import get_db, User
+    from flaskr.services.sync import filter_updated_since
     db = get_db()
     q = db.session.query(User)
     if query:
@@ -143,6 +161,8 @@ def get_all_users(query=None):
             User.email == f"{query}"
         )
         q = q.filter(filter_conditions)
+    if updated_since is not None:
+        q = filter_updated_since(q, User, updated_since)
     return q.all()
 
 def generate_jwt_token(user, expires_delta=None):
@@ -1,4 +1,6 @@
 from flask_jwt_extended import get_jwt_identity, get_jwt, verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
 
 def jwt_identity_matches_user_id(*args, **opt):
     """
@@ -80,3 +82,55 @@ def user_required(func):
     If it is not, return a 401 Unauthorized response.
     """
     return role_required(2)(func)
+
+def optional_jwt_identity():
+    """
+    Return the JWT identity of the current request, or None if it carries no valid token.
+
+    Unlike `jwt_required`, an invalid or expired token is treated as no token.
+    """
+    try:
+        verify_jwt_in_request(optional=True)
+    except (JWTExtendedException, PyJWTError):
+        return None
+    return get_jwt_identity()
+
+def get_query_executor(app=None):
+    """Return the thread pool of the given (or current) app used to run blocking database work from async views."""
+    from flask import current_app
+    app = app or current_app
+    return app.extensions['query_executor']
+
+def init_query_executor(app):
+    """Create the app's query thread pool, sized by `QUERY_EXECUTOR_WORKERS`."""
+    from concurrent.futures import ThreadPoolExecutor
+    app.config.setdefault('QUERY_EXECUTOR_WORKERS', 16)
+    app.extensions['query_executor'] = ThreadPoolExecutor(
+        max_workers=app.config['QUERY_EXECUTOR_WORKERS'],
+        thread_name_prefix='flaskr-query'
+    )
+
+async def run_in_app_context(func, *args, **kwargs):
+    """
+    Run a blocking function in the shared query thread pool, inside its own app context.
+
+    Each call gets its own app context and therefore its own database session,
+    so several calls can be awaited concurrently with `asyncio.gather`.
+
+    example usage:
+    ```python
+    total, users = await asyncio.gather(
+        run_in_app_context(get_total_tests_completed, group_id),
+        run_in_app_context(get_active_users, group_id),
+    )
+    ```
+    """
+    import asyncio
+    from flask import current_app
+    app = current_app._get_current_object()
+
+    def call():
+        with app.app_context():
+            return func(*args, **kwargs)
+
+    return await asyncio.get_running_loop().run_in_executor(get_query_executor(app), call)
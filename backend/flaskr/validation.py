@@ -0,0 +1,179 @@
+"""Request body validation.
+
+Schemas are declared once, at import time, next to the resources that use
+them. Each field is compiled into a single converter function, so parsing a
+request is one pass over the declared fields instead of building a
+`reqparse.RequestParser` and its arguments on every call.
+
+Validation failures abort with a 400 response of the form
+`{"message": <first error>, "errors": {<field>: <error>, ...}}`.
+
+Every schema is also registered as a Swagger definition under its name, so
+the API docs can `$ref` the same declaration the handler validates against.
+"""
+import enum
+from flask import request
+from flask_restful import abort
+
+MISSING_MESSAGE = 'Missing required parameter'
+
+# Python type -> Swagger type
+_SWAGGER_TYPES = {
+    str: 'string',
+    int: 'integer',
+    float: 'number',
+    bool: 'boolean',
+    list: 'array',
+    dict: 'object',
+}
+
+_schemas = {}
+
+
+class Field:
+    """A single body field.
+
+    The arguments mirror `reqparse.Argument`: `type` is called on the value
+    (an Enum class converts by value), `trim` strips strings first, `choices`
+    restricts the converted value and `help` is the error message, where
+    `{error_msg}` is replaced by the underlying error.
+    `description`, `example`, `format` and `items` only affect the docs.
+    """
+    def __init__(self, type=str, required: bool = False, default=None, help: str = None, trim: bool = False,
+                 choices=None, nullable: bool = True, description: str = None, example=None, format: str = None,
+                 items: type = None):
+        self.type = type
+        self.required = required
+        self.default = default
+        self.help = help
+        self.trim = trim
+        self.choices = choices
+        self.nullable = nullable
+        self.description = description
+        self.example = example
+        self.format = format
+        self.items = items
+
+    def compile(self):
+        """Return a function converting a raw value, raising ValueError with the error message."""
+        convert, trim, choices, nullable = self.type, self.trim, self.choices, self.nullable
+        error = self.error
+
+        def parse(value):
+            if value is None:
+                if not nullable:
+                    raise ValueError(error('Must not be null'))
+                return None
+            if trim and isinstance(value, str):
+                value = value.strip()
+            try:
+                value = convert(value)
+            except (TypeError, ValueError) as e:
+                raise ValueError(error(str(e)))
+            if choices is not None and value not in choices:
+                raise ValueError(error(f'{value} is not a valid choice'))
+            return value
+        return parse
+
+    def error(self, detail: str) -> str:
+        if not self.help:
+            return detail
+        if '{error_msg}' in self.help:
+            return self.help.format(error_msg=detail)
+        return self.help
+
+    def definition(self) -> dict:
+        """Return the Swagger property for this field."""
+        if isinstance(self.type, type) and issubclass(self.type, enum.Enum):
+            prop = {'type': 'string', 'enum': [e.value for e in self.type]}
+        else:
+            prop = {'type': _SWAGGER_TYPES.get(self.type, 'string')}
+        if self.choices is not None and 'enum' not in prop:
+            prop['enum'] = [getattr(c, 'value', c) for c in self.choices]
+        if self.items is not None:
+            prop['items'] = {'type': _SWAGGER_TYPES.get(self.items, 'string')}
+        if self.format:
+            prop['format'] = self.format
+        if self.description:
+            prop['description'] = self.description
+        if self.default not in (None, ''):
+            prop['default'] = self.default
+        if self.example is not None:
+            prop['example'] = self.example
+        return prop
+
+
+class Schema:
+    """A named set of fields validating a JSON request body.
+
+    With `strict=True` (the default) fields that are not declared are
+    rejected. The parsed result always contains every declared field; absent
+    optional fields take their default.
+    """
+    def __init__(self, name: str, fields: dict, strict: bool = True, description: str = None):
+        if name in _schemas:
+            raise ValueError(f"Schema {name} is already declared")
+        self.name = name
+        self.fields = fields
+        self.strict = strict
+        self.description = description
+        self._steps = tuple(
+            (key, field.required, field.default, field.compile(), field.error(MISSING_MESSAGE))
+            for key, field in fields.items()
+        )
+        _schemas[name] = self
+
+    @property
+    def ref(self) -> str:
+        """The `$ref` to this schema's Swagger definition."""
+        return f'#/definitions/{self.name}'
+
+    def validate(self, data: dict) -> tuple:
+        """Return `(args, errors)` for a decoded body."""
+        args, errors = {}, {}
+        for key, required, default, parse, missing in self._steps:
+            if key not in data:
+                if required:
+                    errors[key] = missing
+                else:
+                    args[key] = default
+                continue
+            try:
+                args[key] = parse(data[key])
+            except ValueError as e:
+                errors[key] = str(e)
+        if self.strict:
+            for key in data.keys() - self.fields.keys():
+                errors[key] = 'Unknown field'
+        return args, errors
+
+    def parse(self, data: dict = None) -> dict:
+        """Validate `data` (by default the current request body) or abort with 400."""
+        if data is None:
+            data = request.get_json(silent=True)
+            if data is None:
+                data = request.form.to_dict() if request.form else {}
+        if not isinstance(data, dict):
+            abort(400, message='Request body must be a JSON object', errors={})
+        args, errors = self.validate(data)
+        if errors:
+            abort(400, message=next(iter(errors.values())), errors=errors)
+        return args
+
+    def definition(self) -> dict:
+        """Return the Swagger definition for this schema."""
+        definition = {
+            'type': 'object',
+            'properties': {key: field.definition() for key, field in self.fields.items()},
+        }
+        required = [key for key, field in self.fields.items() if field.required]
+        if required:
+            definition['required'] = required
+        if self.description:
+            definition['description'] = self.description
+        return definition
+
+
+def swagger_definitions() -> dict:
+    """Return the Swagger definitions of every declared schema."""
+    return {name: schema.definition() for name, schema in _schemas.items()}
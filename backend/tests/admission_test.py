@@ -0,0 +1,67 @@
+import pytest
+
+from flaskr.admission import AdmissionController
+
+
+def test_lower_priority_classes_are_shed_first():
+    controller = AdmissionController(initial_limit=10, interval=3600)
+    admitted = {cls: 0 for cls in ('dashboard', 'read', 'auth')}
+    for cls in admitted:
+        while controller.try_acquire(cls):
+            admitted[cls] += 1
+    # Dashboards fill 40% of the limit, reads up to 70%, logins the rest.
+    assert admitted == {'dashboard': 4, 'read': 3, 'auth': 3}
+    controller.release('dashboard')
+    assert not controller.try_acquire('dashboard')
+    assert not controller.try_acquire('read')
+    assert controller.try_acquire('auth')
+
+
+def test_limit_follows_database_latency():
+    controller = AdmissionController(initial_limit=20, min_limit=10, max_limit=22, target_latency=0.05,
+                                     backoff=0.5, interval=0)
+    controller.observe(0.2)
+    controller.try_acquire('read')
+    assert controller.limit == 10
+    controller.observe(0.2)
+    controller.try_acquire('read')
+    assert controller.limit == 10, "The limit should not drop below the minimum"
+
+    fast = AdmissionController(initial_limit=20, max_limit=22, target_latency=0.05, interval=0)
+    for expected in (21, 22, 22):
+        fast.observe(0.001)
+        fast.try_acquire('read')
+        assert fast.limit == expected
+    fast.try_acquire('read')
+    assert fast.limit == 22, "Without new statements the limit should stay put"
+
+
+@pytest.fixture
+def busy(app, monkeypatch):
+    """A controller with a limit of 2 and one request already in flight."""
+    registry = app.extensions['prometheus_registry']
+    controller = AdmissionController(initial_limit=2, interval=3600,
+                                     shed_counter=app.extensions['admission'].shed_counter)
+    monkeypatch.setitem(app.extensions, 'admission', controller)
+    assert controller.try_acquire('auth')
+    yield controller, registry
+    controller.release('auth')
+
+
+def test_overloaded_requests_are_rejected_fast(client, busy):
+    controller, registry = busy
+    shed = lambda: registry.get_sample_value('flaskr_admission_shed_total', {'class': 'dashboard'}) or 0
+    before = shed()
+    response = client.get('/api/dashboard/1')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert shed() - before == 1
+
+    assert client.get('/api/device/1').status_code == 200
+    assert client.get('/metrics').status_code == 200
+    assert controller.stats()['in_flight'] == {'auth': 1, 'reservation_write': 0, 'write': 0, 'read': 0, 'dashboard': 0}
+
+
+def test_statement_latency_is_observed(app, client):
+    client.get('/api/device')
+    assert app.extensions['admission'].stats()['latency'] > 0
@@ -242,4 +242,59 @@ def test_update_user_by_id_success(client):
 
     # Debug: print status code and response JSON
     print("Status Code:", response.status_code, end='\t')
-    print("Response JSON:", response.get_json())
\ No newline at end of file
+    print("Response JSON:", response.get_json())
+
+
+def test_login_activity_is_written_behind(client):
+    from flaskr.db import get_db, User
+    from flaskr.services.login_activity import get_buffer
+    app = client.application
+    app.config['JWT_SECRET_KEY'] = 'test-secret'
+    buffer = get_buffer(app)
+    buffer.flush()
+    registry = app.extensions['prometheus_registry']
+    logins = registry.get_sample_value('flaskr_logins_total')
+
+    for _ in range(3):
+        response = client.post('/api/login', json={'username': 'leader', 'password': 'leader'})
+        assert response.status_code == 200
+    assert buffer.pending == 1, "Repeated logins should collapse into one pending update"
+    assert registry.get_sample_value('flaskr_logins_total') == logins + 3
+    with app.app_context():
+        assert get_db().session.get(User, 2).last_login is None, "Logins should not write until flushed"
+
+    from flaskr.services.identity_cache import get_cache
+    with app.app_context():
+        updated_at = get_db().session.get(User, 2).updated_at
+        sync_version = get_db().session.get(User, 2).sync_version
+        generation = get_cache(app).generation(User)
+        clock = get_db().session.execute(get_db().select(get_db().func.current_timestamp())).scalar()
+    assert buffer.flush() == 1
+    with app.app_context():
+        user = get_db().session.get(User, 2)
+        assert abs((user.last_login - clock).total_seconds()) < 5, "last_login should follow the database clock"
+        assert user.updated_at == updated_at, "A login should not mark the user as modified"
+        assert user.sync_version > sync_version, "Delta sync clients should receive the new last_login"
+        assert get_cache(app).generation(User) == generation, "A login should not invalidate cached users"
+
+
+def test_login_activity_flushes_at_threshold(client):
+    import time
+    from flaskr.db import get_db, User
+    from flaskr.services.login_activity import get_buffer
+    app = client.application
+    app.config['JWT_SECRET_KEY'] = 'test-secret'
+    buffer = get_buffer(app)
+    buffer.max_pending = 1
+    try:
+        response = client.post('/api/login', json={'username': 'leader2', 'password': 'leader2'})
+        assert response.status_code == 200
+        deadline = time.time() + 5
+        last_login = None
+        while last_login is None and time.time() < deadline:
+            time.sleep(0.01)
+            with app.app_context():
+                last_login = get_db().session.get(User, 3).last_login
+    finally:
+        buffer.max_pending = app.config['LOGIN_ACTIVITY_MAX_PENDING']
+    assert last_login is not None, "Reaching the size threshold should trigger a flush"
@@ -0,0 +1,123 @@
+import gzip
+import json
+import pytest
+from flaskr.services.user import generate_jwt_token, get_user_by_id
+
+
+@pytest.fixture
+def admin_headers(app):
+    with app.app_context():
+        app.config['JWT_SECRET_KEY'] = 'test-secret'
+        app.config['SECRET_KEY'] = 'test-secret'
+        return {'Authorization': f'Bearer {generate_jwt_token(get_user_by_id(1))}'}
+
+
+READS = [
+    {'path': '/api/device'},
+    {'path': '/api/device/1'},
+    {'path': '/api/device/999'},
+    {'path': '/api/test', 'query': {'group_id': 1}},
+    {'path': '/api/dashboard/1?compare_time_range=week'},
+]
+
+
+@pytest.mark.parametrize("concurrent", [False, True])
+def test_batch_matches_individual_requests(client, concurrent):
+    response = client.post('/api/batch', json={'requests': READS, 'concurrent': concurrent})
+    assert response.status_code == 200
+    results = response.get_json()['responses']
+    assert len(results) == len(READS)
+    for sub, result in zip(READS, results):
+        single = client.get(sub['path'], query_string=sub.get('query'))
+        assert result['status'] == single.status_code, sub['path']
+        assert result['body'] == single.get_json(), sub['path']
+
+
+def test_later_requests_see_earlier_writes(client):
+    device = {"name": "Batched Device", "device_type_id": 1, "status": "Available"}
+    response = client.post('/api/batch', json={'concurrent': True, 'requests': [
+        {'method': 'post', 'path': '/api/device', 'body': device},
+        {'path': '/api/device'},
+    ]})
+    created, listed = response.get_json()['responses']
+    assert created['status'] == 201
+    assert created['body']['id'] in [d['id'] for d in listed['body']]
+
+
+def test_sub_requests_use_the_batch_token(client, admin_headers):
+    response = client.post('/api/batch', headers=admin_headers, json={'requests': [
+        {'path': '/api/user'},
+        {'path': '/api/user/1'},
+    ]})
+    assert response.status_code == 200
+    assert [r['status'] for r in response.get_json()['responses']] == [200, 200]
+
+
+def test_sub_requests_without_token_are_unauthorized(client):
+    response = client.post('/api/batch', json={'requests': [{'path': '/api/user'}, {'path': '/api/device/1'}]})
+    assert response.status_code == 200
+    assert [r['status'] for r in response.get_json()['responses']] == [401, 200]
+
+
+def test_sub_responses_are_not_compressed(client):
+    response = client.post('/api/batch', headers={'Accept-Encoding': 'gzip'}, json={'requests': [{'path': '/api/test'}]})
+    assert response.headers.get('Content-Encoding') == 'gzip'
+    result = json.loads(gzip.decompress(response.get_data()))['responses'][0]
+    assert isinstance(result['body'], list)
+    assert 'Content-Encoding' not in result['headers']
+
+
+def test_event_streams_and_nested_batches_are_rejected(app, client):
+    from flaskr.services.events import get_hub
+    subscribers = get_hub(app).subscriber_count
+    response = client.post('/api/batch', json={'requests': [
+        {'path': '/api/events'},
+        {'path': '/api/events', 'query': {'device_id': 1}},
+        {'method': 'POST', 'path': '/api/batch', 'body': {'requests': []}},
+    ]})
+    assert [r['status'] for r in response.get_json()['responses']] == [400, 400, 400]
+    assert get_hub(app).subscriber_count == subscribers
+
+
+@pytest.mark.parametrize("body, info", [
+    ({}, 'missing requests'),
+    ({'requests': {}}, 'requests not an array'),
+    ({'requests': ['/api/device']}, 'sub-request not an object'),
+    ({'requests': [{'path': 'device'}]}, 'path outside the API'),
+    ({'requests': [{'path': '/api/device', 'method': 'TRACE'}]}, 'unsupported method'),
+    ({'requests': [{'path': '/api/device'}], 'concurrent': 'yes'}, 'concurrent not a boolean'),
+    ({'requests': [{'path': '/api/device'}] * 21}, 'too many sub-requests'),
+])
+def test_invalid_batch(client, body, info):
+    response = client.post('/api/batch', json=body)
+    assert response.status_code == 400, f"Failed to reject {info}"
+    assert 'message' in response.get_json()
+
+
+@pytest.mark.parametrize("failure", ['uncommitted row', 'failed flush'])
+def test_failed_sub_request_does_not_affect_later_ones(app, client, monkeypatch, failure):
+    from flaskr.controllers import device as device_controller
+    from flaskr.db import db, Device, DeviceType
+    get_cached = device_controller.get_cached
+
+    def failing(model, pk):
+        if model is not DeviceType:
+            return get_cached(model, pk)
+        name = 'Leaked Device' if failure == 'uncommitted row' else db.session.get(Device, 1).name
+        db.session.add(Device(name=name, device_type_id=1, description='Leaked'))
+        db.session.flush()
+        raise RuntimeError('boom')
+    monkeypatch.setattr(device_controller, 'get_cached', failing)
+
+    response = client.post('/api/batch', json={'requests': [
+        {'method': 'POST', 'path': '/api/device', 'body': {"name": "Failing Device", "device_type_id": 1, "status": "Available"}},
+        {'method': 'PUT', 'path': '/api/device/2', 'body': {"position": "Batch Position"}},
+        {'path': '/api/device'},
+    ]})
+    first, updated, listed = response.get_json()['responses']
+    assert first['status'] == 500
+    assert updated['status'] == 200, "A failed sub-request should not break later ones"
+    assert 'Leaked Device' not in [d['name'] for d in listed['body']]
+    with app.app_context():
+        assert db.session.query(Device).filter_by(name='Leaked Device').count() == 0, \
+            "A later sub-request should not commit changes of a failed one"
@@ -0,0 +1,43 @@
+def test_catalog_contents(client):
+    response = client.get('/api/catalog')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert set(data) == {'version', 'roles', 'skills', 'device_types', 'methods', 'groups'}
+    assert response.headers['ETag'] == f'"{data["version"]}"'
+    methods = {m['id']: m for m in client.get('/api/method').get_json()}
+    for method in data['methods']:
+        assert method['device_ids'] == sorted(d['id'] for d in methods[method['id']]['devices'])
+        assert method['skill_ids'] == sorted(s['id'] for s in methods[method['id']]['skills'])
+    assert [s['id'] for s in data['skills']] == sorted(s['id'] for s in client.get('/api/skill').get_json())
+
+
+def test_catalog_not_modified(client):
+    etag = client.get('/api/catalog').headers['ETag']
+    response = client.get('/api/catalog', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert client.get('/api/catalog', headers={'If-None-Match': '"stale"'}).status_code == 200
+
+
+def test_catalog_rebuilds_only_on_reference_changes(app, client):
+    from sqlalchemy import event
+    from flaskr.db import db
+    version = client.get('/api/catalog').get_json()['version']
+    with app.app_context():
+        engine = db.engine
+    statements = []
+    record = lambda *args: statements.append(args[2])
+
+    assert client.put('/api/test/2', json={"status": "InProgress"}).status_code == 200
+    assert client.put('/api/device/1', json={"status": "Error"}).status_code == 200
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        assert client.get('/api/catalog').get_json()['version'] == version
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert statements == [], "Unrelated changes should not rebuild the catalog"
+
+    assert client.post('/api/skill', json={"name": "Catalog Skill", "description": "Added to the catalog"}).status_code == 201
+    data = client.get('/api/catalog').get_json()
+    assert data['version'] != version
+    assert 'Catalog Skill' in [s['name'] for s in data['skills']]
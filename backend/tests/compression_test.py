@@ -0,0 +1,83 @@
+import gzip
+import json
+import os
+import pytest
+from flask import Response
+
+from flaskr import compression
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected, info", [
+        ('gzip', 'gzip', 'gzip only'),
+        ('br, gzip', 'br' if compression.brotli else 'gzip', 'brotli preferred when installed'),
+        ('br;q=0.5, gzip', 'gzip', 'quality values are honoured'),
+        ('identity', None, 'no supported coding'),
+    ]
+)
+def test_large_json_is_compressed(client, accept_encoding, expected, info):
+    plain = client.get('/api/test')
+    response = client.get('/api/test', headers={'Accept-Encoding': accept_encoding})
+    assert response.headers.get('Content-Encoding') == expected, info
+    assert 'Accept-Encoding' in response.headers['Vary']
+    body = response.get_data()
+    if expected == 'gzip':
+        body = gzip.decompress(body)
+    elif expected == 'br':
+        body = compression.brotli.decompress(body)
+    assert json.loads(body) == plain.get_json()
+
+
+def test_small_responses_are_not_compressed(client):
+    response = client.get('/hello', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data() == b'Hello, World!'
+
+
+def test_streamed_responses_are_compressed_per_chunk(app):
+    chunks = [f'{i},row {i}\n'.encode() for i in range(100)]
+    with app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+        response = compression.compress_response(Response(iter(chunks), mimetype='text/csv'))
+        parts = list(response.response)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert len(parts) > 1, "Each chunk should be flushed as it is produced"
+    assert gzip.decompress(b''.join(parts)) == b''.join(chunks)
+
+
+def test_event_streams_are_not_compressed(app):
+    with app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+        response = compression.compress_response(Response(iter([b'data: x\n\n'] * 200), mimetype='text/event-stream'))
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_precompressed_pages_rerender_on_mtime_change(app, tmp_path):
+    source = tmp_path / 'page.html'
+    source.write_text('<p>first</p>' * 100)
+    renders = []
+
+    @compression.precompressed(str(source))
+    def page():
+        renders.append(1)
+        return source.read_text()
+
+    def get(**headers):
+        with app.test_request_context(headers=headers):
+            return page()
+
+    assert gzip.decompress(get(**{'Accept-Encoding': 'gzip'}).get_data()) == source.read_bytes()
+    assert get().get_data() == source.read_bytes()
+    assert len(renders) == 1, "The page should only be rendered once while its source is unchanged"
+
+    source.write_text('<p>second</p>' * 100)
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert get().get_data() == source.read_bytes()
+    assert len(renders) == 2
+
+
+def test_cached_pages_support_conditional_requests(client):
+    first = client.get('/apispec_1.json', headers={'Accept-Encoding': 'gzip'})
+    assert first.headers['Content-Encoding'] == 'gzip'
+    assert 'paths' in json.loads(gzip.decompress(first.get_data()))
+    again = client.get('/apispec_1.json', headers={'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
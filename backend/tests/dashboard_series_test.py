@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+import pytest
+
+from flaskr.services.dashboard_series import moving_average, truncate
+
+# Far in the past, so the data of other tests stays out of the series.
+DAY = datetime(2001, 1, 1)  # a Monday
+
+
+@pytest.fixture(scope='module')
+def activity(app):
+    """Tests, reservations and reports of group 1 on the 1st and 3rd of January 2001."""
+    from flaskr.db import db, Test, DeviceReservation, TestReport
+    with app.app_context():
+        def add_test(created_at, status, user_id, minutes):
+            test = Test(display_id=f'SERIES-{created_at:%d%H}-{status}', group_id=1, method_id=1, name='Series',
+                        description='Series', status=status, created_at=created_at)
+            db.session.add(test)
+            db.session.flush()
+            db.session.add(DeviceReservation(device_id=1, user_id=user_id, test_id=test.id, start_time=created_at,
+                                             end_time=created_at + timedelta(minutes=minutes)))
+            db.session.add(TestReport(test_id=test.id, user_id=user_id, content='Series', created_at=created_at))
+        add_test(DAY + timedelta(hours=9), 'Completed', 4, 30)
+        add_test(DAY + timedelta(hours=10), 'Failed', 4, 90)
+        add_test(DAY + timedelta(days=2, hours=15), 'Completed', 5, 45)
+        db.session.commit()
+
+
+def test_daily_series_is_gap_filled(client, activity):
+    response = client.get('/api/dashboard/1/series?granularity=day&start=2001-01-01T12:00:00&end=2001-01-04')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert len(data['buckets']) == 3
+    assert data['buckets'][0].startswith('2001-01-01T00:00:00'), "start should be rounded down to its bucket"
+    assert data['series'] == {
+        'completed_tests': [1, 0, 1],
+        'failed_tests': [1, 0, 0],
+        'reservation_minutes': [120, 0, 45],
+        'active_users': [1, 0, 1],
+    }
+
+
+@pytest.mark.parametrize(
+    "granularity, start, end, completed", [
+        ('hour', '2001-01-01T08:00:00', '2001-01-01T11:00:00', [0, 1, 0]),
+        ('week', '2000-12-31', '2001-01-08', [0, 2]),
+    ]
+)
+def test_series_granularity(client, activity, granularity, start, end, completed):
+    data = client.get(f'/api/dashboard/1/series?granularity={granularity}&start={start}&end={end}').get_json()
+    assert data['series']['completed_tests'] == completed
+
+
+@pytest.mark.parametrize(
+    "start, end", [
+        ('2001-01-01T12:00:00Z', '2001-01-04T00:00:00Z'),
+        ('2001-01-01T12:00:00%2B00:00', '2001-01-04T00:00:00%2B00:00'),
+        ('2001-01-01T12:00:00%2B02:00', '2001-01-04T00:00:00-05:00'),
+        ('2001-01-01T12:00:00Z', '2001-01-04'),
+    ]
+)
+def test_series_offsets_are_dropped(client, activity, start, end):
+    response = client.get(f'/api/dashboard/1/series?granularity=day&start={start}&end={end}')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert len(data['buckets']) == 3
+    assert data['series']['completed_tests'] == [1, 0, 1]
+
+
+def test_series_moving_average(client, activity):
+    data = client.get('/api/dashboard/1/series?start=2001-01-01&end=2001-01-04&moving_average=2').get_json()
+    assert data['moving_average']['reservation_minutes'] == [120, 60, 22.5]
+    assert moving_average([3, 1, 2, 6], 3) == [3, 2, 2, 3]
+
+
+@pytest.mark.parametrize(
+    "query, info", [
+        ('granularity=month', 'unknown granularity'),
+        ('start=2001-01-04&end=2001-01-01', 'start after end'),
+        ('granularity=hour&start=2000-01-01&end=2001-01-01', 'too many buckets'),
+        ('start=yesterday', 'invalid date'),
+        ('moving_average=0', 'invalid window'),
+    ]
+)
+def test_invalid_series_requests(client, query, info):
+    assert client.get(f'/api/dashboard/1/series?{query}').status_code == 400, info
+
+
+def test_truncate_to_monday():
+    assert truncate(datetime(2001, 1, 7, 23, 59), 'week') == DAY
+    assert truncate(datetime(2001, 1, 8, 0, 1), 'week') == DAY + timedelta(days=7)
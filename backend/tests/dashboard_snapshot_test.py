@@ -0,0 +1,144 @@
+import asyncio
+import time
+import pytest
+
+from flaskr.services.dashboard_snapshot import DashboardSnapshots, LEASE_NAME, acquire_lease, release_lease
+
+
+def counting_build(calls):
+    async def build(group_id, compare_time_range):
+        calls.append((group_id, compare_time_range))
+        return {'group_id': group_id, 'compare_time_range': compare_time_range, 'build': len(calls)}
+    return build
+
+
+@pytest.fixture
+def snapshots(app):
+    """Snapshots of a counting build, stored in an emptied snapshot table (emptied again afterwards)."""
+    from flaskr.db import db, DashboardSnapshot
+    with app.app_context():
+        db.session.query(DashboardSnapshot).delete()
+        db.session.commit()
+    calls = []
+    yield DashboardSnapshots(app, counting_build(calls), ttl=0.3, interval=60), calls
+    with app.app_context():
+        db.session.query(DashboardSnapshot).delete()
+        db.session.commit()
+
+
+def test_stale_snapshot_served_while_refreshing(app, snapshots):
+    snapshots, calls = snapshots
+    with app.app_context():
+        assert snapshots.get(1, 'week') is None
+        assert asyncio.run(snapshots.compute(1, 'week'))['build'] == 1
+        assert snapshots.get(1, 'week')['build'] == 1
+        time.sleep(0.3)
+
+        start = time.perf_counter()
+        assert snapshots.get(1, 'week')['build'] == 1, "The stale snapshot should be served"
+        assert time.perf_counter() - start < 0.1, "Serving a stale snapshot should not wait for the refresh"
+        deadline = time.monotonic() + 2
+        while snapshots.get(1, 'week')['build'] == 1:
+            assert time.monotonic() < deadline, "The background refresh should replace the stale snapshot"
+            time.sleep(0.02)
+        assert calls == [(1, 'week'), (1, 'week')]
+
+
+def test_snapshots_are_shared_through_the_database(app, snapshots):
+    snapshots, calls = snapshots
+    with app.app_context():
+        asyncio.run(snapshots.compute(2, None))
+        other_calls = []
+        other = DashboardSnapshots(app, counting_build(other_calls), ttl=60)
+        assert other.get(2, None) == {'group_id': 2, 'compare_time_range': None, 'build': 1}
+        assert other_calls == []
+        assert other.get(2, 'month') is None
+
+
+def test_only_the_leader_precomputes(app, snapshots):
+    snapshots, calls = snapshots
+    with app.app_context():
+        follower = DashboardSnapshots(app, counting_build([]), interval=60)
+        try:
+            groups = snapshots.active_groups()
+            assert groups, "The mock data should have active groups"
+            assert snapshots.precompute() == 3 * len(groups)
+            assert {group_id for group_id, _ in calls} == groups
+            assert {compare for _, compare in calls} == {None, 'week', 'month'}
+            assert follower.precompute() == 0, "The lease should keep a second process from precomputing"
+
+            for group_id, compare in calls:
+                assert follower.get(group_id, compare) is not None
+            release_lease(LEASE_NAME, snapshots.holder)
+            assert follower.precompute() == 3 * len(groups), "The lease should pass on once released"
+        finally:
+            release_lease(LEASE_NAME, follower.holder)
+
+
+def test_lease_expires(app):
+    with app.app_context():
+        assert acquire_lease('test-lease', 'a', 0.2)
+        assert acquire_lease('test-lease', 'a', 0.2), "The holder should renew its lease"
+        assert not acquire_lease('test-lease', 'b', 0.2)
+        time.sleep(0.25)
+        assert acquire_lease('test-lease', 'b', 60)
+        release_lease('test-lease', 'b')
+
+
+def test_dashboard_served_from_snapshot(app, client):
+    from flaskr.services.dashboard_snapshot import get_snapshots
+    registry = app.extensions['prometheus_registry']
+    fresh = lambda: registry.get_sample_value('flaskr_dashboard_snapshots_total', {'result': 'fresh'}) or 0
+    computed = client.get('/api/dashboard/1?compare_time_range=week').get_json()
+    before = fresh()
+    assert client.get('/api/dashboard/1?compare_time_range=week').get_json() == computed
+    assert fresh() - before == 1
+
+    # A write made here hides older snapshots.
+    client.post('/api/device', json={"name": "Snapshot Device", "device_type_id": 1, "status": "Available"})
+    with app.app_context():
+        assert get_snapshots(app).get(1, 'week') is None
+
+
+def test_changes_hide_the_snapshots_of_their_group(app, client):
+    from flaskr.db import get_db, Test
+    from flaskr.services.dashboard_snapshot import get_snapshots
+    with app.app_context():
+        group_id = get_db().session.get(Test, 4).group_id
+    other_group_id = 1 if group_id != 1 else 2
+    client.get(f'/api/dashboard/{group_id}')
+    client.get(f'/api/dashboard/{other_group_id}')
+
+    assert client.put('/api/test/4', json={"description": "Snapshot test"}).status_code == 200
+    with app.app_context():
+        assert get_snapshots(app).get(group_id, None) is None
+        assert get_snapshots(app).get(other_group_id, None) is not None, "Other groups should keep their snapshot"
+
+    # Device statistics are shared by every group.
+    client.post('/api/device', json={"name": "Shared Snapshot Device", "device_type_id": 1, "status": "Available"})
+    with app.app_context():
+        assert get_snapshots(app).get(other_group_id, None) is None
+
+
+def test_invalidate_deletes_stored_snapshots(app, snapshots):
+    from flaskr.db import db, DashboardSnapshot
+    snapshots, calls = snapshots
+    with app.app_context():
+        asyncio.run(snapshots.compute(1, None))
+        asyncio.run(snapshots.compute(2, 'week'))
+    snapshots.invalidate()
+    with app.app_context():
+        assert db.session.query(DashboardSnapshot).count() == 0
+        other = DashboardSnapshots(app, counting_build([]), ttl=60)
+        assert other.get(1, None) is None, "Other processes should not serve invalidated snapshots"
+        assert snapshots.get(2, 'week') is None
+
+
+def test_invalidate_dashboards_command(app, snapshots):
+    from flaskr.db import db, DashboardSnapshot
+    snapshots, calls = snapshots
+    with app.app_context():
+        asyncio.run(snapshots.compute(1, None))
+        result = app.test_cli_runner().invoke(args=['invalidate-dashboards'])
+        assert 'Invalidated' in result.output
+        assert db.session.query(DashboardSnapshot).count() == 0
@@ -0,0 +1,136 @@
+import pytest
+
+STATUS_KEYS = {'Available': 'available', 'Reserved': 'reserved', 'Occupied': 'occupied',
+               'Maintaince': 'maintenance', 'Error': 'broken'}
+
+def tally_devices(client, field='status'):
+    counts = {key: 0 for key in STATUS_KEYS.values()}
+    for device in client.get('/api/device').get_json():
+        counts[STATUS_KEYS[device[field]]] += 1
+    return counts
+
+# Device status counters
+def test_device_status_matches_device_list(client):
+    response = client.get('/api/dashboard/1')
+    assert response.status_code == 200, "Failed to get dashboard"
+    data = response.get_json()
+    assert data['device_status'] == tally_devices(client, 'effective_status'), "Status counts should match the device list"
+    assert data['available_devices']['total'] == sum(data['device_status'].values())
+
+
+def test_device_status_invalidated_on_update(client):
+    before = client.get('/api/dashboard/1').get_json()['device_status']
+    response = client.post('/api/device', json={"name": "Dashboard Device", "device_type_id": 1, "status": "Available"})
+    assert response.status_code == 201, "Failed to create device"
+    device_id = response.get_json()['id']
+
+    client.put(f'/api/device/{device_id}', json={"status": "Error"})
+    after = client.get('/api/dashboard/1').get_json()['device_status']
+    assert after['broken'] == before['broken'] + 1, "Updated status should be reflected immediately"
+    assert after['available'] == before['available']
+
+    client.delete(f'/api/device/{device_id}')
+    assert client.get('/api/dashboard/1').get_json()['device_status'] == before
+
+
+def test_devices_by_status_gauge(client):
+    counts = tally_devices(client)
+    effective = tally_devices(client, 'effective_status')
+    metrics = client.get('/metrics').get_data(as_text=True)
+    for status, key in STATUS_KEYS.items():
+        assert f'flaskr_devices_by_status{{status="{status}"}} {float(counts[key])}' in metrics
+        assert f'flaskr_devices_by_effective_status{{status="{status}"}} {float(effective[key])}' in metrics
+
+
+def test_effective_status_counts_with_changes_from_other_processes(app, client):
+    from flaskr.db import db, Device
+    from flaskr.services.device_status import get_effective_status_counts, get_device_status_counts
+    table = Device.__table__
+    with app.app_context():
+        get_device_status_counts()  # a snapshot this process will not see invalidated
+        with db.engine.begin() as connection:
+            device_id = connection.execute(table.insert().values(
+                name='Other Process Device', device_type_id=1, description='Other process', status='Reserved',
+            )).inserted_primary_key[0]
+        try:
+            counts = {STATUS_KEYS[status.value]: count for status, count in get_effective_status_counts().items()}
+            assert counts == tally_devices(client, 'effective_status')
+        finally:
+            with db.engine.begin() as connection:
+                connection.execute(table.delete().where(table.c.id == device_id))
+
+
+# Reservation-derived status
+@pytest.mark.parametrize(
+    "offset_minutes, manual_status, expected_status, info", [
+        (-30, "Available", "Occupied", 'reservation in progress'),
+        (30, "Available", "Reserved", 'reservation starting within the horizon'),
+        (24 * 60, "Available", "Available", 'reservation beyond the horizon'),
+        (-30, "Maintaince", "Maintaince", 'manual override wins over reservation'),
+    ]
+)
+def test_effective_status_from_reservations(client, offset_minutes, manual_status, expected_status, info):
+    from datetime import datetime, timedelta
+    response = client.post('/api/device', json={"name": f"Timeline Device {info}", "device_type_id": 1, "status": manual_status})
+    device_id = response.get_json()['id']
+    before = client.get('/api/dashboard/1').get_json()['device_status']
+
+    start = datetime.now() + timedelta(minutes=offset_minutes)
+    response = client.post('/api/device/reservation', json={
+        "device_id": device_id, "user_id": 4, "test_id": 1,
+        "start_time": start.isoformat(), "duration": 60
+    })
+    assert response.status_code == 201, f"Failed to reserve device: {info}"
+    reservation_id = response.get_json()['id']
+
+    device = client.get(f'/api/device/{device_id}').get_json()
+    assert device['status'] == manual_status, f"Stored status should be untouched: {info}"
+    assert device['effective_status'] == expected_status, f"Failed: {info}"
+    after = client.get('/api/dashboard/1').get_json()['device_status']
+    assert after == tally_devices(client, 'effective_status'), f"Dashboard should count effective statuses: {info}"
+    metrics = client.get('/metrics').get_data(as_text=True)
+    assert f'flaskr_devices_by_effective_status{{status="{expected_status}"}} {float(after[STATUS_KEYS[expected_status]])}' in metrics, \
+        f"Effective status gauge should match the dashboard: {info}"
+    if expected_status != manual_status:
+        assert after[STATUS_KEYS[expected_status]] == before[STATUS_KEYS[expected_status]] + 1, f"Failed: {info}"
+
+    client.delete(f'/api/device/reservation/{reservation_id}')
+    device = client.get(f'/api/device/{device_id}').get_json()
+    assert device['effective_status'] == manual_status, f"Status should revert once the reservation is gone: {info}"
+
+
+# Concurrent statistic queries
+@pytest.mark.parametrize("compare_time_range", [None, 'week', 'month'])
+def test_concurrent_and_sequential_dashboards_match(app, client, compare_time_range):
+    url = '/api/dashboard/1' + (f'?compare_time_range={compare_time_range}' if compare_time_range else '')
+    from flaskr.services.single_flight import get_flight
+    from flaskr.services.dashboard_snapshot import get_snapshots
+    concurrent = client.get(url).get_json()
+    app.config['DASHBOARD_CONCURRENT_QUERIES'] = False
+    get_flight('dashboard', app).invalidate()
+    get_snapshots(app).invalidate()
+    try:
+        sequential = client.get(url).get_json()
+    finally:
+        app.config['DASHBOARD_CONCURRENT_QUERIES'] = True
+    assert concurrent == sequential
+    if compare_time_range:
+        assert set(concurrent) == {'current', 'previous', 'compare_time_range', 'device_status'}
+        assert concurrent['current']['available_devices'] == concurrent['previous']['available_devices']
+
+
+def test_query_executor_per_app(app, tmp_path):
+    from flaskr import create_app
+    from flaskr.utils import get_query_executor
+    other = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'other.db'}",
+        'QUERY_EXECUTOR_WORKERS': 2,
+    })
+    try:
+        assert get_query_executor(app)._max_workers == app.config['QUERY_EXECUTOR_WORKERS']
+        assert get_query_executor(other)._max_workers == 2
+        with other.app_context():
+            assert get_query_executor() is get_query_executor(other) is not get_query_executor(app)
+    finally:
+        get_query_executor(other).shutdown()
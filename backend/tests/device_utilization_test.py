@@ -0,0 +1,88 @@
+from datetime import datetime
+import numpy as np
+import pytest
+
+from flaskr.services.device_utilization import merge_intervals
+
+MONDAY = datetime(2002, 1, 7)
+WINDOW = 'start=2002-01-07T00:00:00&end=2002-01-08T00:00:00'
+
+
+@pytest.fixture(scope='module')
+def device_type_id(app):
+    """A device type of three devices: A with overlapping reservations, B with one starting before
+    the window, and C never reserved."""
+    from flaskr.db import db, DeviceType, Device, DeviceReservation
+    with app.app_context():
+        device_type = DeviceType(name='Utilization Type', description='Utilization')
+        db.session.add(device_type)
+        db.session.flush()
+        devices = {}
+        for name in 'ABC':
+            devices[name] = Device(name=f'Utilization {name}', device_type_id=device_type.id, description='Utilization')
+            db.session.add(devices[name])
+        db.session.flush()
+        for name, start, end in (
+            ('A', '2002-01-07 09:00', '2002-01-07 11:00'),
+            ('A', '2002-01-07 10:00', '2002-01-07 12:00'),
+            ('A', '2002-01-07 14:00', '2002-01-07 15:00'),
+            ('B', '2002-01-06 23:00', '2002-01-07 01:00'),
+            ('B', '2002-01-07 10:30', '2002-01-07 11:30'),
+        ):
+            db.session.add(DeviceReservation(device_id=devices[name].id, user_id=4, test_id=1,
+                                             start_time=datetime.fromisoformat(start),
+                                             end_time=datetime.fromisoformat(end)))
+        db.session.commit()
+        return device_type.id
+
+
+def test_device_utilization(client, device_type_id):
+    response = client.get(f'/api/dashboard/devices/utilization?{WINDOW}&device_type_id={device_type_id}')
+    assert response.status_code == 200
+    data = response.get_json()
+    a, b, c = data['devices']
+    assert (a['reservations'], a['busy_minutes'], a['idle_gaps'], a['longest_idle_minutes']) == (3, 240, 3, 540)
+    assert a['busy_ratio'] == 240 / 1440
+    assert (b['reservations'], b['busy_minutes']) == (2, 120), "reservations are clipped to the window"
+    assert (c['reservations'], c['busy_ratio'], c['idle_gaps'], c['longest_idle_minutes']) == (0, 0, 1, 1440)
+
+    fleet = data['fleet']
+    assert fleet['busy_ratio'] == 360 / (3 * 1440)
+    assert (fleet['peak_concurrency'], fleet['peak_at']) == (2, '2002-01-07T10:30:00')
+    assert fleet['concurrency_minutes'] == [1140, 240, 60]
+
+    heatmap = data['heatmap']
+    assert (len(heatmap), len(heatmap[0])) == (7, 24)
+    assert heatmap[0][10] == 0.5
+    assert heatmap[0][0] == pytest.approx(1 / 3)
+    assert sum(map(sum, heatmap[1:])) == 0
+
+
+@pytest.mark.parametrize(
+    "window", [
+        'start=2002-01-07T00:00:00Z&end=2002-01-08T00:00:00Z',
+        'start=2002-01-07T00:00:00%2B00:00&end=2002-01-08T00:00:00%2B00:00',
+        'start=2002-01-07T00:00:00%2B01:00&end=2002-01-08T00:00:00-05:00',
+    ]
+)
+def test_device_utilization_offsets_are_dropped(client, device_type_id, window):
+    expected = client.get(f'/api/dashboard/devices/utilization?{WINDOW}&device_type_id={device_type_id}').get_json()
+    response = client.get(f'/api/dashboard/devices/utilization?{window}&device_type_id={device_type_id}')
+    assert response.status_code == 200
+    assert response.get_json() == expected
+
+
+def test_merge_intervals():
+    keys, starts, ends = merge_intervals(np.array([1, 0, 0, 0]), np.array([0, 10, 0, 12]), np.array([5, 12, 10, 13]))
+    assert (keys.tolist(), starts.tolist(), ends.tolist()) == ([0, 1], [0, 0], [13, 5])
+
+
+@pytest.mark.parametrize(
+    "query, info", [
+        ('start=2002-01-08&end=2002-01-07', 'start after end'),
+        ('start=2000-01-01&end=2002-01-01', 'window too long'),
+        ('end=tomorrow', 'invalid date'),
+    ]
+)
+def test_invalid_utilization_requests(client, query, info):
+    assert client.get(f'/api/dashboard/devices/utilization?{query}').status_code == 400, info
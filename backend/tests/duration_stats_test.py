@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+import pytest
+
+from flaskr.services.single_flight import get_flight
+
+DURATIONS = (10, 20, 30, 40, 100)  # minutes
+
+
+@pytest.fixture(scope='module')
+def device(app):
+    """A device of a new device type, reserved for each of `DURATIONS` yesterday."""
+    from flaskr.db import db, DeviceType, Device
+    with app.app_context():
+        device_type = DeviceType(name='Duration Type', description='Durations')
+        db.session.add(device_type)
+        db.session.flush()
+        device = Device(name='Duration Device', device_type_id=device_type.id, description='Durations')
+        db.session.add(device)
+        db.session.commit()
+        for minutes in DURATIONS:
+            reserve(device.id, minutes)
+        return {'id': device.id, 'device_type_id': device_type.id}
+
+
+def reserve(device_id, minutes):
+    from flaskr.db import db, DeviceReservation
+    start = datetime.now().replace(microsecond=0) - timedelta(days=1)
+    db.session.add(DeviceReservation(device_id=device_id, user_id=4, test_id=1,
+                                     start_time=start, end_time=start + timedelta(minutes=minutes)))
+    db.session.commit()
+
+
+def get_stats(client, device, **params):
+    query = '&'.join(f'{key}={value}' for key, value in {'by': 'device_type', 'window': 'week', **params}.items())
+    response = client.get(f"/api/dashboard/durations?{query}&id={device['device_type_id']}")
+    assert response.status_code == 200
+    groups = response.get_json()['groups']
+    assert len(groups) == 1
+    return groups[0]
+
+
+def test_duration_percentiles_and_histogram(app, client, device):
+    get_flight('duration_stats', app).invalidate()
+    stats = get_stats(client, device, bins=5)
+    assert (stats['name'], stats['count'], stats['min'], stats['max'], stats['mean']) == ('Duration Type', 5, 10, 100, 40)
+    assert (stats['p50'], stats['p90']) == (30, 76)
+    assert stats['p99'] == pytest.approx(97.6)
+    assert stats['histogram'] == {'edges': [0, 20, 40, 60, 80, 100], 'counts': [1, 2, 1, 0, 1]}
+
+
+def test_duration_stats_cached_until_write(app, client, device, monkeypatch):
+    from flaskr.services import duration_stats
+    get_flight('duration_stats', app).invalidate()
+    calls = []
+    compute = duration_stats.get_duration_stats
+    monkeypatch.setattr(duration_stats, 'get_duration_stats', lambda *args: calls.append(args) or compute(*args))
+
+    assert get_stats(client, device)['count'] == 5
+    assert get_stats(client, device)['count'] == 5
+    assert len(calls) == 1, "Identical requests should share one computation"
+    with app.app_context():
+        reserve(device['id'], 50)
+    assert get_stats(client, device)['count'] == 6, "Writes should be reflected immediately"
+    assert len(calls) == 2
+
+
+def test_durations_by_method(client):
+    groups = client.get('/api/dashboard/durations?window=all').get_json()['groups']
+    assert groups and all(group['count'] == sum(group['histogram']['counts']) for group in groups)
+
+
+@pytest.mark.parametrize(
+    "query, info", [
+        ('by=user', 'unknown grouping'),
+        ('window=decade', 'unknown window'),
+        ('bins=0', 'too few bins'),
+        ('bins=many', 'invalid bins'),
+    ]
+)
+def test_invalid_duration_requests(client, query, info):
+    assert client.get(f'/api/dashboard/durations?{query}').status_code == 400, info
@@ -0,0 +1,86 @@
+import json
+import numpy
+import pytest
+from datetime import date, datetime, timedelta, timezone
+
+from flaskr import encoding
+from flaskr.db import TestStatusEnum as Status
+
+
+@pytest.mark.parametrize("name", sorted(encoding.ENCODERS))
+@pytest.mark.parametrize(
+    "value, expected, info", [
+        (datetime(2025, 5, 1, 10, 30), '2025-05-01T10:30:00', 'naive datetime'),
+        (datetime(2025, 5, 1, 10, 30, 0, 1500), '2025-05-01T10:30:00.001500', 'datetime with microseconds'),
+        (datetime(2025, 5, 1, tzinfo=timezone.utc), '2025-05-01T00:00:00+00:00', 'aware datetime'),
+        (date(2025, 5, 1), '2025-05-01', 'date'),
+        (Status.InProgress, 'InProgress', 'str enum'),
+        (numpy.int64(7), 7, 'numpy integer'),
+        (numpy.float32(0.5), 0.5, 'numpy float'),
+        (numpy.array([1, 2]), [1, 2], 'numpy array'),
+        ({3}, [3], 'set'),
+    ]
+)
+def test_encoders_convert_raw_values(name, value, expected, info):
+    assert json.loads(encoding.ENCODERS[name]({'value': value})) == {'value': expected}, info
+
+
+def test_api_responses_match_isoformat(app, client):
+    from flaskr.db import get_db, Test
+    with app.app_context():
+        test = get_db().session.get(Test, 1)
+        created_at, status = test.created_at.isoformat(), test.status.value
+    data = client.get('/api/test/1').get_json()
+    assert (data['created_at'], data['status']) == (created_at, status)
+
+
+def test_jsonify_uses_configured_encoder(app):
+    from flask import jsonify
+    with app.app_context():
+        assert app.extensions['json_encoder'] is encoding.ENCODERS[app.config['JSON_ENCODER']]
+        response = jsonify(at=datetime(2025, 5, 1, 10, 30))
+    assert response.get_json() == {'at': '2025-05-01T10:30:00'}
+
+
+def test_unknown_encoder_is_rejected():
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['JSON_ENCODER'] = 'yaml'
+    with pytest.raises(ValueError):
+        encoding.init_app(app)
+
+
+def test_to_columnar():
+    rows = [{'id': 1, 'name': 'a'}, {'id': 2, 'extra': True}]
+    assert encoding.to_columnar(rows) == {'id': [1, 2], 'name': ['a', None], 'extra': [None, True]}
+    assert encoding.to_columnar([]) == {}
+
+
+@pytest.fixture
+def reservation(client):
+    response = client.post('/api/device/reservation', json={
+        "device_id": 3, "user_id": 4, "test_id": 1,
+        "start_time": (datetime.now() + timedelta(days=400)).isoformat(), "duration": 30
+    })
+    assert response.status_code == 201
+    yield response.get_json()['id']
+    client.delete(f"/api/device/reservation/{response.get_json()['id']}")
+
+
+@pytest.mark.parametrize("url", ['/api/test', '/api/device/reservation'])
+def test_list_endpoints_columnar(client, reservation, url):
+    rows = client.get(url).get_json()
+    response = client.get(f'{url}?format=columnar')
+    assert response.status_code == 200
+    assert response.get_json() == encoding.to_columnar(rows)
+    assert client.get(f'{url}?format=table').status_code == 400
+
+
+@pytest.mark.parametrize("url", ['/api/test', '/api/device/reservation?format=columnar'])
+def test_msgpack_negotiation(client, reservation, url):
+    msgpack = pytest.importorskip('msgpack')
+    response = client.get(url, headers={'Accept': 'application/msgpack'})
+    assert response.status_code == 200
+    assert response.content_type == 'application/msgpack'
+    assert 'Accept' in response.headers['Vary']
+    assert msgpack.unpackb(response.get_data()) == client.get(url).get_json()
@@ -0,0 +1,89 @@
+import json
+import queue
+import pytest
+from datetime import datetime, timedelta
+
+def reserve(client, device_id, days_ahead):
+    start = datetime.now() + timedelta(days=days_ahead)
+    response = client.post('/api/device/reservation', json={
+        "device_id": device_id, "user_id": 4, "test_id": 1,
+        "start_time": start.isoformat(), "duration": 30
+    })
+    assert response.status_code == 201, "Failed to create reservation"
+    return response.get_json()['id']
+
+# Fan-out to many clients
+@pytest.mark.parametrize("num_clients", [1, 10, 50])
+def test_clients_receive_reservation_events(app, client, num_clients):
+    from flaskr.services.events import get_hub
+    hub = get_hub(app)
+    group_subs = [hub.subscribe(group_id=1) for _ in range(num_clients)]
+    other_group = hub.subscribe(group_id=2)
+    try:
+        reservation_id = reserve(client, 3, 30 + num_clients)
+        for sub in group_subs:
+            evt = sub.get(timeout=1)
+            assert (evt['type'], evt['action'], evt['id']) == ('device_reservation', 'created', reservation_id)
+            assert evt['group_id'] == 1 and evt['device_id'] == 3
+        with pytest.raises(queue.Empty):
+            other_group.get(timeout=0.01)
+
+        client.delete(f'/api/device/reservation/{reservation_id}')
+        for sub in group_subs:
+            assert sub.get(timeout=1)['action'] == 'deleted'
+    finally:
+        for sub in group_subs + [other_group]:
+            hub.unsubscribe(sub)
+
+
+def test_slow_client_queue_is_bounded(app):
+    from flaskr.services.events import EventHub
+    hub = EventHub(queue_size=3)
+    sub = hub.subscribe()
+    for i in range(10):
+        hub.publish({'type': 'test', 'id': i})
+    assert sub.dropped == 7, "Oldest events should be dropped once the queue is full"
+    assert [sub.get(timeout=0)['id'] for _ in range(3)] == [7, 8, 9]
+
+
+def test_event_stream_endpoint(app, client):
+    from flaskr.services.events import get_hub
+    response = client.get('/api/events?device_id=2', buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    chunks = iter(response.response)
+    assert next(chunks) == b'retry: 3000\n\n'
+
+    client.put('/api/test/1', json={"status": "InProgress"})  # not for this device, filtered out
+    client.put('/api/device/2', json={"position": "Rack 7"})
+    message = next(chunks).decode()
+    assert message.startswith('id: ') and '\nevent: device\n' in message
+    data = json.loads(message.split('data: ', 1)[1])
+    assert (data['device_id'], data['action']) == (2, 'updated')
+
+    subscribers = get_hub(app).subscriber_count
+    response.close()
+    assert get_hub(app).subscriber_count == subscribers - 1, "Closing the stream should unsubscribe"
+    client.put('/api/test/1', json={"status": "Completed"})
+
+
+def test_unstarted_event_stream_unsubscribes(app, client):
+    from flaskr.services.events import get_hub
+    subscribers = get_hub(app).subscriber_count
+    with app.test_request_context('/api/events'):
+        response = app.full_dispatch_request()
+    assert get_hub(app).subscriber_count == subscribers + 1
+    response.close()
+    assert get_hub(app).subscriber_count == subscribers, "Closing a stream before its first chunk should unsubscribe"
+
+
+def test_event_stream_heartbeat(app, client):
+    app.config['EVENTS_HEARTBEAT_INTERVAL'] = 0.01
+    try:
+        response = client.get('/api/events', buffered=False)
+        chunks = iter(response.response)
+        next(chunks)
+        assert next(chunks) == b': heartbeat\n\n'
+        response.close()
+    finally:
+        app.config['EVENTS_HEARTBEAT_INTERVAL'] = 15
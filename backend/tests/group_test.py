@@ -108,4 +108,105 @@ def test_list_groups(client):
     assert response.status_code == 200, "Failed to get group list"
     data = response.get_json()
     assert type(data) is list, "Return value should be a list"
-    assert all('id' in group for group in data), "Each group should have an id field"
\ No newline at end of file
+    assert all('id' in group for group in data), "Each group should have an id field"
+
+# Denormalized counters
+def test_group_counters_follow_members_and_tests(client):
+    group_id = create_test_group(client, {"name": "Counter Group", "description": "Counters", "leader_id": 1})
+
+    response = client.post(f'/api/group/{group_id}/user', json={"user_id": 2})
+    assert response.status_code == 201, "Failed to add member"
+    response = client.post('/api/test', json={
+        "name": "Counter Test", "display_id": "C-0001", "status": "Pending",
+        "group_id": group_id, "method_id": 1, "description": "Counter test"
+    })
+    assert response.status_code == 201, "Failed to create test"
+    test_id = response.get_json()['id']
+
+    data = client.get(f'/api/group/{group_id}').get_json()
+    assert (data['memberCount'], data['activeTests']) == (1, 1), "Counters should include the new member and test"
+
+    client.put(f'/api/test/{test_id}', json={"status": "Completed"})
+    client.delete(f'/api/group/{group_id}/user', json={"user_id": 2})
+    data = client.get(f'/api/group/{group_id}').get_json()
+    assert (data['memberCount'], data['activeTests']) == (0, 0), "Counters should drop after completion and removal"
+
+    client.delete(f'/api/test/{test_id}')
+    assert client.delete(f'/api/group/{group_id}').status_code == 204
+
+
+def test_reconcile_group_counters(app):
+    from flaskr.db import get_db, Group, reconcile_group_counters
+    with app.app_context():
+        db = get_db()
+        group = db.session.get(Group, 2)
+        expected = (group.member_count, group.active_test_count)
+        db.session.execute(Group.__table__.update().where(Group.__table__.c.id == 2).values(member_count=99))
+        db.session.commit()
+
+        drifted = reconcile_group_counters()
+        assert (2, *expected) in drifted, "Drifted group should be reported"
+        group = db.session.get(Group, 2)
+        assert (group.member_count, group.active_test_count) == expected
+
+
+# Group members
+def test_group_members_full_view_matches_user_serializer(app, client):
+    import json
+    from flaskr.db import get_db, BelongsToGroup
+    from flaskr.encoding import get_encoder
+    response = client.get('/api/group/2/user')
+    assert response.status_code == 200
+    with app.app_context():
+        memberships = get_db().session.query(BelongsToGroup).filter_by(group_id=2).order_by(BelongsToGroup.id).all()
+        expected = json.loads(get_encoder()([m.user.serialize for m in memberships]))
+    assert response.get_json() == expected
+    assert response.headers['X-Total-Count'] == str(len(expected))
+
+
+@pytest.mark.parametrize(
+    "query, expected_status, page, info", [
+        ('view=roster', 200, None, 'roster view of all members'),
+        ('view=roster&page=1&per_page=2', 200, 1, 'first roster page'),
+        ('view=roster&page=2&per_page=2', 200, 2, 'second roster page'),
+        ('page=50&per_page=2', 200, 50, 'page past the end'),
+        ('view=compact', 400, None, 'unknown view'),
+        ('page=0', 400, None, 'page must be positive'),
+        ('per_page=1000&page=1', 400, None, 'page size too large'),
+    ]
+)
+def test_group_members_roster_and_pagination(client, query, expected_status, page, info):
+    total = int(client.get('/api/group/2/user').headers['X-Total-Count'])
+    response = client.get(f'/api/group/2/user?{query}')
+    assert response.status_code == expected_status, f"Failed: {info}"
+    data = response.get_json()
+    if expected_status != 200:
+        assert 'message' in data, f"Error message fields error: {info}"
+        return
+    expected_count = total if page is None else max(0, min(2, total - (page - 1) * 2))
+    assert len(data) == expected_count, f"Failed: {info}"
+    assert response.headers['X-Total-Count'] == str(total), f"Failed: {info}"
+    if 'view=roster' in query:
+        for member in data:
+            assert set(member) == {'id', 'username', 'email', 'role', 'skills', 'groups'}, f"Roster fields error: {info}"
+            assert all(g['name'] for g in member['groups'])
+
+
+def test_group_members_query_count_is_constant(app, client):
+    from sqlalchemy import event
+    from flaskr.db import db
+    with app.app_context():
+        engine = db.engine
+    statements = []
+    record = lambda *args: statements.append(args[2])
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        for view in ('full', 'roster'):
+            statements.clear()
+            client.get(f'/api/group/1/user?view={view}')
+            small = len(statements)
+            statements.clear()
+            client.get(f'/api/group/2/user?view={view}&page=1&per_page=500')
+            assert len(statements) == small, f"{view} view should not issue per-member queries"
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
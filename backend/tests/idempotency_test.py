@@ -0,0 +1,96 @@
+import uuid
+import pytest
+from datetime import datetime, timedelta
+
+from flaskr.idempotency import get_store
+
+
+def reservation_body(days=500):
+    return {"device_id": 4, "user_id": 4, "test_id": 1,
+            "start_time": (datetime.now() + timedelta(days=days)).isoformat(), "duration": 30}
+
+
+@pytest.fixture
+def key(client):
+    key = str(uuid.uuid4())
+    yield key
+    get_store(client.application).clear()
+
+
+@pytest.fixture
+def cleanup(client):
+    ids = []
+    yield ids
+    for reservation_id in ids:
+        client.delete(f'/api/device/reservation/{reservation_id}')
+
+
+def test_retry_replays_original_response(client, key, cleanup):
+    body = reservation_body()
+    first = client.post('/api/device/reservation', json=body, headers={'Idempotency-Key': key})
+    assert first.status_code == 201
+    cleanup.append(first.get_json()['id'])
+    assert 'Idempotent-Replayed' not in first.headers
+
+    retry = client.post('/api/device/reservation', json=body, headers={'Idempotency-Key': key})
+    assert retry.status_code == 201
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert retry.get_json() == first.get_json()
+
+    # Without the key, the same request conflicts with the reservation it made.
+    assert client.post('/api/device/reservation', json=body).status_code == 409
+
+
+def test_replay_from_database_after_front_cache_is_cleared(client, key, cleanup):
+    body = reservation_body(days=510)
+    first = client.post('/api/device/reservation', json=body, headers={'Idempotency-Key': key})
+    cleanup.append(first.get_json()['id'])
+    get_store(client.application).clear()
+    retry = client.post('/api/device/reservation', json=body, headers={'Idempotency-Key': key})
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert retry.get_data() == first.get_data()
+
+
+def test_key_reused_for_another_request(client, key, cleanup):
+    first = client.post('/api/device/reservation', json=reservation_body(days=520), headers={'Idempotency-Key': key})
+    cleanup.append(first.get_json()['id'])
+    response = client.post('/api/device/reservation', json=reservation_body(days=521), headers={'Idempotency-Key': key})
+    assert response.status_code == 422
+
+
+def test_retry_while_first_request_is_running(client, key):
+    store = get_store(client.application)
+    body = reservation_body(days=530)
+    with client.application.test_request_context('/api/device/reservation', method='POST', json=body):
+        from flaskr.idempotency import _fingerprint
+        assert store.begin(('', key), _fingerprint()) is None
+    response = client.post('/api/device/reservation', json=body, headers={'Idempotency-Key': key})
+    assert response.status_code == 409
+    assert response.headers['Retry-After'] == '1'
+    with client.application.app_context():
+        store.release(('', key))
+
+
+def test_rejected_requests_are_not_stored(client, key):
+    headers = {'Idempotency-Key': key}
+    first = client.post('/api/test', json={"name": "No group"}, headers=headers)
+    assert first.status_code == 400
+    retry = client.post('/api/test', json={"name": "No group"}, headers=headers)
+    assert retry.status_code == 400
+    assert 'Idempotent-Replayed' not in retry.headers
+
+
+def test_invalid_key(client):
+    response = client.post('/api/test', json={}, headers={'Idempotency-Key': 'k' * 256})
+    assert response.status_code == 400
+
+
+def test_purge_expired_keys(app, client, key, cleanup, monkeypatch):
+    store = get_store(app)
+    monkeypatch.setattr(store, 'ttl', -1)
+    response = client.post('/api/device/reservation', json=reservation_body(days=540), headers={'Idempotency-Key': key})
+    cleanup.append(response.get_json()['id'])
+    with app.app_context():
+        result = app.test_cli_runner().invoke(args=['purge-idempotency-keys'])
+    assert result.exit_code == 0
+    assert 'Purged 1 ' in result.output
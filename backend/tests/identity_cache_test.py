@@ -0,0 +1,79 @@
+import re
+import pytest
+
+
+def count_statements(app, func):
+    from sqlalchemy import event
+    from flaskr.db import db
+    with app.app_context():
+        engine = db.engine
+    statements = []
+    record = lambda *args: statements.append(args[2])
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        func()
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return statements
+
+
+def test_repeated_lookup_is_served_from_cache(app, client):
+    from flaskr.services.identity_cache import get_cache
+    cache = get_cache(app)
+    cache.clear()
+    first = count_statements(app, lambda: client.get('/api/method/1'))
+    second = count_statements(app, lambda: client.get('/api/method/1'))
+    assert any(re.search(r'FROM method\s', sql) for sql in first)
+    assert not any(re.search(r'FROM method\s', sql) for sql in second), "The method row itself should come from the cache"
+    assert client.get('/api/method/1').get_json() == client.get('/api/method/1').get_json()
+    stats = cache.stats()
+    assert stats['models']['Method'][0] >= 3 and stats['hit_ratio'] > 0
+
+
+def test_committed_change_invalidates_cache(client):
+    before = client.get('/api/device/3').get_json()
+    assert client.get('/api/device/3').get_json() == before
+    response = client.put('/api/device/3', json={"position": "Cached Position"})
+    assert response.status_code == 200
+    assert client.get('/api/device/3').get_json()['position'] == 'Cached Position'
+
+
+def test_uncommitted_change_is_not_shared(app):
+    from flaskr.db import db, Skill
+    from flaskr.services.identity_cache import get_cached
+    with app.app_context():
+        original = get_cached(Skill, 1).name
+    with app.app_context():
+        skill = get_cached(Skill, 1)
+        skill.name = 'Uncommitted Skill'
+        db.session.flush()
+        assert get_cached(Skill, 1).name == 'Uncommitted Skill'
+        # Another request reading meanwhile must not see (or cache) the flushed row.
+        with app.app_context():
+            other = get_cached(Skill, 1).name
+        db.session.rollback()
+    with app.app_context():
+        assert get_cached(Skill, 1).name == original
+    assert other == original
+
+
+@pytest.mark.parametrize("max_size", [1, 2])
+def test_lru_eviction(app, max_size):
+    from flaskr.db import db, DeviceType
+    from flaskr.services.identity_cache import IdentityCache
+    cache = IdentityCache(max_size=max_size)
+    with app.app_context():
+        for pk in (1, 2, 1):
+            db.session.expunge_all()
+            assert cache.get(db.session, DeviceType, pk).id == pk
+    stats = cache.stats()
+    assert stats['size'] == max_size
+    assert stats['models']['DeviceType'] == ((1, 2) if max_size == 2 else (0, 3))
+
+
+def test_identity_cache_metrics(client):
+    client.get('/api/device/1')
+    client.get('/api/device/1')
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'flaskr_identity_cache_lookups_total{model="Device",result="hit"}' in body
+    assert 'flaskr_identity_cache_hit_ratio' in body
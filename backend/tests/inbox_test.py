@@ -0,0 +1,109 @@
+import itertools
+import pytest
+from datetime import datetime, timedelta
+
+seed_ids = itertools.count()
+
+
+def seed_inbox(app, username, num_tests):
+    """Create a user with `num_tests` assigned tests, each with a report and an upcoming reservation."""
+    from werkzeug.security import generate_password_hash
+    from flaskr.db import get_db, User, Test, AssignedTest, TestReport, DeviceReservation
+    with app.app_context():
+        db = get_db()
+        user = User(username=username, password=generate_password_hash(username), email=f'{username}@test.com', role_id=3)
+        db.session.add(user)
+        db.session.flush()
+        now = datetime.now()
+        for i in range(num_tests):
+            test = Test(display_id=f'{username}-{i}', group_id=1, method_id=1 + i % 3, name=f'{username} test {i}',
+                        status='Pending' if i % 2 else 'InProgress', description='Inbox test')
+            db.session.add(test)
+            db.session.flush()
+            db.session.add(AssignedTest(user_id=user.id, test_id=test.id))
+            db.session.add(TestReport(test_id=test.id, user_id=user.id, content='Inbox report'))
+            db.session.add(DeviceReservation(device_id=1 + i % 3, user_id=user.id, test_id=test.id,
+                                             start_time=now + timedelta(days=30 + i), end_time=now + timedelta(days=30 + i, hours=1)))
+        db.session.commit()
+        return user.id
+
+
+def test_inbox_matches_assigned_tests(client):
+    response = client.get('/api/user/4/inbox')
+    assert response.status_code == 200
+    data = response.get_json()
+    assigned = client.get('/api/user/4/test').get_json()
+    assert sorted(t['id'] for t in data['tests']) == sorted(t['id'] for t in assigned)
+    assert data['total'] == len(assigned)
+    assert all(r['user_id'] == 4 and r['review_status'] == 'Pending' for r in data['pending_reports'])
+
+
+@pytest.mark.parametrize(
+    "query, expected_status, expected_count, info", [
+        ('', 200, 4, 'all assigned tests'),
+        ('status=Pending', 200, 2, 'status filter'),
+        ('status=Pending,InProgress', 200, 4, 'comma separated statuses'),
+        ('status=Completed', 200, 0, 'no matching status'),
+        ('page=2&per_page=3', 200, 1, 'last page'),
+        ('status=Done', 400, None, 'unknown status'),
+        ('sort=name', 400, None, 'unknown sort'),
+        ('page=0', 400, None, 'page must be positive'),
+    ]
+)
+def test_inbox_filters_and_pagination(app, client, query, expected_status, expected_count, info):
+    user_id = seed_inbox(app, f'inbox{next(seed_ids)}', 4)
+    response = client.get(f'/api/user/{user_id}/inbox?{query}')
+    assert response.status_code == expected_status, f"Failed: {info}"
+    data = response.get_json()
+    if expected_status != 200:
+        assert 'message' in data, f"Error message fields error: {info}"
+        return
+    assert len(data['tests']) == expected_count, f"Failed: {info}"
+    assert len(data['reservations']) == 4 and len(data['pending_reports']) == 4, f"Failed: {info}"
+
+
+def test_inbox_sort_and_upcoming_reservations(app, client):
+    user_id = seed_inbox(app, 'inboxsort', 3)
+    newest = [t['id'] for t in client.get(f'/api/user/{user_id}/inbox').get_json()['tests']]
+    oldest = [t['id'] for t in client.get(f'/api/user/{user_id}/inbox?sort=created_at').get_json()['tests']]
+    assert newest == oldest[::-1]
+
+    from flaskr.db import get_db, DeviceReservation
+    with app.app_context():
+        db = get_db()
+        past = DeviceReservation(device_id=1, user_id=user_id, test_id=newest[0],
+                                 start_time=datetime.now() - timedelta(days=2), end_time=datetime.now() - timedelta(days=1))
+        db.session.add(past)
+        db.session.commit()
+        past_id = past.id
+    reservations = client.get(f'/api/user/{user_id}/inbox').get_json()['reservations']
+    assert past_id not in [r['id'] for r in reservations]
+    assert [r['start_time'] for r in reservations] == sorted(r['start_time'] for r in reservations)
+
+
+def test_inbox_unknown_user(client):
+    response = client.get('/api/user/99999/inbox')
+    assert response.status_code == 404
+    assert 'message' in response.get_json()
+
+
+def test_inbox_query_count_is_constant(app, client):
+    from sqlalchemy import event
+    from flaskr.db import db
+    small = seed_inbox(app, 'inboxsmall', 2)
+    large = seed_inbox(app, 'inboxlarge', 20)
+    with app.app_context():
+        engine = db.engine
+    client.get(f'/api/user/{small}/inbox')
+    counts = []
+    statements = []
+    record = lambda *args: statements.append(args[2])
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        for user_id in (small, large):
+            statements.clear()
+            assert client.get(f'/api/user/{user_id}/inbox').status_code == 200
+            counts.append(len(statements))
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert counts[0] == counts[1], f"Inbox queries grew with history: {counts}"
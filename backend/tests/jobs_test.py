@@ -0,0 +1,136 @@
+import threading
+import time
+import pytest
+
+from flaskr.services.jobs import JOB_KINDS, JobQueue, get_queue
+from flaskr.services.user import generate_jwt_token, get_user_by_id
+
+
+@pytest.fixture
+def tokens(app):
+    """Authorization headers of the admin (user 1) and a tester (user 4)."""
+    with app.app_context():
+        app.config['JWT_SECRET_KEY'] = 'test-secret'
+        app.config['SECRET_KEY'] = 'test-secret'
+        return {
+            role: {'Authorization': f'Bearer {generate_jwt_token(get_user_by_id(user_id))}'}
+            for role, user_id in (('admin', 1), ('tester', 4))
+        }
+
+
+@pytest.fixture
+def kinds(monkeypatch):
+    """Register test job kinds for the duration of a test."""
+    def register(name, func):
+        monkeypatch.setitem(JOB_KINDS, name, func)
+    return register
+
+
+def run_queued(app):
+    with app.app_context():
+        while get_queue(app).work_once() is not None:
+            pass
+
+
+def test_job_runs_in_background(app, client, tokens):
+    response = client.post('/api/jobs', json={'kind': 'reconcile_group_counters'}, headers=tokens['admin'])
+    assert response.status_code == 202
+    job = response.get_json()
+    assert job['status'] == 'Queued'
+    assert response.headers['Location'] == f"/api/jobs/{job['id']}"
+
+    run_queued(app)
+    job = client.get(response.headers['Location'], headers=tokens['tester']).get_json()
+    assert job['status'] == 'Succeeded'
+    assert job['progress'] == 1
+    assert job['result'] == {'groups': []}
+    assert job['attempts'] == 1
+
+
+@pytest.mark.parametrize(
+    "body, role, status, info", [
+        ({'kind': 'reconcile_group_counters'}, 'tester', 401, 'not an administrator'),
+        ({'kind': 'drop_everything'}, 'admin', 400, 'unknown kind'),
+        ({'kind': 'purge_idempotency_keys', 'params': {'older_than': 1}}, 'admin', 400, 'unknown parameter'),
+        ({'kind': 'purge_idempotency_keys', 'params': [1]}, 'admin', 400, 'parameters not an object'),
+    ]
+)
+def test_invalid_jobs_rejected(client, tokens, body, role, status, info):
+    assert client.post('/api/jobs', json=body, headers=tokens[role]).status_code == status, info
+
+
+def test_progress_failure_and_cancellation(app, client, tokens, kinds):
+    def steps(context, fail=False, cancel=False):
+        context.progress(0.5, 'Half way')
+        if fail:
+            raise RuntimeError('boom')
+        if cancel:
+            get_queue(app).cancel(context.job_id)
+            context.progress(0.6)
+        return 'done'
+    kinds('test_steps', steps)
+
+    with app.app_context():
+        queue = get_queue(app)
+        ids = [queue.enqueue('test_steps', params).id for params in ({}, {'fail': True}, {'cancel': True})]
+    run_queued(app)
+    done, failed, cancelled = (client.get(f'/api/jobs/{i}', headers=tokens['admin']).get_json() for i in ids)
+    assert (done['status'], done['result'], done['message']) == ('Succeeded', 'done', 'Half way')
+    assert (failed['status'], failed['error'], failed['progress']) == ('Failed', 'boom', 0.5)
+    assert (cancelled['status'], cancelled['cancel_requested']) == ('Cancelled', True)
+
+
+def test_cancel_queued_job(app, client, tokens):
+    job = client.post('/api/jobs', json={'kind': 'purge_idempotency_keys'}, headers=tokens['admin']).get_json()
+    assert client.delete(f"/api/jobs/{job['id']}", headers=tokens['tester']).status_code == 401
+    response = client.delete(f"/api/jobs/{job['id']}", headers=tokens['admin'])
+    assert response.status_code == 202
+    assert response.get_json()['status'] == 'Cancelled'
+    run_queued(app)
+    assert client.get(f"/api/jobs/{job['id']}", headers=tokens['admin']).get_json()['status'] == 'Cancelled'
+    assert client.delete(f"/api/jobs/{job['id']}", headers=tokens['admin']).status_code == 409
+    assert client.delete('/api/jobs/999999', headers=tokens['admin']).status_code == 404
+
+
+def test_workers_claim_each_job_once(app, kinds):
+    runs = []
+    lock = threading.Lock()
+
+    def record(context, n):
+        with lock:
+            runs.append(n)
+    kinds('test_record', record)
+
+    queues = [JobQueue(app, workers=2, poll_interval=0.05) for _ in range(2)]
+    with app.app_context():
+        ids = [queues[0].enqueue('test_record', {'n': n}).id for n in range(8)]
+    for queue in queues:
+        queue.start()
+    try:
+        from flaskr.db import db, Job
+        deadline = time.monotonic() + 10
+        with app.app_context():
+            while db.session.query(Job).filter(Job.id.in_(ids), Job.status != 'Succeeded').count():
+                assert time.monotonic() < deadline, "Every job should finish"
+                db.session.rollback()
+                time.sleep(0.05)
+    finally:
+        for queue in queues:
+            queue.stop()
+    assert sorted(runs) == list(range(8))
+
+
+def test_stale_jobs_are_requeued(app):
+    from datetime import datetime, timedelta
+    from flaskr.db import db, Job
+    with app.app_context():
+        queue = JobQueue(app, stale_after=60)
+        job_id = queue.enqueue('purge_idempotency_keys').id
+        assert queue.claim() == job_id
+        db.session.query(Job).filter_by(id=job_id).update({'heartbeat_at': datetime.now() - timedelta(minutes=5)})
+        db.session.commit()
+        assert queue.requeue_stale() == 1
+        assert get_queue(app).work_once() == job_id
+        job = db.session.get(Job, job_id)
+        db.session.refresh(job)
+        assert (job.status, job.attempts) == ('Succeeded', 2)
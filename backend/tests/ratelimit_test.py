@@ -0,0 +1,88 @@
+import time
+import pytest
+
+from flaskr.ratelimit import Budget, MemoryBackend, RateLimiter, RedisBackend
+from flaskr.services.user import generate_jwt_token, get_user_by_id
+
+
+def _redis_backend():
+    fakeredis = pytest.importorskip('fakeredis')
+    pytest.importorskip('lupa')  # fakeredis needs it to run Lua scripts
+    return RedisBackend(fakeredis.FakeRedis())
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def backend(request):
+    return MemoryBackend() if request.param == 'memory' else _redis_backend()
+
+
+def test_bucket_allows_bursts_then_refills(backend):
+    # 3 tokens, refilled once every 1000 seconds.
+    results = [backend.take('k', 3, 0.001)[0] for _ in range(4)]
+    assert results == [True, True, True, False]
+    assert backend.take('other', 3, 0.001)[0], "Buckets should be independent"
+
+    # 1 token, refilled every 100 ms.
+    assert backend.take('fast', 1, 10)[0]
+    assert not backend.take('fast', 1, 10)[0]
+    time.sleep(0.15)
+    allowed, tokens = backend.take('fast', 1, 10)
+    assert allowed and tokens < 1
+
+
+def test_budget_policy():
+    assert Budget(limit=10, period=60).policy == '10;w=60'
+    assert Budget(limit=60, period=60, burst=20).policy == '60;w=60;burst=20'
+
+
+@pytest.fixture
+def limiter(app, monkeypatch):
+    """A limiter allowing 2 name searches per hour, counting in the app's registry."""
+    current = app.extensions['ratelimit']
+    limiter = RateLimiter(MemoryBackend(), {'test_search': Budget(limit=2, period=3600)}, counter=current.counter)
+    monkeypatch.setitem(app.extensions, 'ratelimit', limiter)
+    return limiter
+
+
+def test_expensive_searches_are_limited(app, client, limiter):
+    registry = app.extensions['prometheus_registry']
+    limited = lambda: registry.get_sample_value('flaskr_ratelimit_requests_total',
+                                                {'budget': 'test_search', 'result': 'limited'}) or 0
+    before = limited()
+    first = client.get('/api/test?name=x')
+    assert first.status_code == 200
+    assert first.headers['RateLimit-Limit'] == '2'
+    assert first.headers['RateLimit-Remaining'] == '1'
+    assert first.headers['RateLimit-Policy'] == '2;w=3600'
+    assert client.get('/api/test?name=x').status_code == 200
+
+    response = client.get('/api/test?name=x')
+    assert response.status_code == 429
+    assert response.headers['RateLimit-Remaining'] == '0'
+    assert int(response.headers['Retry-After']) == 1800
+    assert limited() - before == 1
+
+    plain = client.get('/api/test')
+    assert plain.status_code == 200, "Listing without a search should not be limited"
+    assert 'RateLimit-Limit' not in plain.headers
+
+
+def test_clients_have_separate_buckets(app, client, limiter):
+    with app.app_context():
+        app.config['JWT_SECRET_KEY'] = 'test-secret'
+        app.config['SECRET_KEY'] = 'test-secret'
+        headers = {'Authorization': f'Bearer {generate_jwt_token(get_user_by_id(1))}'}
+    for _ in range(2):
+        assert client.get('/api/test?name=x').status_code == 200
+    assert client.get('/api/test?name=x').status_code == 429
+    assert client.get('/api/test?name=x', headers=headers).status_code == 200
+
+
+def test_storage_failures_let_requests_through(client, limiter, monkeypatch):
+    def broken(*args, **kwargs):
+        raise ConnectionError('storage is down')
+    monkeypatch.setattr(limiter.backend, 'take', broken)
+    for _ in range(3):
+        response = client.get('/api/test?name=x')
+        assert response.status_code == 200
+        assert 'RateLimit-Limit' not in response.headers
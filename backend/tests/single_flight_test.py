@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+from flaskr.services.single_flight import SingleFlight
+
+
+def slow_compute(calls, value=None, delay=0.2, error=None):
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return value if value is not None else len(calls)
+    return compute
+
+
+def get_concurrently(flight, key, compute, callers, version=None):
+    barrier = threading.Barrier(callers)
+
+    def call(_):
+        barrier.wait()
+        return asyncio.run(flight.get(key, compute, version=version))
+
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        return list(pool.map(call, range(callers)))
+
+
+@pytest.mark.parametrize("callers", [2, 20])
+def test_concurrent_calls_share_one_computation(app, callers):
+    flight = SingleFlight(app, 'test', bucket=60, stale=0)
+    calls = []
+    results = get_concurrently(flight, 'key', slow_compute(calls), callers)
+    assert len(calls) == 1
+    assert results == [1] * callers
+
+
+def test_results_reused_until_version_changes(app):
+    flight = SingleFlight(app, 'test', bucket=60, stale=0)
+    calls = []
+    compute = slow_compute(calls, delay=0)
+    assert asyncio.run(flight.get('key', compute, version=1)) == 1
+    assert asyncio.run(flight.get('key', compute, version=1)) == 1
+    assert asyncio.run(flight.get('other', compute, version=1)) == 2
+    assert asyncio.run(flight.get('key', compute, version=2)) == 3
+
+
+def test_zero_bucket_only_coalesces(app):
+    flight = SingleFlight(app, 'test', bucket=0, stale=0)
+    calls = []
+    compute = slow_compute(calls)
+    assert get_concurrently(flight, 'key', compute, 5) == [1] * 5
+    assert asyncio.run(flight.get('key', compute)) == 2
+
+
+def test_errors_reach_every_caller_and_are_not_kept(app):
+    flight = SingleFlight(app, 'test', bucket=60, stale=0)
+    calls = []
+    failing = slow_compute(calls, error=ValueError('boom'))
+
+    def call(_):
+        try:
+            asyncio.run(flight.get('key', failing))
+        except ValueError as e:
+            return str(e)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        assert list(pool.map(call, range(4))) == ['boom'] * 4
+    assert asyncio.run(flight.get('key', slow_compute(calls, value='ok', delay=0))) == 'ok'
+
+
+def test_stale_result_served_while_revalidating(app):
+    flight = SingleFlight(app, 'test', bucket=0.5, stale=60)
+    calls = []
+    compute = slow_compute(calls, delay=0.1)
+    assert asyncio.run(flight.get('key', compute)) == 1
+    time.sleep(0.5)
+
+    start = time.perf_counter()
+    assert asyncio.run(flight.get('key', compute)) == 1, "The previous result should be served while stale"
+    assert time.perf_counter() - start < 0.1, "Serving a stale result should not wait for the refresh"
+    deadline = time.monotonic() + 2
+    while asyncio.run(flight.get('key', compute)) == 1:
+        assert time.monotonic() < deadline, "The background refresh should replace the stale result"
+        time.sleep(0.02)
+
+
+def test_concurrent_dashboard_requests_are_coalesced(app, monkeypatch):
+    from sqlalchemy import event
+    from flaskr.db import db
+    from flaskr.services.dashboard_snapshot import get_snapshots
+    # Without a snapshot, so that every request goes through the flight.
+    get_snapshots(app).invalidate()
+    # A long bucket, so that crossing a bucket boundary mid-test cannot add a computation.
+    flights = app.extensions['single_flight']
+    monkeypatch.setitem(flights, 'dashboard', SingleFlight(app, 'dashboard', bucket=3600, stale=0,
+                                                           counter=flights['dashboard'].counter))
+    registry = app.extensions['prometheus_registry']
+
+    def sample(result):
+        return registry.get_sample_value('flaskr_single_flight_total', {'flight': 'dashboard', 'result': result}) or 0
+
+    with app.app_context():
+        engine = db.engine
+    delay = lambda *args: time.sleep(0.005)
+    before = {result: sample(result) for result in ('executed', 'coalesced', 'cached')}
+    barrier = threading.Barrier(8)
+
+    def request(_):
+        client = app.test_client()
+        barrier.wait()
+        response = client.get('/api/dashboard/2?compare_time_range=month')
+        assert response.status_code == 200
+        return response.get_json()
+
+    event.listen(engine, 'before_cursor_execute', delay)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(request, range(8)))
+    finally:
+        event.remove(engine, 'before_cursor_execute', delay)
+    assert all(r == results[0] for r in results)
+    assert sample('executed') - before['executed'] == 1
+    assert sum(sample(r) - before[r] for r in ('coalesced', 'cached')) == 7
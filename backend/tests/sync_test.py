@@ -0,0 +1,75 @@
+import pytest
+
+
+def sync_token(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    return int(response.headers['X-Sync-Token'])
+
+
+@pytest.mark.parametrize("url", ['/api/device', '/api/test'])
+def test_list_carries_sync_token(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    assert int(response.headers['X-Sync-Token']) >= 0
+
+
+def test_delta_returns_only_changed_devices(client):
+    token = sync_token(client, '/api/device')
+    response = client.get(f'/api/device?updated_since={token}')
+    assert response.status_code == 200
+    assert response.get_json() == {'sync_token': token, 'items': [], 'deleted': []}
+
+    created = client.post('/api/device', json={"name": "Sync Device", "device_type_id": 1, "status": "Available"})
+    assert created.status_code == 201
+    device_id = created.get_json()['id']
+
+    data = client.get(f'/api/device?updated_since={token}').get_json()
+    assert [d['id'] for d in data['items']] == [device_id]
+    assert data['deleted'] == []
+    assert data['sync_token'] > token
+
+    assert client.delete(f'/api/device/{device_id}').status_code in (200, 204)
+    later = client.get(f'/api/device?updated_since={data["sync_token"]}').get_json()
+    assert later['items'] == []
+    assert later['deleted'] == [device_id]
+    assert later['sync_token'] > data['sync_token']
+
+
+def test_delta_from_zero_lists_everything(client):
+    full = client.get('/api/device').get_json()
+    data = client.get('/api/device?updated_since=0').get_json()
+    assert sorted(d['id'] for d in data['items']) == sorted(d['id'] for d in full)
+
+
+@pytest.mark.parametrize("value", ['abc', '-1', ''])
+def test_invalid_updated_since(client, value):
+    response = client.get(f'/api/test?updated_since={value}')
+    assert response.status_code == 400
+    assert 'message' in response.get_json()
+
+
+def test_bulk_statements_are_synced(app, client):
+    from sqlalchemy import delete, update
+    from flaskr.db import db, Device
+    device_id = client.post('/api/device', json={"name": "Bulk Sync Device", "device_type_id": 1, "status": "Available"}).get_json()['id']
+    token = sync_token(client, '/api/device')
+
+    with app.app_context():
+        db.session.execute(update(Device).where(Device.id == device_id).values(name='Bulk Synced Device'))
+        db.session.commit()
+    data = client.get(f'/api/device?updated_since={token}').get_json()
+    assert [d['name'] for d in data['items']] == ['Bulk Synced Device']
+
+    with app.app_context():
+        db.session.execute(update(Device), [{'id': device_id, 'name': 'Bulk Synced Device 2'}])
+        db.session.commit()
+    data = client.get(f'/api/device?updated_since={data["sync_token"]}').get_json()
+    assert [d['name'] for d in data['items']] == ['Bulk Synced Device 2']
+
+    with app.app_context():
+        db.session.execute(delete(Device).where(Device.id == device_id))
+        db.session.commit()
+    data = client.get(f'/api/device?updated_since={data["sync_token"]}').get_json()
+    assert data['items'] == []
+    assert data['deleted'] == [device_id]
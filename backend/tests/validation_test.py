@@ -0,0 +1,45 @@
+import pytest
+from flaskr.validation import Schema, Field, swagger_definitions
+from flaskr import db as models
+
+SAMPLE = Schema('ValidationTestSampleSchema', {
+    'name': Field(str, required=True, trim=True, help='Name is required'),
+    'count': Field(int, default=1, help='Count {error_msg}'),
+    'status': Field(models.TestStatusEnum, help='Status {error_msg}'),
+    'kind': Field(str, choices=['a', 'b']),
+})
+
+
+@pytest.mark.parametrize(
+    "data, expected_args, expected_errors, info", [
+        ({'name': ' x '}, {'name': 'x', 'count': 1, 'status': None, 'kind': None}, {}, 'defaults and trim'),
+        ({'name': 'x', 'count': '3', 'status': 'Pending'}, {'name': 'x', 'count': 3, 'status': models.TestStatusEnum.Pending, 'kind': None}, {}, 'conversion'),
+        ({'name': 'x', 'count': None}, {'name': 'x', 'count': None, 'status': None, 'kind': None}, {}, 'explicit null'),
+        ({}, None, {'name': 'Name is required'}, 'missing required field'),
+        ({'name': 'x', 'count': 'many'}, None, {'count': "Count invalid literal for int() with base 10: 'many'"}, 'bad integer'),
+        ({'name': 'x', 'kind': 'c'}, None, {'kind': 'c is not a valid choice'}, 'invalid choice'),
+        ({'name': 'x', 'other': 1}, None, {'other': 'Unknown field'}, 'strict rejects unknown fields'),
+    ]
+)
+def test_schema_validate(data, expected_args, expected_errors, info):
+    args, errors = SAMPLE.validate(data)
+    assert errors == expected_errors, f"Failed: {info}"
+    if expected_args is not None:
+        assert args == expected_args, f"Failed: {info}"
+
+
+def test_structured_error_response(client):
+    response = client.post('/api/test', json={'name': 'x', 'status': 'Bogus', 'extra': 1})
+    assert response.status_code == 400
+    data = response.get_json()
+    assert data['message'] == data['errors']['display_id']
+    assert set(data['errors']) == {'display_id', 'status', 'group_id', 'method_id', 'extra'}
+    assert client.post('/api/test', json=['not', 'an', 'object']).status_code == 400
+
+
+def test_swagger_definitions_follow_schemas(client):
+    spec = client.get('/apispec_1.json').get_json()
+    assert spec['definitions']['CreateTestSchema'] == swagger_definitions()['CreateTestSchema']
+    create_test = spec['definitions']['CreateTestSchema']
+    assert create_test['required'] == ['name', 'display_id', 'status', 'group_id', 'method_id']
+    assert create_test['properties']['status']['enum'] == [s.value for s in models.TestStatusEnum]